@@ -1,10 +1,20 @@
 import numpy as np
 from .Read3D import Read3D
 from .GetPitchAngle import GetPitchAngle
+from ..Tools.SavePitchAngles import PitchAngleSource
 import DateTimeTools as TT
-from scipy.stats import binned_statistic
+from ..Tools.CalculatePAD import CalculatePAD
+from ..Tools.CombinePADs import CombinePADs
+from ..MGF.InterpObj import InterpObj
 
-def CalculatePADs(Date,na=18,Verbose=True):
+#the fields used for the low and high energy parts of the data (time,
+#energy, flux, angles, sector number)
+_Fields = {	'eFluxL' : ('Epoch_L','FEDU_L_Energy','FEDU_L','FEDU_L_Angle_gse','sctno_L'),
+			'eFluxH' : ('Epoch_H','FEDU_H_Energy','FEDU_H','FEDU_H_Angle_gse','sctno_H')}
+
+def CalculatePADs(Date,na=18,Verbose=True,Alpha=None,Energy=None,
+		Weighting=None,Statistic='mean',ChunkSize=None,
+		CachePitchAngles=False,Source=None):
 	'''
 	Calculates a pitch angle distribution of the differential energy flux
 	data using the level 2 3dflux data.
@@ -21,6 +31,31 @@ def CalculatePADs(Date,na=18,Verbose=True):
 		180 degrees
 	Verbose: bool
 		Display progress
+	Alpha : None or float
+		Pitch angle bin edges (degrees), if set then these are used 
+		instead of na uniform bins.
+	Energy : None or float
+		If set, the energy channels are combined into bins with these
+		edges.
+	Weighting : None, str or float
+		None|'solidangle'|'counts' or an array of weights for each 
+		sample (see Arase.Tools.CalculatePAD).
+	Statistic : str
+		'mean'|'median'
+	ChunkSize : None or int
+		If set, the data are read, and the pitch angles calculated and
+		binned, for roughly this many records at a time (always whole
+		spins), so that the memory used is limited by the chunk size 
+		rather than the length of the day. The result is identical to
+		processing the whole day at once (ChunkSize=None).
+	CachePitchAngles : bool
+		If True, the pitch angles saved for this date are used if they
+		are up to date, otherwise they are calculated and saved (see 
+		GetPitchAngle).
+	Source : None or dict
+		Versions of the 3dflux and MGF data used to check the saved
+		pitch angles (see Arase.Tools.PitchAngleSource), if None they
+		are read from the data indices (once).
 		
 		
 	Returns
@@ -29,87 +64,108 @@ def CalculatePADs(Date,na=18,Verbose=True):
 		Contains a dict for each species
 	
 	'''
+
+	#the PAD configuration
+	if Alpha is None:
+		Alpha = na
+	cfg = {	'Alpha' : Alpha,
+			'Energy' : Energy,
+			'Weighting' : Weighting,
+			'Statistic' : Statistic,
+			'Verbose' : Verbose}
 	
-	
-	
-	#for HEP we should average over each sector
-	
-	#this is the output dictionary
-	out = {}
-	
-	#read the 3D data in
-	data,meta = Read3D(Date)
-	
+	#the versions of the data which saved pitch angles should match,
+	#found once for the whole day
+	if CachePitchAngles and Source is None:
+		Source = PitchAngleSource('HEP',Date)
+
+	if ChunkSize is None:
+		#read the 3D data in
+		data,meta = Read3D(Date)
 
-	#calculate alpha
-	alphaL,alphaH = GetPitchAngle(Date,data=data)
+		#calculate alpha
+		alphaL,alphaH = GetPitchAngle(Date,data=data,Cache=CachePitchAngles,Source=Source)
+		alpha = {'eFluxL' : alphaL, 'eFluxH' : alphaH}
+	
+		#loop through them both
+		out = {}
+		for ff in list(_Fields.keys()):
+			print(ff)
+			i0,i1 = _Spins(data[_Fields[ff][4]])
+			out[ff] = _PAD(data,alpha[ff],ff,i0,i1,cfg)
+		return out
 
-	#list the fields used for high and low parts of the data
-	fields = { 	'eFluxL' : ('Epoch_L','FEDU_L_Energy','FEDU_L',alphaL,'sctno_L'),
-				'eFluxH' : ('Epoch_H','FEDU_H_Energy','FEDU_H',alphaH,'sctno_H')}
+	#the mag data for the whole day are used for each chunk
+	mag = InterpObj(Date,Smooth=8)
 	
-	#loop through them both
-	for ff in list(fields.keys()):
+	cfg['Verbose'] = False
+	out = {}
+	for s,ff in enumerate(list(_Fields.keys())):
 		print(ff)
-		ftime,fenergy,fflux,alpha,fsect =  fields[ff]
-		
-		#find sector start and end times
-		sect = data[fsect]
-		i0 = np.where(sect == 0)[0]
-		i1 = np.where(sect == 15)[0] + 1
-		ni = i0.size
-		
-		#combine epochs
-		epoch = data[ftime][i0] + 4000000000
+		ftime,fenergy,fflux,fangle,fsect = _Fields[ff]
 		
+		#read the sector numbers, then the rest of the data in chunks
+		#of whole spins
+		data,meta = Read3D(Date,Variables=[fsect])
+		i0,i1 = _Spins(data[fsect])
+		pads = []
+		for k0,k1,r0,r1 in _Chunks(i0,i1,ChunkSize):
+			if Verbose:
+				print('\rRecords {:d} to {:d} of {:d}'.format(r0,r1,data[fsect].size),end='')
+			chunk,meta = Read3D(Date,Variables=[ftime,fenergy,fflux,fangle],Records=(r0,r1))
+			alpha = GetPitchAngle(Date,data=chunk,mag=mag,Records=(r0,r1),
+							Cache=CachePitchAngles,Source=Source)[s]
+			pads.append({ff : _PAD(chunk,alpha,ff,i0[k0:k1]-r0,i1[k0:k1]-r0,cfg)})
+			del chunk,alpha
+		if Verbose:
+			print()
+		out.update(CombinePADs(pads))
 	
-		#determine the size of the output arrays
-		nt = ni
-		ne = data[fenergy].shape[1]
-		
-		#get the dates/times
-		Date,ut = TT.CDFEpochtoDate(epoch)
-		utc = TT.ContUT(Date,ut)
-		
-		#get the energy arrays (shape: (nt,ne))
-		EMin = data[fenergy][0,:]
-		EMax = data[fenergy][1,:]
-		Emid = 10.0**(0.5*(np.log10(EMin) + np.log10(EMax)))
-		
-		#get the alpha limits
-		Alpha = np.linspace(0.0,180.0,na+1)
+	return out
 
-		#create 3D array for fluxes
-		flux = np.zeros((nt,ne,na),dtype='float32') + np.nan
-		
-		
-		#loop through each dimension (slow!)
-		FLUX = data[fflux]
-		bad = np.where(FLUX <= 0)
-		FLUX[bad] = np.nan
+def _Spins(sect):
+	'''
+	Find the first and last (+1) records of each spin, where there is
+	no end to a spin it is left empty.
+	
+	'''
+	i0 = np.where(sect == 0)[0]
+	i1 = np.where(sect == 15)[0] + 1
+	i1 = np.append(i1,i0[i1.size:])[:i0.size].clip(min=i0)
+	return i0,i1
 
+def _Chunks(i0,i1,ChunkSize):
+	'''
+	Split the spins into chunks of roughly ChunkSize records, returning
+	the spin (k0,k1) and record (r0,r1) ranges of each.
+	
+	'''
+	if i0.size == 0:
+		return [(0,0,0,1)]
+	out = []
+	k0 = 0
+	while k0 < i0.size:
+		k1 = max(k0 + 1,np.searchsorted(i0,i0[k0] + ChunkSize))
+		r0 = i0[k0]
+		r1 = max(i0[k1-1] + 1,i1[k0:k1].max())
+		out.append((k0,k1,r0,r1))
+		k0 = k1
+	return out
+	
+def _PAD(data,alpha,ff,i0,i1,cfg):
+	'''
+	Calculate the PAD for either the low or high energy part of the 
+	data (or a chunk of it).
+	
+	'''
+	ftime,fenergy,fflux,fangle,fsect =  _Fields[ff]
 		
-		for i in range(0,nt):
-			if Verbose:
-				print('\r{:6.2f}%'.format(100.0*(i+1)/nt),end='')
-			for j in range(0,ne):
-				a = alpha[i0[i]:i1[i]].flatten()
-				f = FLUX[i0[i]:i1[i],j].flatten()
-				good = np.where(np.isfinite(f))[0]
-				if good.size > 0:
-					flux[i,j],_,_ = binned_statistic(a[good],f[good],statistic='mean',bins=Alpha)
-		if Verbose:
-			print()		
+	#combine epochs
+	epoch = data[ftime][i0] + 4000000000
 		
-		tmp = {}
-		tmp['Date'] = Date
-		tmp['ut'] = ut
-		tmp['utc'] = utc
-		tmp['Emin'] = EMin
-		tmp['Emax'] = EMax
-		tmp['Alpha'] = Alpha
-		tmp['Flux'] = flux
+	#get the dates/times
+	Date,ut = TT.CDFEpochtoDate(epoch)
 		
-		out[ff] = tmp
-	
-	return out
+	#bin all of the fluxes, combining the sectors of each spin
+	return CalculatePAD(Date,ut,alpha,data[fflux],Emin=data[fenergy][0,:],
+						Emax=data[fenergy][1,:],i0=i0,i1=i1,**cfg)
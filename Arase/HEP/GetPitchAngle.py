@@ -5,9 +5,12 @@ from scipy.interpolate import interp1d
 from scipy.ndimage import uniform_filter
 from ..Tools.CalculatePitchAngles import CalculatePitchAngles
 from ..MGF.InterpObj import InterpObj
+from ..Tools.ReadPitchAngles import ReadPitchAngles
+from ..Tools.SavePitchAngles import _SaveIfPossible,PitchAngleSource
 import DateTimeTools as TT
 
-def GetPitchAngle(Date,data=None):
+def GetPitchAngle(Date,data=None,mag=None,Records=None,dtype=None,Cache=False,
+		Source=None):
 	'''
 	Attempt to calculate the pitch angle for each element of the 3D
 	fluxes. This should be contained in the level 3 3dflux data, but is 
@@ -24,30 +27,79 @@ def GetPitchAngle(Date,data=None):
 		If None, data will be loaded automatically, if data are already 
 		in memory it would be quicker to set this keyword to save 
 		reloading.
+	mag : None or tuple
+		MGF interpolation objects (see Arase.MGF.InterpObj), if None 
+		then these are created from the MGF data.
+	Records : None or tuple
+		(r0,r1) - only return the pitch angles of these records (if 
+		data is set, it should contain only these records).
+	dtype : None or str
+		Precision of the pitch angles, e.g. 'float32' (see 
+		Arase.Tools.CalculatePitchAngles).
+	Cache : bool
+		If True, pitch angles saved for this date (see 
+		Arase.Tools.SavePitchAngles) are used where they match the
+		times of the data and the versions of the 3dflux and MGF data 
+		(Source), and the pitch angles of a whole day are saved after
+		they are calculated.
+	Source : None or dict
+		Only used if Cache is True, the versions of the 3dflux and MGF
+		data (see Arase.Tools.PitchAngleSource). If None, they are read
+		from the data indices.
 	
 	Returns
 	=======
-	Array(s) of pitch angles
+	Array(s) of pitch angles (None for a sensor whose data were not
+	read).
 
 	'''
 	
-	#read in the 3dflux level 2 data
-	if data is None:
-		data,meta = Read3D(Date)
+	#the saved pitch angles
+	saved = None
+	if Cache:
+		if Source is None:
+			Source = PitchAngleSource('HEP',Date)
+		saved = ReadPitchAngles('HEP',Date,Records,Source=Source)
 	
-	#get the mag data interp objects
-	mag = InterpObj(Date,Smooth=8)
+	#calculate the pitch angles for the low and high energy sensors
+	#(either may be missing if only part of the data were read)
+	alpha = []
+	calc = False
+	for s in ['L','H']:
+		ek = 'Epoch_{:s}'.format(s)
+		ak = 'FEDU_{:s}_Angle_gse'.format(s)
+		if not data is None and not ak in data:
+			alpha.append(None)
+			continue
+		
+		#use the saved pitch angles if they match the data
+		if not saved is None and (data is None or np.array_equal(saved[ek],data[ek])):
+			alpha.append(np.array(saved['alpha'+s],dtype=dtype))
+			continue
+			
+		#read in the 3dflux level 2 data
+		if data is None:
+			data,meta = Read3D(Date,Variables=['Epoch_L','FEDU_L_Angle_gse',
+								'Epoch_H','FEDU_H_Angle_gse'],Records=Records)
 	
-	#get the elevation/angle data
-	anglesl = data['FEDU_L_Angle_gse']*np.pi/180.0
-	anglesh = data['FEDU_H_Angle_gse']*np.pi/180.0
+		#get the mag data interp objects
+		if mag is None:
+			mag = InterpObj(Date,Smooth=8)
+			
+		#get the elevation/angle data
+		angles = data[ak]*np.pi/180.0
 	
-	#get the time and date
-	datel,timel = TT.CDFEpochtoDate(data['Epoch_L'])
-	dateh,timeh = TT.CDFEpochtoDate(data['Epoch_H'])
+		#get the time and date
+		date,time = TT.CDFEpochtoDate(data[ek])
 		
-	#call the function to retrieve pitch angles
-	alphal = CalculatePitchAngles(datel,timel,anglesl,mag)
-	alphah = CalculatePitchAngles(dateh,timeh,anglesh,mag)
+		#call the function to retrieve pitch angles
+		alpha.append(CalculatePitchAngles(date,time,angles,mag,dtype))
+		calc = True
+
+	#save a whole day for next time
+	if Cache and calc and Records is None and not any([a is None for a in alpha]):
+		_SaveIfPossible('HEP',Date,{'Epoch_L' : data['Epoch_L'], 'alphaL' : alpha[0],
+									'Epoch_H' : data['Epoch_H'], 'alphaH' : alpha[1]},Source)
 
+	alphal,alphah = alpha
 	return alphal,alphah
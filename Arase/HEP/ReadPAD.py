@@ -4,25 +4,40 @@ from ..Tools.ReadMirrorAlt import ReadMirrorAlt
 from .. import Globals
 from ..Tools.PSpecPADCls import PSpecPADCls
 
-def ReadPAD(Date,SpecType,ReturnSpecObject=True,ReadMirror=True):
+def ReadPAD(Date,SpecType,ReturnSpecObject=True,ReadMirror=True,Time=None,
+		Energy=None,MemMap=True):
 	'''
 	Date : int
-		Date to download data for in format yyyymmdd
-		If single date - only data from that one day will be fetched
-		If 2-element array - dates from Date[0] to Date[1] will be downloaded
-		If > 2 elements - this is treated as a specific list of dates to download
+		Date to read data for in format yyyymmdd
+		If single date - only data from that one day will be read
+		If 2-element array - dates from Date[0] to Date[1] will be read
+		If > 2 elements - this is treated as a specific list of dates to read
 	SpecType : str
 		'eFluxL'|'eFluxH'
 	ReturnSpecObject : bool
 		If True, then a PSpecPADCls object (which can plot the data) is 
 		returned, otherwise a dictionary containing the data is returned
+	ReadMirror : bool
+		If True, the mirror altitudes are read and matched to the PADs.
+	Time : None or float
+		If set, [ut0,ut1] - only read the records within this time 
+		range (hours since the start of the first date).
+	Energy : None, int or tuple
+		If set, the index of a single energy bin, or (i0,i1) - the 
+		range of energy bins to read.
+	MemMap : bool
+		If True, the flux of a single date is memory mapped where 
+		possible (see Arase.Tools.ReadPAD), the PSpecPADCls object 
+		keeps using the memory mapped array.
 		
 	
 	'''
 
 	path = Globals.DataPath + 'HEP/PAD/'
 	
-	pad = RPAD(Date,path,SpecType)
+	pad = RPAD(Date,path,SpecType,Time=Time,Energy=Energy,MemMap=MemMap)
+	if pad is None:
+		return None
 	
 	if SpecType == 'eFluxL':
 		Inst = 'HEPL'
@@ -31,7 +46,7 @@ def ReadPAD(Date,SpecType,ReturnSpecObject=True,ReadMirror=True):
 
 	if ReturnSpecObject:
 		if ReadMirror:
-			Mirror = ReadMirrorAlt(Date,path)
+			Mirror = ReadMirrorAlt(Date,path,utc=pad['utc'])
 			return PSpecPADCls(pad,Inst,Mirror=Mirror)
 		else:
 			return PSpecPADCls(pad,Inst)
@@ -1,20 +1,19 @@
 import numpy as np
-from .CalculatePADs import CalculatePADs
-from ..Tools.SavePAD import SavePAD
-from .. import Globals
+from .CalculatePADs import CalculatePADs,_Fields
+from ..Tools.BatchSavePADs import BatchSavePADs,_SaveInstrumentDate
 from .ReadIndex import ReadIndex
-from .. import MGF
-from ..MGF.DownloadData import DownloadData as DownloadMGF
 from .DownloadData import DownloadData
 from .DeleteDate import DeleteDate
-from ..Tools.ListDates import ListDates
 from .SaveMirrorAlts import SaveMirrorAlts
-import os
 
 def SavePADs(Date,na=18,Overwrite=False,DownloadMissingData=True,
-		DeleteNewData=True,Verbose=True):
+		DeleteNewData=True,Verbose=True,nProc=1,MaxDownloads=1,ChunkSize=None,
+		Compress=False,CachePitchAngles=False):
 	'''
-	Save the PADs for a date or dates.
+	Save the PADs for a date or dates. The status of each date is 
+	recorded, so if this is interrupted then calling it again will 
+	only process the dates which were not finished (see 
+	Arase.Tools.BatchSavePADs).
 	
 	Input
 	=====
@@ -31,49 +30,39 @@ def SavePADs(Date,na=18,Overwrite=False,DownloadMissingData=True,
 		Download missing 3dflux data
 	DeleteNewData : bool
 		If we had to download any new data, then delete it to save space
+	nProc : None or int
+		Number of processes used to process dates in parallel (None 
+		to use all of the CPUs).
+	MaxDownloads : int
+		Maximum number of processes which may download data at once.
+	ChunkSize : None or int
+		If set, each day is processed this many records at a time to
+		limit the memory used (see CalculatePADs).
+	Compress : bool
+		Compress the fluxes in the PAD files (see Tools.SavePAD).
+	CachePitchAngles : bool
+		Save the pitch angles calculated for each date (or reuse those
+		already saved), see GetPitchAngle.
+		
+	Returns
+	=======
+	out : numpy.recarray
+		Status of each date.
 	'''
 	
-	#populate the list of dates to save
-	if np.size(Date) == 1:
-		dates = np.array([Date])
-	elif np.size(Date) == 2:
-		dates = ListDates(Date[0],Date[1])
-	else:
-		dates = np.array([Date]).flatten()
-		
-	path = Globals.DataPath + 'HEP/PAD/'
-		
-	#read the data index to see what data we have
-	idx = ReadIndex(2,'3dflux')
-	magidx = MGF.ReadIndex(2,'8sec')
-		
-	for date in dates:
-		print('Saving date {:08d}'.format(date))
-		
-		#check if the 3dflux data exists
-		downloadednew = False
-		exists3d = date in idx.Date
-		if not exists3d and DownloadMissingData:
-			DownloadData(2,'3dflux',date,Verbose=Verbose)
-			idx = ReadIndex(2,'3dflux')
-			exists3d = date in idx.Date
-			downloadednew = True
-		#check if the MGF data exists
-		existsmag = date in magidx.Date
-		if not existsmag and DownloadMissingData:
-			DownloadMGF(2,'8sec',date,Verbose=Verbose)
-			magidx = ReadIndex(2,'8sec')
-			existsmag = date in magidx.Date
-		
-		if existsmag and exists3d:
-		
-			pad = CalculatePADs(date,na,Verbose)
-			SavePAD(date,path,pad,Overwrite)
-
-		if downloadednew and DeleteNewData:
-			DeleteDate(date,2,'3dflux',False)
+	return BatchSavePADs('HEP',Date,nProc=nProc,MaxDownloads=MaxDownloads,
+				Overwrite=Overwrite,Verbose=Verbose,na=na,
+				DownloadMissingData=DownloadMissingData,
+				DeleteNewData=DeleteNewData,ChunkSize=ChunkSize,
+				Compress=Compress,
+				CachePitchAngles=CachePitchAngles)
 
-		#save mirror stuff if needed
-		mirrexists = os.path.isfile(path+ '{:08d}/Mirror.bin'.format(date))
-		if (not mirrexists):
-			SaveMirrorAlts(date,na,Overwrite,Verbose=Verbose)
+def _SavePADDate(date,**kwargs):
+	'''
+	Save the PADs for a single date (see SavePADs and 
+	Arase.Tools.BatchSavePADs._SaveInstrumentDate), returning 'done' or
+	'nodata'.
+	
+	'''
+	return _SaveInstrumentDate('HEP',list(_Fields.keys()),date,ReadIndex,DownloadData,
+				DeleteDate,CalculatePADs,SaveMirrorAlts,**kwargs)
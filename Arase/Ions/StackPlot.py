@@ -4,7 +4,8 @@ from .. import LEPi,MEPi
 from ..Tools.PlotLabel import PlotLabel
 
 def StackPlot(Date,ut=[0.0,24.0],Instruments=['MEPi','LEPi'],Species='H+',
-	figsize=(8,6),yparam='E',zparam='Flux',scale=None,TickFreq='auto',PosAxis=True):
+	figsize=(8,6),yparam='E',zparam='Flux',scale=None,TickFreq='auto',PosAxis=True,
+	Downsample=True):
 	'''
 	Plot electron data with each intrument on a separate panel.
 	
@@ -27,6 +28,9 @@ def StackPlot(Date,ut=[0.0,24.0],Instruments=['MEPi','LEPi'],Species='H+',
 		energy flux.
 	scale : list
 		2-element list - use this to set the limits of the colour scale.
+	Downsample : bool
+		If True, long time ranges are plotted at a reduced time
+		resolution (see PSpecCls.Plot).
 	
 	
 	'''
@@ -68,7 +72,7 @@ def StackPlot(Date,ut=[0.0,24.0],Instruments=['MEPi','LEPi'],Species='H+',
 			nox = False
 		else:
 			nox = True
-		a = data[i].Plot(Date,ut=ut,fig=plt,maps=[1,n,0,i],nox=nox,yparam=yparam,zparam=zparam,scale=scale,TickFreq=TickFreq,PosAxis=PosAxis)
+		a = data[i].Plot(Date,ut=ut,fig=plt,maps=[1,n,0,i],nox=nox,yparam=yparam,zparam=zparam,scale=scale,TickFreq=TickFreq,PosAxis=PosAxis,Downsample=Downsample)
 		ax.append(a)
 		
 	#remove space 
@@ -6,9 +6,12 @@ from scipy.interpolate import interp1d
 from scipy.ndimage import uniform_filter
 from ..Tools.CalculatePitchAngles import CalculatePitchAngles
 from ..MGF.InterpObj import InterpObj
+from ..Tools.ReadPitchAngles import ReadPitchAngles
+from ..Tools.SavePitchAngles import _SaveIfPossible,PitchAngleSource
 
 
-def GetPitchAngle(Date,data=None):
+def GetPitchAngle(Date,data=None,mag=None,Records=None,dtype=None,Cache=False,
+		Source=None):
 	'''
 	Attempt to calculate the pitch angle for each element of the 3D
 	fluxes. This should be contained in the level 3 3dflux data, but is 
@@ -25,15 +28,42 @@ def GetPitchAngle(Date,data=None):
 		If None, data will be loaded automatically, if data are already 
 		in memory it would be quicker to set this keyword to save 
 		reloading.
+	mag : None or tuple
+		MGF interpolation objects (see Arase.MGF.InterpObj), if None 
+		then these are created from the MGF data.
+	Records : None or tuple
+		(r0,r1) - only return the pitch angles of these records (if 
+		data is set, it should contain only these records).
+	dtype : None or str
+		Precision of the pitch angles, e.g. 'float32' (see 
+		Arase.Tools.CalculatePitchAngles).
+	Cache : bool
+		If True, pitch angles saved for this date (see 
+		Arase.Tools.SavePitchAngles) are used where they match the
+		times of the data and the versions of the 3dflux and MGF data 
+		(Source), and the pitch angles of a whole day are saved after
+		they are calculated.
+	Source : None or dict
+		Only used if Cache is True, the versions of the 3dflux and MGF
+		data (see Arase.Tools.PitchAngleSource). If None, they are read
+		from the data indices.
 	
 	Returns
 	=======
 	Array(s) of pitch angles
 
 	'''
+	#use the saved pitch angles if they match the data
+	if Cache:
+		if Source is None:
+			Source = PitchAngleSource('LEPe',Date)
+		saved = ReadPitchAngles('LEPe',Date,Records,Source=Source)
+		if not saved is None and (data is None or np.array_equal(saved['Epoch'],data['Epoch'])):
+			return np.array(saved['alpha'],dtype=dtype)
+	
 	#read in the 3dflux level 2 data
 	if data is None:
-		data,meta = Read3D(Date)
+		data,meta = Read3D(Date,Variables=['Epoch','FEDU_Angle_GSE'],Records=Records)
 	
 	#get the elevation/angle data
 	angles = data['FEDU_Angle_GSE']*np.pi/180.0
@@ -42,6 +72,10 @@ def GetPitchAngle(Date,data=None):
 	date,time = TT.CDFEpochtoDate(data['Epoch'])
 		
 	#call the function to retrieve pitch angles
-	alpha = CalculatePitchAngles(date,time,angles,None)
+	alpha = CalculatePitchAngles(date,time,angles,mag,dtype)
 
+	#save a whole day for next time
+	if Cache and Records is None:
+		_SaveIfPossible('LEPe',Date,{'Epoch' : data['Epoch'], 'alpha' : alpha},Source)
+	
 	return alpha
@@ -3,7 +3,7 @@ from .ReadCDF import ReadCDF
 from ..Tools.SpecCls import SpecCls
 import DateTimeTools as TT
 
-def Read3D(Date):
+def Read3D(Date,Variables=None,Records=None):
 	'''
 	Reads the level 2 3dflux data product for a given date.
 	
@@ -11,6 +11,11 @@ def Read3D(Date):
 	======
 	Date : int
 		Integer date in the format yyyymmdd
+	Variables : None or list
+		List of the variables to read (default is all of them).
+	Records : None or tuple
+		(r0,r1) - only read records r0 to r1-1, so that the data can be
+		processed in chunks.
 	
 	Returns
 	=======
@@ -26,7 +31,7 @@ def Read3D(Date):
 	'''
 				
 	#read the CDF file
-	data,meta = ReadCDF(Date,2,'3dflux')		
+	data,meta = ReadCDF(Date,2,'3dflux',Variables,Records)		
 
 	if data is None:
 		return None
@@ -1,11 +1,20 @@
 import numpy as np
 from .Read3D import Read3D
 from .GetPitchAngle import GetPitchAngle
+from ..Tools.SavePitchAngles import PitchAngleSource
 import DateTimeTools as TT
-import DateTimeTools as TT
-from scipy.stats import binned_statistic
+from ..Tools.CalculatePAD import CalculatePAD
+from ..Tools.CombinePADs import CombinePADs
+from ..MGF.InterpObj import InterpObj
+
+#the fields used for each species (energy, flux)
+_Fields = {	'H+Flux' : ('FPDU_Energy','FPDU'),
+			'He+Flux' : ('FHEDU_Energy','FHEDU'),
+			'O+Flux' : ('FODU_Energy','FODU')}
 
-def CalculatePADs(Date,na=18,Verbose=True):
+def CalculatePADs(Date,na=18,Verbose=True,Alpha=None,Energy=None,
+		Weighting=None,Statistic='mean',ChunkSize=None,
+		CachePitchAngles=False,Source=None):
 	'''
 	Calculates a pitch angle distribution of the differential energy flux
 	data using the level 2 3dflux data.
@@ -22,6 +31,31 @@ def CalculatePADs(Date,na=18,Verbose=True):
 		180 degrees
 	Verbose: bool
 		Display progress
+	Alpha : None or float
+		Pitch angle bin edges (degrees), if set then these are used 
+		instead of na uniform bins.
+	Energy : None or float
+		If set, the energy channels are combined into bins with these
+		edges.
+	Weighting : None, str or float
+		None|'solidangle'|'counts' or an array of weights for each 
+		sample (see Arase.Tools.CalculatePAD).
+	Statistic : str
+		'mean'|'median'
+	ChunkSize : None or int
+		If set, the data are read, and the pitch angles calculated and
+		binned, for this many records at a time, so that the memory 
+		used is limited by the chunk size rather than the length of the
+		day. The result is identical to processing the whole day at 
+		once (ChunkSize=None).
+	CachePitchAngles : bool
+		If True, the pitch angles saved for this date are used if they
+		are up to date, otherwise they are calculated and saved (see 
+		GetPitchAngle).
+	Source : None or dict
+		Versions of the 3dflux and MGF data used to check the saved
+		pitch angles (see Arase.Tools.PitchAngleSource), if None they
+		are read from the data indices (once).
 		
 		
 	Returns
@@ -30,80 +64,83 @@ def CalculatePADs(Date,na=18,Verbose=True):
 		Contains a dict for each species
 	
 	'''
-		
-	#for HEP we should average over each sector
-	
-	#this is the output dictionary
-	out = {}
-	
-	#read the 3D data in
-	data,meta = Read3D(Date)
-	
 
-	#calculate alpha
-	alpha = GetPitchAngle(Date,data=data)
-
-	#list the fields used for high and low parts of the data
-	fields = { 	'H+Flux' : ('FPDU_Energy','FPDU'),
-				'He+Flux' : ('FHEDU_Energy','FHEDU'),
-				'O+Flux' : ('FODU_Energy','FODU')}
+	#the PAD configuration
+	if Alpha is None:
+		Alpha = na
+	cfg = {	'Alpha' : Alpha,
+			'Energy' : Energy,
+			'Weighting' : Weighting,
+			'Statistic' : Statistic,
+			'Verbose' : Verbose}
 	
-	#loop through them both
-	for ff in list(fields.keys()):
-		print(ff)
-		fenergy,fflux =  fields[ff]
-		
+	#the versions of the data which saved pitch angles should match,
+	#found once for the whole day
+	if CachePitchAngles and Source is None:
+		Source = PitchAngleSource('LEPi',Date)
 	
-		#determine the size of the output arrays
-		nt = data['Epoch'].size
-		ne = data[fenergy].size
+	if ChunkSize is None:
+		#read the 3D data in
+		data,meta = Read3D(Date)
 		
-		#get the dates/times
-		Date,ut = TT.CDFEpochtoDate(data['Epoch'])
-		utc = TT.ContUT(Date,ut)
+		#calculate alpha
+		alpha = GetPitchAngle(Date,data=data,Cache=CachePitchAngles,Source=Source)
 		
-		#get the energy arrays (shape: (nt,ne))
-		Emid = data[fenergy]
-		lE = np.log10(Emid)
-		dE = np.abs(lE[1:] - lE[:-1])
-		lEmin = np.append(lE[0]-dE[0]/2.0,lE[1:]-dE/2.0)
-		lEmax = np.append(lE[:-1]+dE/2.0,lE[-1]+dE[-1]/2.0,)
-
-		EMin = 10**lEmin
-		EMax = 10**lEmax
+		return _PADs(data,alpha,cfg)
 		
-		#get the alpha limits
-		Alpha = np.linspace(0.0,180.0,na+1)
-
-		#create 3D array for fluxes
-		flux = np.zeros((nt,ne,na),dtype='float32') + np.nan
-		
-		
-		#loop through each dimension (slow!)
-		FLUX = data[fflux]
-		bad = np.where(FLUX <= 0)
-		FLUX[bad] = np.nan
-		for i in range(0,nt):
-			if Verbose:
-				print('\r{:6.2f}%'.format(100.0*(i+1)/nt),end='')
-			for j in range(0,ne):
-				a = alpha[i].flatten()
-				f = FLUX[i,j].flatten()
-				good = np.where(np.isfinite(f))[0]
-				if good.size > 0:
-					flux[i,j],_,_ = binned_statistic(a[good],f[good],statistic='mean',bins=Alpha)
+	#read the times, then the rest of the data in chunks
+	data,meta = Read3D(Date,Variables=['Epoch'])
+	nt = data['Epoch'].size
+	
+	#the mag data for the whole day are used for each chunk
+	date,ut = TT.CDFEpochtoDate(data['Epoch'])
+	mag = InterpObj(np.unique(date),Smooth=8)
+	
+	cfg['Verbose'] = False
+	out = []
+	for r0 in range(0,nt,ChunkSize):
+		r1 = min(r0 + ChunkSize,nt)
 		if Verbose:
-			print()		
-		
-		tmp = {}
-		tmp['Date'] = Date
-		tmp['ut'] = ut
-		tmp['utc'] = utc
-		tmp['Emin'] = EMin
-		tmp['Emax'] = EMax
-		tmp['Alpha'] = Alpha
-		tmp['Flux'] = flux
+			print('\rRecords {:d} to {:d} of {:d}'.format(r0,r1,nt),end='')
+		data,meta = Read3D(Date,Variables=_Variables(),Records=(r0,r1))
+		alpha = GetPitchAngle(Date,data=data,mag=mag,Records=(r0,r1),
+							Cache=CachePitchAngles,Source=Source)
+		out.append(_PADs(data,alpha,cfg))
+		del data,alpha
+	if Verbose:
+		print()
+	
+	return CombinePADs(out)
+	
+def _Variables():
+	'''
+	List the variables needed to calculate the PADs.
+	
+	'''
+	Vars = ['Epoch','FIDU_Angle_gse']
+	for ff in _Fields:
+		Vars = Vars + list(_Fields[ff])
+	return Vars
+
+def _PADs(data,alpha,cfg):
+	'''
+	Calculate the PADs of each species from the 3D data (or a chunk of
+	it) and the pitch angles.
+	
+	'''
+	#this is the output dictionary
+	out = {}
+	
+	#get the dates/times
+	Date,ut = TT.CDFEpochtoDate(data['Epoch'])
+	
+	#loop through each species
+	for ff in list(_Fields.keys()):
+		if cfg['Verbose']:
+			print(ff)
+		fenergy,fflux =  _Fields[ff]
 		
-		out[ff] = tmp
+		#bin all of the fluxes
+		out[ff] = CalculatePAD(Date,ut,alpha,data[fflux],Emid=data[fenergy],**cfg)
 	
 	return out
@@ -4,7 +4,7 @@ from .. import Globals
 from ..Tools.Downloading._ReadDataIndex import _ReadDataIndex
 from ..Tools.ReadCDF import ReadCDF as RCDF
 
-def ReadCDF(Date,L,prod):
+def ReadCDF(Date,L,prod,Variables=None,Records=None):
 	'''
 	Reads the CDF file containing Arase LEPi data.
 
@@ -16,6 +16,11 @@ def ReadCDF(Date,L,prod):
 		Level of data to download
 	prod : str
 		Data product to download
+	Variables : None or list
+		List of the variables to read (default is all of them).
+	Records : None or tuple
+		(r0,r1) - only read records r0 to r1-1 of the record varying 
+		variables.
 
 
 	Available data products
@@ -62,4 +67,4 @@ def ReadCDF(Date,L,prod):
 		return None,None
 		
 	#read the file
-	return RCDF(fname)
+	return RCDF(fname,Variables=Variables,Records=Records)
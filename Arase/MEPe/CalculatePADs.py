@@ -1,11 +1,17 @@
 import numpy as np
 from .Read3D import Read3D
 from .GetPitchAngle import GetPitchAngle
+from ..Tools.SavePitchAngles import PitchAngleSource
+from ..Tools.SavePAD import _DataVersion
+from .ReadIndex import ReadIndex
 import DateTimeTools as TT
-import DateTimeTools as TT
-from scipy.stats import binned_statistic
+from ..Tools.CalculatePAD import CalculatePAD
+from ..Tools.CombinePADs import CombinePADs
+from ..MGF.InterpObj import InterpObj
 
-def CalculatePADs(Date,na=18,Verbose=True):
+def CalculatePADs(Date,na=18,Verbose=True,Alpha=None,Energy=None,
+		Weighting=None,Statistic='mean',ChunkSize=None,PitchAngles='calc',
+		CachePitchAngles=False,Source=None):
 	'''
 	Calculates a pitch angle distribution of the differential energy flux
 	data using the level 2 3dflux data.
@@ -22,74 +28,136 @@ def CalculatePADs(Date,na=18,Verbose=True):
 		180 degrees
 	Verbose: bool
 		Display progress
+	Alpha : None or float
+		Pitch angle bin edges (degrees), if set then these are used 
+		instead of na uniform bins.
+	Energy : None or float
+		If set, the energy channels are combined into bins with these
+		edges.
+	Weighting : None, str or float
+		None|'solidangle'|'counts' or an array of weights for each 
+		sample (see Arase.Tools.CalculatePAD).
+	Statistic : str
+		'mean'|'median'
+	ChunkSize : None or int
+		If set, the data are read, and the pitch angles calculated and
+		binned, for this many records at a time, so that the memory 
+		used is limited by the chunk size rather than the length of the
+		day. The result is identical to processing the whole day at 
+		once (ChunkSize=None).
+	PitchAngles : str
+		'calc' - calculate the pitch angles from the level 2 data.
+		'L3' - use the level 3 pitch angles where they are available
+			(see GetPitchAngle).
+	CachePitchAngles : bool
+		If True, the pitch angles saved for this date are used if they
+		are up to date, otherwise they are calculated and saved (see 
+		GetPitchAngle).
+	Source : None or dict
+		Versions of the 3dflux and MGF data used to check the saved
+		pitch angles (see Arase.Tools.PitchAngleSource), and of the 
+		level 3 data ('3dflux_L3'), any which are needed but not 
+		included are read from the data indices (once).
 		
 		
 	Returns
 	=======
 	out : dict
-		Contains a dict for each species
+		Contains a dict for each species, each includes 'PitchAngles',
+		the method used to get the pitch angles.
 	
 	'''
-		
-	#this is the output dictionary
-	out = {}
+
+	#the PAD configuration
+	if Alpha is None:
+		Alpha = na
+	cfg = {	'Alpha' : Alpha,
+			'Energy' : Energy,
+			'Weighting' : Weighting,
+			'Statistic' : Statistic,
+			'Verbose' : Verbose}
 	
-	#read the 3D data in
-	data,meta = Read3D(Date)
+	#the versions of the data which saved pitch angles should match,
+	#and of the level 3 data, found once for the whole day
+	if Source is None:
+		Source = {}
+	if CachePitchAngles and not '3dflux' in Source:
+		Source = dict(PitchAngleSource('MEPe',Date),**Source)
+	if PitchAngles == 'L3':
+		if not '3dflux_L3' in Source:
+			Source = dict(Source,**{'3dflux_L3' : _DataVersion(ReadIndex(3,'3dflux'),Date)})
+		if Source['3dflux_L3'] < 0:
+			PitchAngles = 'calc'
 	
-	#calculate alpha
-	alpha = GetPitchAngle(Date,data=data)
+	if ChunkSize is None:
+		#read the 3D data in
+		data,meta = Read3D(Date,Variables=_Variables(PitchAngles))
+		
+		#calculate alpha
+		alpha,method = GetPitchAngle(Date,data=data,Method=PitchAngles,ReturnMethod=True,
+							Cache=CachePitchAngles,Source=Source)
+		
+		return _PADs(data,alpha,cfg,method)
+		
+	#read the times, then the rest of the data in chunks
+	data,meta = Read3D(Date,Variables=['epoch'])
+	nt = data['epoch'].size
 	
-	#determine the size of the output arrays
-	nt = data['Epoch'].size
-	ne = data['FEDU_Energy'].size
+	#the mag data for the whole day are used for each chunk (they are
+	#not needed for the level 3 pitch angles)
+	if PitchAngles == 'calc':
+		date,ut = TT.CDFEpochtoDate(data['epoch'])
+		mag = InterpObj(np.unique(date),Smooth=8)
+	else:
+		mag = None
 	
-	#get the dates/times
-	Date,ut = TT.CDFEpochtoDate(data['epoch'])
-	utc = TT.ContUT(Date,ut)
+	cfg['Verbose'] = False
+	out = []
+	for r0 in range(0,nt,ChunkSize):
+		r1 = min(r0 + ChunkSize,nt)
+		if Verbose:
+			print('\rRecords {:d} to {:d} of {:d}'.format(r0,r1,nt),end='')
+		data,meta = Read3D(Date,Variables=_Variables(PitchAngles),Records=(r0,r1))
+		alpha,method = GetPitchAngle(Date,data=data,mag=mag,Records=(r0,r1),
+							Method=PitchAngles,ReturnMethod=True,
+							Cache=CachePitchAngles,Source=Source)
+		out.append(_PADs(data,alpha,cfg,method))
+		del data,alpha
+	if Verbose:
+		print()
 	
-	#get the energy arrays (shape: (nt,ne))
-	Emid = data['FEDU_Energy']
-	lE = np.log10(Emid)
-	dE = np.abs(lE[1:] - lE[:-1])
-	lEmin = np.append(lE[0]-dE[0]/2.0,lE[1:]-dE/2.0)
-	lEmax = np.append(lE[:-1]+dE/2.0,lE[-1]+dE[-1]/2.0,)
+	return CombinePADs(out)
 	
-	EMin = 10**lEmin
-	EMax = 10**lEmax
+def _Variables(PitchAngles):
+	'''
+	List the variables needed to calculate the PADs (the look 
+	directions are only read if the pitch angles are calculated).
 	
-	#get the alpha limits
-	Alpha = np.linspace(0.0,180.0,na+1)
+	'''
+	if PitchAngles == 'L3':
+		return ['epoch','FEDU','FEDU_Energy']
+	return ['epoch','FEDU','FEDU_Energy','FEDU_Angle_gse']
 
-	#create 3D array for fluxes
-	flux = np.zeros((nt,ne,na),dtype='float32') + np.nan
+def _PADs(data,alpha,cfg,method):
+	'''
+	Calculate the PADs of each species from the 3D data (or a chunk of
+	it) and the pitch angles.
 	
+	'''
+	#this is the output dictionary
+	out = {}
 	
-	#loop through each dimension (slow!)
-	FLUX = data['FEDU']
-	bad = np.where(FLUX <= 0)
-	FLUX[bad] = np.nan
-	for i in range(0,nt):
-		if Verbose:
-			print('\r{:6.2f}%'.format(100.0*(i+1)/nt),end='')
-		for j in range(0,ne):
-			a = alpha[i].flatten()
-			f = FLUX[i,:,j].flatten()
-			good = np.where(np.isfinite(f))[0]
-			if good.size > 0:
-				flux[i,j],_,_ = binned_statistic(a[good],f[good],statistic='mean',bins=Alpha)
-	if Verbose:
-		print()		
+	#get the dates/times
+	Date,ut = TT.CDFEpochtoDate(data['epoch'])
 	
-	tmp = {}
-	tmp['Date'] = Date
-	tmp['ut'] = ut
-	tmp['utc'] = utc
-	tmp['Emin'] = EMin
-	tmp['Emax'] = EMax
-	tmp['Alpha'] = Alpha
-	tmp['Flux'] = flux
+	#level 3 pitch angles have an energy axis, like the fluxes
+	if np.ndim(alpha) == np.ndim(data['FEDU']):
+		alpha = np.moveaxis(alpha,2,1)
 	
-	out['eFlux'] = tmp
+	#bin all of the fluxes (with the energy axis moved to be the 
+	#second dimension)
+	out['eFlux'] = CalculatePAD(Date,ut,alpha,np.moveaxis(data['FEDU'],2,1),
+							Emid=data['FEDU_Energy'],**cfg)
+	out['eFlux']['PitchAngles'] = method
 	
 	return out
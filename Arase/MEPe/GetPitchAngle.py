@@ -6,6 +6,10 @@ from scipy.interpolate import interp1d
 from scipy.ndimage import uniform_filter
 from ..Tools.CalculatePitchAngles import CalculatePitchAngles
 from ..MGF.InterpObj import InterpObj
+from ..Tools.ReadPitchAngles import ReadPitchAngles
+from ..Tools.SavePitchAngles import _SaveIfPossible,PitchAngleSource
+from ..Tools.SavePAD import _DataVersion
+from .ReadIndex import ReadIndex
 
 
 # Field			Description				Dimension
@@ -21,11 +25,13 @@ from ..MGF.InterpObj import InterpObj
 
 
 
-def GetPitchAngle(Date,data=None):
+def GetPitchAngle(Date,data=None,mag=None,Records=None,dtype=None,Cache=False,
+		Source=None,Method='calc',ReturnMethod=False):
 	'''
 	Attempt to calculate the pitch angle for each element of the 3D
 	fluxes. This should be contained in the level 3 3dflux data, but is 
-	not available for all instruments yet (at least not publicly). 
+	not available for all instruments yet (at least not publicly), so 
+	it can be used where it exists (Method='L3').
 	
 	WARNING: These pitch angles may not line up exactly with level 3 ones,
 	use with caution (they are usually within ~1 or 2 degrees).
@@ -38,35 +44,136 @@ def GetPitchAngle(Date,data=None):
 		If None, data will be loaded automatically, if data are already 
 		in memory it would be quicker to set this keyword to save 
 		reloading.
+	mag : None or tuple
+		MGF interpolation objects (see Arase.MGF.InterpObj), if None 
+		then these are created from the MGF data.
+	Records : None or tuple
+		(r0,r1) - only return the pitch angles of these records (if 
+		data is set, it should contain only these records).
+	dtype : None or str
+		Precision of the pitch angles, e.g. 'float32' (see 
+		Arase.Tools.CalculatePitchAngles).
+	Cache : bool
+		If True, pitch angles saved for this date (see 
+		Arase.Tools.SavePitchAngles) are used where they match the
+		times of the data and the versions of the 3dflux and MGF data 
+		(Source), and the pitch angles of a whole day are saved after
+		they are calculated.
+	Source : None or dict
+		The versions of the 3dflux and MGF data used to check saved 
+		pitch angles (see Arase.Tools.PitchAngleSource), and for 
+		Method='L3' the version of the level 3 data ('3dflux_L3'). Any
+		which are needed but not included are read from the data 
+		indices.
+	Method : str
+		'calc' - calculate the pitch angles from the level 2 look
+			directions and the MGF data, shape (nt,ns,na).
+		'L3' - use the pitch angles of each energy bin in the level 3
+			3dflux data (FEDU_alpha), shape (nt,ns,ne,na), where the
+			level 3 file for this date is in the data index and has 
+			the same records as the level 2 data, otherwise fall back
+			to 'calc'.
+	ReturnMethod : bool
+		If True, the method which was actually used is also returned.
 	
 	Returns
 	=======
-	Array(s) of pitch angles
+	Array(s) of pitch angles (and the method used if ReturnMethod is 
+	True)
 
 	'''
 	
+	if not Method in ['calc','L3']:
+		raise ValueError("Method should be 'calc' or 'L3'")
+	if Source is None:
+		Source = {}
+	
+	#check that the level 3 data exist
+	if Method == 'L3':
+		if not '3dflux_L3' in Source:
+			Source = dict(Source,**{'3dflux_L3' : _DataVersion(ReadIndex(3,'3dflux'),Date)})
+		if Source['3dflux_L3'] < 0:
+			Method = 'calc'
+	
+	#the versions of the data which the saved pitch angles should match
+	if Cache and Method == 'calc' and not '3dflux' in Source:
+		Source = dict(PitchAngleSource('MEPe',Date),**Source)
+	src = _CacheSource(Source,Method)
+	
+	#use the saved pitch angles if they match the data
+	if Cache:
+		saved = ReadPitchAngles('MEPe',Date,Records,Source=src)
+		if not saved is None and (data is None or np.array_equal(saved['epoch'],data['epoch'])):
+			alpha = np.array(saved['alpha'],dtype=dtype)
+			if ReturnMethod:
+				return alpha,Method
+			return alpha
+	
 	#read in the 3dflux level 2 data
 	if data is None:
-		data,meta = Read3D(Date,2)
+		Variables = ['epoch'] if Method == 'L3' else ['epoch','FEDU_Angle_gse']
+		data,meta = Read3D(Date,2,Variables=Variables,Records=Records)
+
 	#read in the 3dflux level 3 data
-	#data3,meta3 = Read3D(Date,3)
-	
-	#get the elevation/angle data
-	angles = data['FEDU_Angle_gse']*np.pi/180.0
+	if Method == 'L3':
+		alpha = _L3PitchAngle(Date,data['epoch'],Records,dtype)
+		if alpha is None:
+			Method = 'calc'
+			if Cache and not '3dflux' in Source:
+				Source = dict(PitchAngleSource('MEPe',Date),**Source)
+			src = _CacheSource(Source,Method)
+			if not 'FEDU_Angle_gse' in data:
+				data = dict(data,**Read3D(Date,2,Variables=['FEDU_Angle_gse'],Records=Records)[0])
 	
-	#get the time and date
-	date,time = TT.CDFEpochtoDate(data['epoch'])
+	if Method == 'calc':
+		#get the elevation/angle data
+		angles = data['FEDU_Angle_gse']*np.pi/180.0
 		
-	#call the function to retrieve pitch angles
-	alpha = CalculatePitchAngles(date,time,angles,None)
+		#get the time and date
+		date,time = TT.CDFEpochtoDate(data['epoch'])
+			
+		#call the function to retrieve pitch angles
+		alpha = CalculatePitchAngles(date,time,angles,mag,dtype)
+		
+		#transpose the new alpha such that the dimensions are in the same
+		#order as the  original
+		alpha = np.transpose(alpha,(0,2,1))
+	
+	
+	#save a whole day for next time
+	if Cache and Records is None:
+		_SaveIfPossible('MEPe',Date,{'epoch' : data['epoch'], 'alpha' : alpha},src)
+	
+	if ReturnMethod:
+		return alpha,Method
+	return alpha
 
-	#get the original, average over the energy bin directions
-	#alpha0 = data3['FEDU_alpha']
-	#alpha0 = np.nanmean(alpha0,axis=2)
+def _CacheSource(Source,Method):
+	'''
+	The versions of the data which saved pitch angles must match for
+	each method.
 	
-	#transpose the new alpha such that the dimensions are in the same
-	#order as the  original
-	alpha = np.transpose(alpha,(0,2,1))
+	'''
+	if Method == 'L3':
+		keys = ['3dflux_L3']
+	else:
+		keys = ['3dflux','MGF']
+	return {k : Source[k] for k in keys if k in Source}
+
+def _L3PitchAngle(Date,epoch,Records,dtype):
+	'''
+	Pitch angles of each energy bin from the level 3 data, or None if
+	the level 3 records don't match the level 2 ones.
 	
+	'''
+	tmp = Read3D(Date,3,Variables=['epoch','FEDU_alpha'],Records=Records)
+	if tmp is None:
+		return None
+	data3,meta3 = tmp
+	if not np.array_equal(data3['epoch'],epoch):
+		return None
 	
-	return alpha#,alpha0
+	#remove fill values
+	alpha = np.array(data3['FEDU_alpha'],dtype=dtype)
+	alpha[(alpha < 0) | (alpha > 180)] = np.nan
+	return alpha
@@ -7,10 +7,23 @@ from .. import Globals
 import DateTimeTools as TT
 from .. import MGF
 
-def SaveMirrorAlts(Date,na=18,Overwrite=False,Verbose=False):
+def SaveMirrorAlts(Date,na=18,Overwrite=False,Verbose=False,magidx=None):
 	'''
 	Save the mirroring altitudes and field strengths to file.
 	
+	Inputs
+	======
+	Date : int
+		Date(s) to save, in the format yyyymmdd.
+	na : int
+		Number of pitch angle bins.
+	Overwrite : bool
+		Overwrite existing files.
+	Verbose : bool
+		Display progress.
+	magidx : None or numpy.recarray
+		The MGF 8sec data index, if None then it is read here.
+	
 	'''
 	#populate the list of dates to save
 	if np.size(Date) == 1:
@@ -23,7 +36,8 @@ def SaveMirrorAlts(Date,na=18,Overwrite=False,Verbose=False):
 	path = Globals.DataPath + 'MEPe/PAD/'
 		
 	#read the data index to see what data we have
-	magidx = MGF.ReadIndex(2,'8sec')
+	if magidx is None:
+		magidx = MGF.ReadIndex(2,'8sec')
 	
 	for date in dates:	
 		print('Saving date {:08d}'.format(date))
@@ -3,7 +3,7 @@ from .ReadCDF import ReadCDF
 from ..Tools.SpecCls import SpecCls
 import DateTimeTools as TT
 
-def Read3D(Date,L=2):
+def Read3D(Date,L=2,Variables=None,Records=None):
 	'''
 	Reads the level 2 3dflux data product for a given date.
 	
@@ -11,6 +11,11 @@ def Read3D(Date,L=2):
 	======
 	Date : int
 		Integer date in the format yyyymmdd
+	Variables : None or list
+		List of the variables to read (default is all of them).
+	Records : None or tuple
+		(r0,r1) - only read records r0 to r1-1, so that the data can be
+		processed in chunks.
 	
 	Returns
 	=======
@@ -26,7 +31,7 @@ def Read3D(Date,L=2):
 	'''
 				
 	#read the CDF file
-	data,meta = ReadCDF(Date,L,'3dflux')		
+	data,meta = ReadCDF(Date,L,'3dflux',Variables,Records)		
 
 	if data is None:
 		return None
@@ -61,9 +66,11 @@ def Read3D(Date,L=2):
 	# out['SpectraL'] = SpecCls(out['DateL'],out['utL'],out['EpochL'],eL,L,Meta=meta['FEDO_L'])
 	# out['SpectraH'] = SpecCls(out['DateH'],out['utH'],out['EpochH'],eH,H,Meta=meta['FEDO_H'])
 		
-	data['Epoch'] = data['epoch']
-	data['Date'],data['ut'] = TT.CDFEpochtoDate(data['epoch'])
-	data['EpochSP'] = data['epoch_sp']
-	data['DateSP'],data['utSP'] = TT.CDFEpochtoDate(data['epoch_sp'])		
+	if 'epoch' in data:
+		data['Epoch'] = data['epoch']
+		data['Date'],data['ut'] = TT.CDFEpochtoDate(data['epoch'])
+	if 'epoch_sp' in data:
+		data['EpochSP'] = data['epoch_sp']
+		data['DateSP'],data['utSP'] = TT.CDFEpochtoDate(data['epoch_sp'])		
 	
 	return data,meta
@@ -1,6 +1,7 @@
 from .. import Globals
 import numpy as np
 from ..Tools.Downloading._DownloadData import _DownloadData
+from .InterpObj import ClearCache
 
 def DownloadData(L,prod,Date=[20170101,20200101],Overwrite=False,Verbose=True):
 	'''
@@ -35,3 +36,6 @@ def DownloadData(L,prod,Date=[20170101,20200101],Overwrite=False,Verbose=True):
 	datapath = Globals.DataPath + 'MGF/l{:01d}/{:s}/'.format(L,prod)
 	
 	_DownloadData(url0,idxfname,datapath,Date,vfmt,Overwrite,Verbose)
+	
+	#interpolation objects made from the old data can't be reused
+	ClearCache()
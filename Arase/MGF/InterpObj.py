@@ -3,12 +3,59 @@ from .ReadMGF import ReadMGF
 from scipy.interpolate import interp1d
 from scipy.ndimage import uniform_filter
 import DateTimeTools as TT
+import os
+from .. import Globals
+
+#interpolation objects which have already been created, keyed by the
+#dates, coordinates, smoothing and the modification time of the data
+#index (only the most recent few are kept)
+_Cache = {}
+_CacheSize = 4
+
+def _IndexTime():
+	'''
+	Modification time of the MGF data index, this changes whenever data
+	are downloaded or deleted (by any process).
 
-def InterpObj(Date,Coords='GSE',Smooth=None):
+	'''
+	idxfname = Globals.DataPath + 'MGF/Index-L2-8sec.dat'
+	if os.path.isfile(idxfname):
+		return os.path.getmtime(idxfname)
+	return None
+
+def ClearCache():
+	'''
+	Remove all of the cached interpolation objects.
+
+	'''
+	_Cache.clear()
+
+def InterpObj(Date,Coords='GSE',Smooth=None,Cache=True):
 	'''
 	Return interpolation objects for MGF data.
 	
+	Inputs
+	======
+	Date : int
+		Date(s) to read (see ReadMGF).
+	Coords : str
+		Coordinate system, e.g. 'GSE'.
+	Smooth : None or int
+		If set, the width (in records) of a running mean applied to the
+		field.
+	Cache : bool
+		If True, the interpolation objects are reused by later calls
+		with the same inputs, rather than being created again (unless
+		the MGF data have been downloaded or deleted since).
+	
+	Returns
+	=======
+	fx,fy,fz : interpolation objects for each component.
+	
 	'''
+	key = (tuple(np.array([Date]).flatten().tolist()),Coords,Smooth,_IndexTime())
+	if Cache and key in _Cache:
+		return _Cache[key]
 	
 	#read the data in
 	mag = ReadMGF(Date)
@@ -36,5 +83,9 @@ def InterpObj(Date,Coords='GSE',Smooth=None):
 		fy = interp1d(mutc,uniform_filter(mag['By'+Coords],Smooth),bounds_error=False,fill_value='extrapolate')
 		fz = interp1d(mutc,uniform_filter(mag['Bz'+Coords],Smooth),bounds_error=False,fill_value='extrapolate')
 		
+	if Cache:
+		if len(_Cache) >= _CacheSize:
+			_Cache.pop(next(iter(_Cache)))
+		_Cache[key] = (fx,fy,fz)
 		
 	return fx,fy,fz
@@ -0,0 +1,36 @@
+import numpy as np
+
+def ArrayFileIndex(fname,dtypes):
+	'''
+	Find the shape and position of each array in a file written using
+	a sequence of PyFileIO.ArrayToFile calls, without reading the 
+	arrays themselves.
+	
+	Inputs
+	======
+	fname : str
+		Name of the file.
+	dtypes : list
+		dtype of each array in the file.
+		
+	Returns
+	=======
+	out : list
+		A dict for each array found, containing its 'dtype', 'shape' 
+		and 'offset' (bytes from the start of the file).
+		
+	'''
+	out = []
+	with open(fname,'rb') as f:
+		for dtype in dtypes:
+			n = np.fromfile(f,dtype='int32',count=1)
+			if n.size == 0:
+				break
+			ns = np.fromfile(f,dtype='int32',count=1)[0]
+			sh = np.fromfile(f,dtype='int32',count=ns)
+			dtype = np.dtype(dtype)
+			out.append({	'dtype' : dtype.str,
+							'shape' : [int(x) for x in sh],
+							'offset' : f.tell()})
+			f.seek(int(n[0])*dtype.itemsize,1)
+	return out
@@ -0,0 +1,240 @@
+import numpy as np
+import os
+import time
+import inspect
+import importlib
+import multiprocessing as mp
+import matplotlib
+from .. import Globals
+from .ListDates import ListDates
+from .Downloading._ReadDataIndex import _ReadDataIndex
+
+#the data directory used for each stack plot panel
+PanelDirs = {	'XEP' : 'XEP',
+				'HEP-H' : 'HEP',
+				'HEP-L' : 'HEP',
+				'MEPe' : 'MEPe',
+				'LEPe' : 'LEPe',
+				'MEPi' : 'MEPi',
+				'LEPi' : 'LEPi'}
+
+def _PlotModule(name):
+	'''
+	Import an Arase submodule (done when needed, as most of them import
+	Arase.Tools).
+
+	'''
+	return importlib.import_module('..'+name,__package__)
+
+def _IndexFiles(idxfname,datapath,Date):
+	'''
+	List the files of a date in a data index.
+
+	'''
+	idx = _ReadDataIndex(idxfname)
+	use = np.where(idx.Date == Date)[0]
+	return [datapath + f for f in idx.FileName[use]]
+
+def _SourceFiles(Date,Layout):
+	'''
+	List the data files used to create a figure.
+
+	'''
+	if Layout['Plot'] == 'PAD':
+		path = Globals.DataPath + Layout['Instrument'] + '/PAD/{:08d}/'.format(Date)
+		return [path + Layout['SpecType'] + '.bin',path + 'Mirror.bin']
+
+	#omniflux files for each stack plot panel
+	Instruments = Layout.get('kwargs',{}).get('Instruments',None)
+	if Instruments is None:
+		StackPlot = _PlotModule(Layout['Plot']).StackPlot
+		Instruments = inspect.signature(StackPlot).parameters['Instruments'].default
+	out = []
+	for d in np.unique([PanelDirs[I] for I in Instruments if I in PanelDirs]):
+		out += _IndexFiles(Globals.DataPath + d + '/Index-L2-omniflux.dat',
+							Globals.DataPath + d + '/l2/omniflux/',Date)
+	return out
+
+def _AncillaryFiles(Date,Layout):
+	'''
+	List the other files which a figure depends on: the orbit and field
+	trace files used for the position axis and, for PADs, the MGF data
+	used for the loss cone (via the mirror altitudes).
+
+	'''
+	out = []
+	if Layout.get('kwargs',{}).get('PosAxis',True):
+		out.append(Globals.DataPath + 'Traces/T96/{:08d}.bin'.format(Date))
+		out += _IndexFiles(Globals.DataPath + 'Pos/Index-def.dat',
+							Globals.DataPath + 'Pos/def/',Date)
+	if Layout['Plot'] == 'PAD':
+		out += _IndexFiles(Globals.DataPath + 'MGF/Index-L2-8sec.dat',
+							Globals.DataPath + 'MGF/l2/8sec/',Date)
+	return out
+
+def _OutputFile(path,Date,Layout):
+	'''
+	Output file name for a figure.
+
+	'''
+	return path + Layout['Name'] + '/' + Layout['Name'] + '-{:08d}.png'.format(Date)
+
+def _IsUpToDate(fname,sources):
+	'''
+	Check whether a figure is newer than all of its (existing) data
+	files and ancillary files.
+
+	'''
+	if not os.path.isfile(fname):
+		return False
+	mt = [os.path.getmtime(f) for f in sources if os.path.isfile(f)]
+	return len(mt) > 0 and os.path.getmtime(fname) > max(mt)
+
+def _InitWorker():
+	'''
+	Make sure that the worker processes (or this process, when only 
+	one is used) never open any windows.
+
+	'''
+	import matplotlib
+	matplotlib.use('Agg')
+
+def _RenderQuicklook(job):
+	'''
+	Create and save a single figure, returning its status and the time
+	taken.
+
+	'''
+	Date,Layout,fname,dpi = job
+	import matplotlib.pyplot as plt
+	t0 = time.time()
+	figs = plt.get_fignums()
+	try:
+		kwargs = Layout.get('kwargs',{})
+		if Layout['Plot'] == 'PAD':
+			pad = _PlotModule(Layout['Instrument']).ReadPAD(Date,Layout['SpecType'])
+			if pad is None:
+				return Date,Layout['Name'],fname,'nodata',time.time() - t0
+			pad.PlotSpectrogramStack(**kwargs)
+			fig = plt.gcf()
+		else:
+			fig,_ = _PlotModule(Layout['Plot']).StackPlot(Date,**kwargs)
+
+		#write to a temporary file first, so that a failed save never
+		#looks up to date
+		odir = os.path.dirname(fname)
+		if not os.path.isdir(odir):
+			os.makedirs(odir,exist_ok=True)
+		fig.savefig(fname + '.tmp.png',dpi=dpi)
+		os.replace(fname + '.tmp.png',fname)
+		status = 'done'
+	except Exception as e:
+		status = 'failed: ' + repr(e)
+	for f in plt.get_fignums():
+		if not f in figs:
+			plt.close(f)
+	return Date,Layout['Name'],fname,status,time.time() - t0
+
+def BatchQuicklooks(Date,Layouts,path,nProc=None,Overwrite=False,dpi=100,
+					Verbose=True):
+	'''
+	Create quicklook figures for a range of dates using a pool of
+	worker processes (using the non-interactive Agg backend). Figures
+	which are newer than the data files they are created from
+	(including the position and MGF files) are skipped.
+
+	Inputs
+	======
+	Date : int
+		Date(s) to plot in the format yyyymmdd. If a single date, only
+		that one is plotted. If 2-element array - dates from Date[0] to
+		Date[1] are plotted. If > 2 elements - this is treated as a
+		specific list of dates.
+	Layouts : list
+		List of dicts describing each figure to create for each date,
+		containing the following:
+			'Name' : name of the figure (used for the file name)
+			'Plot' : 'Electrons'|'Ions'|'PAD' - either a stack plot
+				(see Arase.Electrons.StackPlot and Arase.Ions.StackPlot)
+				or a stack of PAD spectrograms (see
+				PSpecPADCls.PlotSpectrogramStack)
+			'Instrument' : (PAD only) e.g. 'MEPe'|'HEP'
+			'SpecType' : (PAD only) e.g. 'eFlux'
+			'kwargs' : (optional) keywords passed to the plotting
+				function
+		e.g. [{'Name' : 'Electrons', 'Plot' : 'Electrons',
+			'kwargs' : {'PosAxis' : False}}]
+	path : str
+		Output directory, figures are saved as
+		path/Name/Name-yyyymmdd.png.
+	nProc : None or int
+		Number of processes to use, if None then the number of CPUs
+		is used. If 1, then the figures are created in this process.
+	Overwrite : bool
+		If True, existing figures are recreated even if they are up to
+		date.
+	dpi : int
+		Resolution of the saved figures.
+	Verbose : bool
+		If True, the time taken to create each figure is printed.
+
+	Returns
+	=======
+	out : numpy.recarray
+		Status of each figure: 'done'|'uptodate'|'nodata'|'failed: ...'
+		and the time taken to create it (seconds).
+
+	'''
+	#list the dates
+	if np.size(Date) == 2:
+		dates = ListDates(Date[0],Date[1])
+	else:
+		dates = np.array([Date]).flatten()
+	if not path.endswith('/'):
+		path = path + '/'
+
+	#work out which figures need creating
+	dtype = [('Date','int32'),('Name','object'),('FileName','object'),
+			('Status','object'),('Time','float64')]
+	out = []
+	jobs = []
+	for d in dates:
+		for L in Layouts:
+			fname = _OutputFile(path,d,L)
+			sources = _SourceFiles(d,L)
+			if not any([os.path.isfile(f) for f in sources]):
+				out.append((d,L['Name'],fname,'nodata',0.0))
+			elif not Overwrite and _IsUpToDate(fname,sources + _AncillaryFiles(d,L)):
+				out.append((d,L['Name'],fname,'uptodate',0.0))
+			else:
+				jobs.append((d,L,fname,dpi))
+
+	#create them
+	if nProc is None:
+		nProc = mp.cpu_count()
+	nProc = max(1,min(nProc,len(jobs)))
+	if nProc == 1:
+		#render in this process, but still without opening any windows
+		backend = matplotlib.get_backend()
+		_InitWorker()
+		results = map(_RenderQuicklook,jobs)
+	else:
+		pool = mp.get_context('spawn').Pool(nProc,initializer=_InitWorker)
+		results = pool.imap_unordered(_RenderQuicklook,jobs)
+	try:
+		for r in results:
+			if Verbose:
+				print('{:08d} {:s}: {:s} ({:5.2f} s)'.format(r[0],r[1],r[3],r[4]))
+			out.append(r)
+	finally:
+		if nProc > 1:
+			pool.close()
+			pool.join()
+		else:
+			matplotlib.use(backend)
+
+	out.sort(key=lambda x: (x[0],x[1]))
+	res = np.recarray(len(out),dtype=dtype)
+	for i,r in enumerate(out):
+		res[i] = r
+	return res
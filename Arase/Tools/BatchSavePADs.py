@@ -0,0 +1,272 @@
+import numpy as np
+import os
+import json
+import time
+import importlib
+import multiprocessing as mp
+import contextlib
+from .. import Globals
+from .. import MGF
+from ..MGF.DownloadData import DownloadData as DownloadMGF
+from .ListDates import ListDates
+from .SavePAD import SavePAD,_DataVersion
+
+#limits the number of simultaneous downloads in each worker process
+_Throttle = None
+
+def _InitWorker(Throttle):
+	'''
+	Store the download semaphore in each worker process.
+
+	'''
+	global _Throttle
+	_Throttle = Throttle
+
+def _StatusFile(Instrument,Date):
+	'''
+	Name of the file containing the status of a date (these are kept
+	outside of the PAD directory, so that they are never mistaken for
+	data files).
+
+	'''
+	return Globals.DataPath + Instrument + '/PADStatus/{:08d}.json'.format(Date)
+
+def ReadPADStatus(Instrument,Date):
+	'''
+	Read the status of a date recorded by BatchSavePADs.
+
+	Inputs
+	======
+	Instrument : str
+		e.g. 'MEPe'|'MEPi'|'LEPe'|'LEPi'|'HEP'
+	Date : int
+		Date in the format yyyymmdd.
+
+	Returns
+	=======
+	status : dict
+		Containing 'Date', 'Status' ('pending'|'running'|'done'|
+		'nodata'|'failed', or None if the date has never been
+		processed), 'Error' and 'Time'.
+
+	'''
+	fname = _StatusFile(Instrument,Date)
+	try:
+		with open(fname,'r') as f:
+			return json.load(f)
+	except (OSError,ValueError):
+		return {'Date' : int(Date), 'Status' : None, 'Error' : '', 'Time' : 0.0}
+
+def _WriteStatus(Instrument,Date,Status,Error='',Time=0.0):
+	'''
+	Write the status of a date, using a temporary file so that a
+	partially written status is never read.
+
+	'''
+	fname = _StatusFile(Instrument,Date)
+	odir = os.path.dirname(fname)
+	if not os.path.isdir(odir):
+		os.makedirs(odir,exist_ok=True)
+	with open(fname + '.tmp','w') as f:
+		json.dump({'Date' : int(Date), 'Status' : Status, 'Error' : Error, 'Time' : Time},f)
+	os.replace(fname + '.tmp',fname)
+
+def _SaveInstrumentDate(Instrument,SpecTypes,date,ReadIndex,DownloadData,
+		DeleteDate,CalculatePADs,SaveMirrorAlts,na=18,Overwrite=False,
+		DownloadMissingData=True,DeleteNewData=True,Verbose=True,
+		Throttle=None,ChunkSize=None,Compress=False,CachePitchAngles=False,
+		PitchAngles=None):
+	'''
+	Save the PADs for a single date of one instrument, returning 'done'
+	or 'nodata'. Downloads, deletions and reading the data indices are
+	done while holding Throttle (a semaphore shared by the worker 
+	processes), the indices are then passed on rather than read again.
+	
+	Inputs
+	======
+	Instrument : str
+		'MEPe'|'MEPi'|'LEPe'|'LEPi'|'HEP'
+	SpecTypes : list
+		Names of the PAD files saved for each date, e.g. ['eFlux'].
+	date : int
+		Date in the format yyyymmdd.
+	ReadIndex, DownloadData, DeleteDate, CalculatePADs, SaveMirrorAlts :
+		The instrument's own functions.
+	PitchAngles : None or str
+		If set, this is passed on to CalculatePADs (MEPe only) and the
+		method used is stored with the PADs.
+	
+	See the instrument's SavePADs for the other keywords.
+	
+	'''
+	if Throttle is None:
+		Throttle = contextlib.nullcontext()
+		
+	path = Globals.DataPath + Instrument + '/PAD/'
+	print('Saving date {:08d}'.format(date))
+	
+	#nothing needs downloading or calculating if the files exist
+	outpath = path + '{:08d}/'.format(date)
+	if not Overwrite and all([os.path.isfile(outpath + s + '.bin') for s in SpecTypes]):
+		if not os.path.isfile(outpath + 'Mirror.bin'):
+			SaveMirrorAlts(date,na,Overwrite,Verbose=Verbose)
+		return 'done'
+		
+	#check if the 3dflux and MGF data exist (the data indices are
+	#updated by the downloads, so are read while holding the lock)
+	downloadednew = False
+	with Throttle:
+		idx3d = ReadIndex(2,'3dflux')
+		exists3d = date in idx3d.Date
+		if not exists3d and DownloadMissingData:
+			DownloadData(2,'3dflux',date,Verbose=Verbose)
+			idx3d = ReadIndex(2,'3dflux')
+			exists3d = date in idx3d.Date
+			downloadednew = True
+		magidx = MGF.ReadIndex(2,'8sec')
+		existsmag = date in magidx.Date
+		if not existsmag and DownloadMissingData:
+			DownloadMGF(2,'8sec',date,Verbose=Verbose)
+			magidx = MGF.ReadIndex(2,'8sec')
+			existsmag = date in magidx.Date
+	
+		#versions of the data used, stored with the PADs
+		Source = {	'3dflux' : _DataVersion(idx3d,date),
+					'MGF' : _DataVersion(magidx,date)}
+		if PitchAngles == 'L3':
+			Source['3dflux_L3'] = _DataVersion(ReadIndex(3,'3dflux'),date)
+	
+	if existsmag and exists3d:
+		kwargs = {}
+		if not PitchAngles is None:
+			kwargs['PitchAngles'] = PitchAngles
+		pad = CalculatePADs(date,na,Verbose,ChunkSize=ChunkSize,
+						CachePitchAngles=CachePitchAngles,Source=dict(Source),
+						**kwargs)
+		if not PitchAngles is None:
+			Source['PitchAngles'] = pad[SpecTypes[0]].get('PitchAngles')
+		SavePAD(date,path,pad,Overwrite,Compress=Compress,Source=Source)
+
+	if downloadednew and DeleteNewData:
+		with Throttle:
+			DeleteDate(date,2,'3dflux',False)
+
+	#save mirror stuff if needed
+	if not os.path.isfile(outpath + 'Mirror.bin'):
+		SaveMirrorAlts(date,na,Overwrite,Verbose=Verbose,magidx=magidx)
+	
+	if existsmag and exists3d:
+		return 'done'
+	return 'nodata'
+
+def _SaveDate(job):
+	'''
+	Save the PADs for a single date, recording its status before and
+	after.
+
+	'''
+	Instrument,Date,kwargs = job
+	mod = importlib.import_module('..' + Instrument + '.SavePADs',__package__)
+	t0 = time.time()
+	_WriteStatus(Instrument,Date,'running')
+	try:
+		status = mod._SavePADDate(Date,Throttle=_Throttle,**kwargs)
+		err = ''
+	except Exception as e:
+		status = 'failed'
+		err = repr(e)
+	dt = time.time() - t0
+	_WriteStatus(Instrument,Date,status,err,dt)
+	return Date,status,err,dt
+
+def BatchSavePADs(Instrument,Date,nProc=1,MaxDownloads=1,Overwrite=False,
+					Verbose=True,**kwargs):
+	'''
+	Save the PADs (and mirror altitudes) for a range of dates, either
+	one after the other or using a pool of worker processes. The
+	status of each date is recorded as it is processed, so that
+	calling this again after an interruption (or a failure) only
+	processes the dates which were not finished.
+
+	Inputs
+	======
+	Instrument : str
+		'MEPe'|'MEPi'|'LEPe'|'LEPi'|'HEP'
+	Date : int
+		Date to save data for in format yyyymmdd
+		If single date - only data from that one day will be saved
+		If 2-element array - dates from Date[0] to Date[1] will be saved
+		If > 2 elements - this is treated as a specific list of dates
+	nProc : None or int
+		Number of processes to use, if None then the number of CPUs
+		is used. If 1, then the dates are processed in this process.
+	MaxDownloads : int
+		Maximum number of worker processes which may download (or
+		delete) data at the same time. These also update the data
+		indices, so this should normally be 1.
+	Overwrite : bool
+		If True, dates which have already been done are processed again
+		and their files are overwritten.
+	Verbose : bool
+		Display progress.
+	**kwargs
+		Other keywords passed to the instrument's SavePADs (e.g. na,
+		DownloadMissingData, DeleteNewData).
+
+	Returns
+	=======
+	out : numpy.recarray
+		Status of each date: 'done'|'nodata'|'failed' (with the error
+		in 'Error') or 'skipped' if it had already been done, and the
+		time taken (seconds).
+
+	'''
+	#populate the list of dates to save
+	if np.size(Date) == 1:
+		dates = np.array([Date]).flatten()
+	elif np.size(Date) == 2:
+		dates = ListDates(Date[0],Date[1])
+	else:
+		dates = np.array([Date]).flatten()
+
+	#skip the dates which are already done, anything left as 'running'
+	#was interrupted so it is done again
+	dtype = [('Date','int32'),('Status','object'),('Error','object'),('Time','float64')]
+	out = []
+	jobs = []
+	kwargs['Overwrite'] = Overwrite
+	kwargs['Verbose'] = Verbose
+	for d in dates:
+		if not Overwrite and ReadPADStatus(Instrument,d)['Status'] == 'done':
+			out.append((d,'skipped','',0.0))
+		else:
+			_WriteStatus(Instrument,d,'pending')
+			jobs.append((Instrument,int(d),kwargs))
+
+	#process them
+	if nProc is None:
+		nProc = mp.cpu_count()
+	nProc = max(1,min(nProc,len(jobs)))
+	if nProc == 1:
+		results = map(_SaveDate,jobs)
+	else:
+		ctx = mp.get_context('spawn')
+		pool = ctx.Pool(nProc,initializer=_InitWorker,
+						initargs=(ctx.BoundedSemaphore(MaxDownloads),))
+		results = pool.imap_unordered(_SaveDate,jobs)
+	try:
+		for r in results:
+			if Verbose:
+				print('{:08d}: {:s} ({:5.1f} s) {:s}'.format(r[0],r[1],r[3],r[2]))
+			out.append(r)
+	finally:
+		#any dates still running when interrupted are left as 'running'
+		if nProc > 1:
+			pool.terminate()
+			pool.join()
+
+	out.sort(key=lambda x: x[0])
+	res = np.recarray(len(out),dtype=dtype)
+	for i,r in enumerate(out):
+		res[i] = r
+	return res
@@ -0,0 +1,171 @@
+import numpy as np
+
+def _AlphaBins(alpha,Alpha):
+	'''
+	Find the pitch angle bin of each sample, in the same way as
+	scipy.stats.binned_statistic (values on the last edge are included
+	in the last bin), -1 where a sample is outside of the bins.
+
+	'''
+	na = Alpha.size - 1
+	ab = np.digitize(alpha,Alpha) - 1
+	decimal = int(-np.log10(np.diff(Alpha).min())) + 6
+	edge = (alpha >= Alpha[-1]) & (np.around(alpha,decimal) == np.around(Alpha[-1],decimal))
+	ab[edge] -= 1
+	ab[(ab < 0) | (ab >= na)] = -1
+	return ab
+
+def _BinMedian(cell,f,ncell):
+	'''
+	Median of the samples in each bin, NaN where there are none.
+
+	'''
+	srt = np.lexsort((f,cell))
+	v = f[srt]
+	c = np.bincount(cell,minlength=ncell)
+	use = np.where(c > 0)[0]
+	s0 = np.cumsum(c) - c
+	lo = s0[use] + (c[use] - 1)//2
+	hi = s0[use] + c[use]//2
+	out = np.zeros(ncell,dtype='float64') + np.nan
+	out[use] = 0.5*(v[lo] + v[hi])
+	return out
+
+def BinPitchAngles(alpha,Flux,Alpha,i0=None,i1=None,ChunkSize=1024,Verbose=False,
+					Weights=None,EnergyIndex=None,Statistic='mean'):
+	'''
+	Calculate the mean flux within each pitch angle bin, for every
+	record and energy at once. The samples are sorted into bins using
+	a single np.bincount per chunk of records over the flattened
+	(record,energy,alpha bin) indices, giving exactly the same means
+	as calling scipy.stats.binned_statistic for each record and energy.
+	Optionally the samples may be weighted, the energy channels may be
+	combined into fewer bins, or the median may be used instead.
+
+	Inputs
+	======
+	alpha : float
+		Pitch angle of each sample (degrees), shape (nr,...), where the
+		remaining dimensions (e.g. sector and anode) are flattened, or
+		(nr,ne,...) like Flux where the pitch angles differ between the
+		energy channels.
+	Flux : float
+		Flux of each sample, shape (nr,ne,...), where the remaining
+		dimensions match those of alpha. Samples which are not finite
+		are ignored.
+	Alpha : float
+		Pitch angle bin edges (degrees), shape (na+1,).
+	i0 : None or int
+		If set, the start index of the input records which are combined
+		into each output record (e.g. all of the sectors of a spin),
+		these should be in ascending order and not overlap.
+	i1 : None or int
+		End index (exclusive) of the records combined for each output
+		record.
+	ChunkSize : int
+		Number of output records to bin at once, this limits the size
+		of the temporary index arrays.
+	Verbose : bool
+		Display progress.
+	Weights : None or float
+		Weight of each sample, either shape (nr,...) like alpha, or
+		(nr,ne,...) like Flux. If None then all of the samples are
+		weighted equally. Bins where the weights sum to zero are NaN.
+	EnergyIndex : None or int
+		Output energy bin of each energy channel (-1 to ignore a
+		channel), shape (ne,) or (nr,ne). If None, each channel is
+		kept separately.
+	Statistic : str
+		'mean'|'median' - the median can not be weighted.
+
+	Returns
+	=======
+	flux : float32
+		Mean (or median) flux in each bin, shape (nt,neo,na), where neo
+		is ne unless EnergyIndex is set. NaN where there are no samples.
+
+	'''
+	if not Statistic in ['mean','median']:
+		raise ValueError('Statistic should be either \'mean\' or \'median\'')
+	if Statistic == 'median' and not Weights is None:
+		raise ValueError('The median can not be weighted')
+	Alpha = np.asarray(Alpha,dtype='float64')
+	na = Alpha.size - 1
+	nr = Flux.shape[0]
+	ne = Flux.shape[1]
+	ns = int(np.prod(Flux.shape[2:]))
+
+	#pitch angles are either per sample, or per sample and energy
+	nea = ne if np.ndim(alpha) == np.ndim(Flux) else 1
+
+	#weights are either per sample, or per sample and energy
+	if not Weights is None:
+		nw = ne if np.ndim(Weights) == np.ndim(Flux) else 1
+
+	#map the energy channels to the output energy bins
+	if EnergyIndex is None:
+		neo = ne
+		ecell = np.arange(ne)[np.newaxis,:,np.newaxis]*na
+	else:
+		EnergyIndex = np.asarray(EnergyIndex)
+		neo = EnergyIndex.max() + 1
+		if EnergyIndex.ndim == 1:
+			ecell = EnergyIndex[np.newaxis,:,np.newaxis]*na
+
+	#the records combined into each output record
+	if i0 is None:
+		i0 = np.arange(nr)
+		i1 = i0 + 1
+	else:
+		#output records without an end are left empty
+		i0 = np.asarray(i0)
+		i1 = np.append(i1,i0[np.size(i1):])[:i0.size].clip(min=i0)
+	nt = i0.size
+
+	flux = np.zeros((nt,neo,na),dtype='float32') + np.nan
+	for k0 in range(0,nt,ChunkSize):
+		if Verbose:
+			print('\r{:6.2f}%'.format(100.0*k0/max(nt,1)),end='')
+		k1 = min(k0 + ChunkSize,nt)
+
+		#input records in this chunk and the output record of each
+		#(-1 for those which are not part of any)
+		r0 = i0[k0]
+		r1 = max(r0,i1[k1-1])
+		n = i1[k0:k1] - i0[k0:k1]
+		rec = np.arange(n.sum()) - np.repeat(np.cumsum(n) - n,n) + np.repeat(i0[k0:k1] - r0,n)
+		Index = np.zeros(r1 - r0,dtype='int64') - 1
+		Index[rec] = np.repeat(np.arange(k1 - k0),n)
+
+		#bin index of every sample in (record,energy,alpha bin)
+		ab = _AlphaBins(np.reshape(alpha[r0:r1],(r1 - r0,nea,ns)),Alpha)
+		f = np.reshape(Flux[r0:r1],(r1 - r0,ne,ns))
+		good = np.isfinite(f) & (ab >= 0) & (Index >= 0)[:,np.newaxis,np.newaxis]
+		if not EnergyIndex is None:
+			if EnergyIndex.ndim > 1:
+				ecell = EnergyIndex[r0:r1,:,np.newaxis]*na
+			good = good & (ecell >= 0)
+		cell = (Index[:,np.newaxis,np.newaxis]*(neo*na) + ecell + ab)[good]
+
+		#sum and count the samples in each bin (the sums are in the
+		#same order as binned_statistic, so the means are identical)
+		ncell = (k1 - k0)*neo*na
+		if Statistic == 'median':
+			out = _BinMedian(cell,f[good],ncell)
+		else:
+			if Weights is None:
+				s = np.bincount(cell,weights=f[good],minlength=ncell)
+				c = np.bincount(cell,minlength=ncell)
+			else:
+				w = np.reshape(Weights[r0:r1],(r1 - r0,nw,ns))
+				w = np.broadcast_to(w,f.shape)[good]
+				s = np.bincount(cell,weights=w*f[good],minlength=ncell)
+				c = np.bincount(cell,weights=w,minlength=ncell)
+			use = np.where(c > 0)[0]
+			out = np.zeros(ncell,dtype='float64') + np.nan
+			out[use] = s[use]/c[use]
+		flux[k0:k1] = out.reshape((k1 - k0,neo,na))
+	if Verbose:
+		print('\r{:6.2f}%'.format(100.0))
+
+	return flux
@@ -0,0 +1,152 @@
+import numpy as np
+import DateTimeTools as TT
+from .BinPitchAngles import BinPitchAngles
+
+def _LogMidEdges(Emid):
+	'''
+	Energy bin limits half way between each channel in log space.
+
+	'''
+	lE = np.log10(Emid)
+	dE = np.abs(lE[1:] - lE[:-1])
+	lEmin = np.append(lE[0]-dE[0]/2.0,lE[1:]-dE/2.0)
+	lEmax = np.append(lE[:-1]+dE/2.0,lE[-1]+dE[-1]/2.0,)
+	return 10**lEmin,10**lEmax
+
+def _AlphaEdges(Alpha):
+	'''
+	Pitch angle bin edges, either na uniform bins between 0 and 180
+	degrees, or an array of edges.
+
+	'''
+	if np.size(Alpha) == 1:
+		return np.linspace(0.0,180.0,int(Alpha)+1)
+	Alpha = np.array(Alpha,dtype='float64').flatten()
+	if Alpha.size < 2 or not (Alpha[1:] > Alpha[:-1]).all():
+		raise ValueError('Alpha bin edges should be increasing')
+	return Alpha
+
+def CalculatePAD(Date,ut,alpha,Flux,Emid=None,Emin=None,Emax=None,
+				Alpha=18,Energy=None,Weighting=None,Statistic='mean',
+				i0=None,i1=None,Verbose=False):
+	'''
+	Calculate a pitch angle distribution from the samples of a single
+	species, this is shared by the CalculatePADs function of each of
+	the instruments, which only need to read the data and pitch angles.
+
+	Inputs
+	======
+	Date : int
+		Date of each output record, in the format yyyymmdd.
+	ut : float
+		Time of each output record (hours since the start of the day).
+	alpha : float
+		Pitch angle of each sample (degrees), shape (nr,...), or 
+		(nr,ne,...) like Flux if they differ between energy channels.
+	Flux : float
+		Flux of each sample, shape (nr,ne,...). Samples which are not
+		finite, or are <= 0, are ignored (the latter are set to NaN in
+		place).
+	Emid : None or float
+		Central energy of each channel, shape (ne,) - this is used to
+		create the energy bin limits if Emin and Emax are not provided
+		(half way between each channel in log space).
+	Emin : None or float
+		Lower energy limit of each channel, shape (ne,) or (nr,ne).
+	Emax : None or float
+		Upper energy limit of each channel, as above.
+	Alpha : int or float
+		Either the number of pitch angle bins between 0 and 180 degrees,
+		or an array of bin edges (which need not be uniform, e.g. finer
+		bins near the loss cone).
+	Energy : None or float
+		If set, the energy channels are combined into the energy bins
+		with these edges (shape (neo+1,)), each channel is placed in the
+		bin containing its logarithmic mid point. Channels outside all
+		of the bins are ignored.
+	Weighting : None, str or float
+		None - each sample is weighted equally.
+		'solidangle' - each sample is weighted by sin(alpha), the solid
+			angle per unit pitch angle, so that each bin is an average
+			over solid angle rather than over the samples.
+		'counts' - each sample is weighted by its flux, which is
+			proportional to the number of counts where the samples of
+			a channel have the same geometric factor and accumulation
+			time (i.e. the total flux of the counts in the bin).
+		Or an array of weights, shaped like either alpha or Flux (e.g.
+		the actual counts).
+	Statistic : str
+		'mean'|'median' - the median ignores Weighting.
+	i0 : None or int
+		Start index of the input records combined into each output
+		record (see BinPitchAngles).
+	i1 : None or int
+		End index of the input records combined into each output record.
+	Verbose : bool
+		Display progress.
+
+	Returns
+	=======
+	out : dict
+		Containing 'Date', 'ut', 'utc', 'Emin', 'Emax', 'Alpha' and
+		'Flux' (shape (nt,ne,na)).
+
+	'''
+	#get the energy limits
+	if Emin is None or Emax is None:
+		Emin,Emax = _LogMidEdges(Emid)
+	Emin = np.asarray(Emin)
+	Emax = np.asarray(Emax)
+
+	#get the alpha limits
+	Alpha = _AlphaEdges(Alpha)
+
+	#remove bad fluxes
+	Flux[Flux <= 0] = np.nan
+
+	#work out which energy bin each channel belongs in
+	if Energy is None:
+		EnergyIndex = None
+	else:
+		Energy = np.array(Energy,dtype='float64').flatten()
+		lEc = 0.5*(np.log10(Emin) + np.log10(Emax))
+		EnergyIndex = np.digitize(lEc,np.log10(Energy)) - 1
+		EnergyIndex[(EnergyIndex < 0) | (EnergyIndex >= Energy.size - 1) | np.isnan(lEc)] = -1
+		if not (EnergyIndex >= 0).any():
+			raise ValueError('None of the energy channels are within the energy bins')
+		Emin = Energy[:-1]
+		Emax = Energy[1:]
+
+	#get the sample weights
+	if Statistic == 'median':
+		Weights = None
+	elif Weighting is None:
+		Weights = None
+	elif isinstance(Weighting,str):
+		if Weighting == 'solidangle':
+			Weights = np.abs(np.sin(np.asarray(alpha)*np.pi/180.0))
+		elif Weighting == 'counts':
+			Weights = Flux
+		else:
+			raise ValueError('Weighting should be None, \'solidangle\', \'counts\' or an array')
+	else:
+		Weights = np.asarray(Weighting)
+
+	#bin all of the fluxes at once
+	flux = BinPitchAngles(alpha,Flux,Alpha,i0,i1,Verbose=Verbose,Weights=Weights,
+							EnergyIndex=EnergyIndex,Statistic=Statistic)
+	if not EnergyIndex is None and flux.shape[1] < Emin.size:
+		#pad any empty bins at the top of the range
+		pad = np.zeros((flux.shape[0],Emin.size - flux.shape[1],flux.shape[2]),dtype=flux.dtype) + np.nan
+		flux = np.concatenate((flux,pad),axis=1)
+
+	out = {}
+	out['Date'] = Date
+	out['ut'] = ut
+	out['utc'] = TT.ContUT(Date,ut)
+	out['Emin'] = Emin
+	out['Emax'] = Emax
+	out['Alpha'] = Alpha
+	out['Flux'] = flux
+
+	return out
@@ -2,10 +2,10 @@ import numpy as np
 import DateTimeTools as TT
 from ..MGF.InterpObj import InterpObj
 
-def CalculatePitchAngles(Date,ut,angles,mag):
+def CalculatePitchAngles(Date,ut,angles,mag,dtype=None):
 	'''
 	Calculate the pitch angles for the 3D particle data.
-	
+
 	Inputs
 	======
 	Date : int
@@ -15,47 +15,70 @@ def CalculatePitchAngles(Date,ut,angles,mag):
 	angles : float
 		Array of instrument azimuths and elevations in GSE coords
 	mag : None or numpy.recarray
-		Set to MGF data array, or None and it will be loaded 
+		Set to MGF data array, or None and it will be loaded
 		automatically
-		
+	dtype : None or str
+		If set (e.g. 'float32'), the pitch angles are calculated and
+		returned using this precision, otherwise the precision of the
+		inputs is used.
+
 	Returns
 	=======
 	Estimated pitch angles
-	
+
 	'''
 	#continuous time axis
 	putc = TT.ContUT(Date,ut)
-	
-	#work out unit vector in cartesian coordinates
-	px = np.cos(angles[:,0])*np.cos(angles[:,1])
-	py = np.cos(angles[:,0])*np.sin(angles[:,1])
-	pz = np.sin(angles[:,0])
-	
+
+	#the elevation and azimuth of each direction
+	el = angles[:,0]
+	az = angles[:,1]
+	if not dtype is None:
+		el = np.asarray(el,dtype=dtype)
+		az = np.asarray(az,dtype=dtype)
+
 	if mag is None:
-		fx,fy,fz = InterpObj(np.unique(Date),Smooth=8)		
+		fx,fy,fz = InterpObj(np.unique(Date),Smooth=8)
 	else:
 		fx,fy,fz = mag
-			
+
 
 	#interpolate mag data to the time axis of the particle spectra
 	bx = fx(putc)
 	by = fy(putc)
 	bz = fz(putc)
-	
+
 	#work out magnitude
 	B = np.sqrt(bx**2 + by**2 + bz**2)
-	
+
 	#convert to unit vector
 	bx/=B
 	by/=B
 	bz/=B
-	
-	#create b arrays the same shape as px,py,pz arrays
-	bx = (np.zeros(px.shape).T + bx).T
-	by = (np.zeros(py.shape).T + by).T
-	bz = (np.zeros(pz.shape).T + bz).T
-	
+
+	#reshape b so that it is broadcast along the direction axes (rather
+	#than copied to the same shape as the angles)
+	shape = (putc.size,) + (1,)*(el.ndim - 1)
+	bx = bx.reshape(shape)
+	by = by.reshape(shape)
+	bz = bz.reshape(shape)
+	if not dtype is None:
+		bx = bx.astype(dtype)
+		by = by.astype(dtype)
+		bz = bz.astype(dtype)
+
+	#the dot product of b with the unit vector of each direction,
+	#accumulated in place
+	ce = np.cos(el)
+	alpha = (ce*np.cos(az))*bx
+	alpha += (ce*np.sin(az))*by
+	alpha += np.sin(el)*bz
+	del ce
+
 	#now calculate the pitch angle
-	alpha = 180.0 - np.arccos((bx*px + by*py + bz*pz))*180.0/np.pi	
+	np.arccos(alpha,out=alpha)
+	alpha *= 180.0
+	alpha /= np.pi
+	np.subtract(180.0,alpha,out=alpha)
 
 	return alpha
@@ -0,0 +1,42 @@
+import numpy as np
+
+def CombinePADs(pads):
+	'''
+	Combine a list of pitch angle distributions (as returned by the 
+	CalculatePADs function of each instrument) which cover consecutive
+	parts of the same day, e.g. those calculated for each chunk of 
+	records.
+	
+	Inputs
+	======
+	pads : list
+		List of dicts, each containing a dict for each species (see
+		Arase.Tools.CalculatePAD).
+		
+	Returns
+	=======
+	out : dict
+		Contains a dict for each species.
+	
+	'''
+	out = {}
+	for k in pads[0]:
+		p = [x[k] for x in pads]
+		tmp = {}
+		for f in ['Date','ut','utc','Flux']:
+			tmp[f] = np.concatenate([x[f] for x in p])
+		
+		#energy limits are either fixed or one row per record
+		for f in ['Emin','Emax']:
+			if np.ndim(p[0][f]) > 1:
+				tmp[f] = np.concatenate([x[f] for x in p])
+			else:
+				tmp[f] = p[0][f]
+		tmp['Alpha'] = p[0]['Alpha']
+		
+		#the method(s) used to get the pitch angles of each part
+		if 'PitchAngles' in p[0]:
+			tmp['PitchAngles'] = ','.join(sorted(set([x['PitchAngles'] for x in p])))
+		out[k] = tmp
+		
+	return out
@@ -4,23 +4,30 @@ from .PSpecCls import PSpecCls
 
 def CombinePSpecCls(A):
 	'''
-	Combine an array/list/tuple of SpecCls objects into a single one.
-	This assumes that all axis labels and stuff are identical.
+	Combine an array/list/tuple of PSpecCls objects into a single one.
+	This assumes that all axis labels and stuff are identical. The 
+	combined object shares its arrays with the input objects.
 	
 	Input
 	=====
 	A : array/list/tuple
-		Each element should be a SpecCls object
+		Each element should be a PSpecCls object
 		
 	Returns
 	=======
-	SpecCls
+	PSpecCls
 	
 	'''
 	
 	#count them
 	n = np.size(A)
 	
+	#the PSD precision must be the same for all of them
+	PSDdtype = np.dtype(A[0]._PSDdtype)
+	for i in range(0,n):
+		if np.dtype(A[i]._PSDdtype) != PSDdtype:
+			raise ValueError('The PSDdtype of each object should be the same')
+	
 	#create the initial object
 	out = PSpecCls(	SpecType=A[0].SpecType,
 					xlabel=A[0].xlabel,
@@ -31,12 +38,12 @@ def CombinePSpecCls(A):
 					ylog=A[0]._ylog,
 					zlog=A[0]._zlog,
 					ScaleType=A[0]._ScaleType,
-					nStd=A[0]._nStd)
+					nStd=A[0]._nStd,
+					Contiguous=A[0]._Contiguous,
+					PSDdtype=PSDdtype.name)
 	
-	#loop through and add each one
+	#loop through and merge each one (the arrays are shared, not copied)
 	for i in range(0,n):
-		#we must loop through each elements in each one too
-		for j in range(0,A[i].n):
-			out.AddData(A[i].Date[j],A[i].ut[j],A[i].Epoch[j],A[i].Energy[j],A[i].Spec[j],ew=A[i].ew[j],dt=A[i].dt[j],Meta=A[i].Meta[j],Label=A[i].Label[j])
+		out.Merge(A[i])
 	
 	return out
@@ -9,4 +9,8 @@ def _UpdateDataIndex(idx,fname):
 		idx: numpy.recarray containing the file names.
 	'''
 	
-	pf.WriteASCIIData(fname,idx)
+	#write to a temporary file and then replace the index, so that 
+	#the index is never read (e.g. by another process) part way
+	#through being written
+	pf.WriteASCIIData(fname + '.tmp',idx)
+	os.replace(fname + '.tmp',fname)
@@ -0,0 +1,118 @@
+import numpy as np
+from numpy.lib.mixins import NDArrayOperatorsMixin
+
+class EnergyTable(NDArrayOperatorsMixin):
+	def __init__(self,Table,Index):
+		'''
+		A compact form of a time-varying (nt,ne) array of energy bins,
+		where each record uses one of a small number of distinct energy
+		tables. Only the distinct rows (Table) and the index of the row
+		used by each record (Index) are stored.
+
+		Indexing along the first axis returns rows (or a new EnergyTable
+		sharing the same rows), anything else (numpy functions,
+		arithmetic, np.asarray) works on the full (nt,ne) array. Code
+		which needs to be fast should work on Table directly, e.g. using
+		EnergyTable.Apply.
+
+		Inputs
+		======
+		Table : float
+			Distinct energy tables, shape (nu,ne).
+		Index : int
+			Index of the table used by each record, shape (nt,).
+
+		'''
+		self.Table = Table
+		self.Index = Index
+
+	@property
+	def shape(self):
+		return (self.Index.size,self.Table.shape[1])
+
+	@property
+	def ndim(self):
+		return 2
+
+	@property
+	def size(self):
+		return self.Index.size*self.Table.shape[1]
+
+	@property
+	def dtype(self):
+		return self.Table.dtype
+
+	def __len__(self):
+		return self.Index.size
+
+	def __array__(self,dtype=None,copy=None):
+		out = self.Table[self.Index]
+		if not dtype is None:
+			out = out.astype(dtype)
+		return out
+
+	def __array_ufunc__(self,ufunc,method,*inputs,**kwargs):
+		#anything other than indexing is done on the full array
+		inputs = [np.asarray(x) if isinstance(x,EnergyTable) else x for x in inputs]
+		return getattr(ufunc,method)(*inputs,**kwargs)
+
+	def __getitem__(self,key):
+		if isinstance(key,tuple):
+			if len(key) == 1:
+				key = key[0]
+			elif np.isscalar(key[0]):
+				return self.Table[self.Index[key[0]]][key[1:]]
+			elif isinstance(key[0],slice):
+				return self.Table[self.Index[key[0]]][(slice(None),) + key[1:]]
+			else:
+				return np.asarray(self)[key]
+		if np.isscalar(key):
+			return self.Table[self.Index[key]]
+		return EnergyTable(self.Table,self.Index[key])
+
+	def Apply(self,Func):
+		'''
+		Apply a function to each of the distinct rows.
+
+		Inputs
+		======
+		Func : callable
+			Function which takes the (nu,ne) array of distinct rows and
+			returns an array of the same shape.
+
+		Returns
+		=======
+		EnergyTable sharing the same index.
+
+		'''
+		return EnergyTable(Func(self.Table),self.Index)
+
+
+def UniqueRows(*Arrays):
+	'''
+	Convert one or more (nt,ne) arrays into EnergyTable objects which
+	share the same index, such that each distinct combination of rows is
+	only stored once.
+
+	Inputs
+	======
+	Arrays : float
+		Arrays with shape (nt,ne).
+
+	Returns
+	=======
+	tuple of EnergyTable objects.
+
+	'''
+	#compare the raw bytes of each row, so that NaNs match each other
+	key = np.ascontiguousarray(np.concatenate([np.float64(a) for a in Arrays],axis=1))
+	key = key.view(np.dtype((np.void,key.dtype.itemsize*key.shape[1]))).ravel()
+	_,first,inv = np.unique(key,return_index=True,return_inverse=True)
+
+	#the index only needs to be int16 unless there are lots of tables
+	if first.size <= np.iinfo('int16').max:
+		Index = np.int16(inv.ravel())
+	else:
+		Index = np.int32(inv.ravel())
+
+	return tuple([EnergyTable(np.asarray(a)[first],Index) for a in Arrays])
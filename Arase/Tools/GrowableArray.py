@@ -0,0 +1,77 @@
+import numpy as np
+
+class GrowableArray(object):
+	def __init__(self,Capacity=1024):
+		'''
+		A contiguous array which can be appended to along its first
+		axis. Storage is over-allocated and doubled when it fills up,
+		so that appending n records costs O(n) amortized and the whole
+		array is always available as a view without copying.
+
+		Inputs
+		======
+		Capacity : int
+			Initial number of records to allocate space for.
+
+		'''
+		self._buf = None
+		self._cap = Capacity
+		self.n = 0
+
+	def Append(self,x):
+		'''
+		Append an array to the end of the buffer.
+
+		Inputs
+		======
+		x : numpy.ndarray
+			Array to append, its shape must match the existing array
+			along all but the first axis.
+
+		Returns
+		=======
+		i0 : int
+			Index of the first new record.
+		i1 : int
+			Index after the last new record.
+		grew : bool
+			True if the buffer was reallocated (any existing views of
+			it will no longer share its memory).
+
+		'''
+		x = np.asarray(x)
+		nx = x.shape[0]
+		grew = False
+
+		if self._buf is None:
+			#first allocation
+			cap = max(self._cap,nx)
+			self._buf = np.zeros((cap,) + x.shape[1:],dtype=x.dtype)
+			grew = True
+		else:
+			dtype = np.result_type(self._buf.dtype,x.dtype)
+			cap = self._buf.shape[0]
+			if self.n + nx > cap or dtype != self._buf.dtype:
+				#double the capacity until it fits
+				while self.n + nx > cap:
+					cap *= 2
+				buf = np.zeros((cap,) + self._buf.shape[1:],dtype=dtype)
+				buf[:self.n] = self._buf[:self.n]
+				self._buf = buf
+				grew = True
+
+		i0 = self.n
+		i1 = self.n + nx
+		self._buf[i0:i1] = x
+		self.n = i1
+		return i0,i1,grew
+
+	@property
+	def data(self):
+		'''
+		View of the filled part of the buffer.
+
+		'''
+		if self._buf is None:
+			return None
+		return self._buf[:self.n]
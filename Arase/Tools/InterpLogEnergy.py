@@ -0,0 +1,86 @@
+import numpy as np
+from .EnergyTable import EnergyTable
+
+def InterpLogEnergy(Energy,Spec,NewEnergy):
+	'''
+	Interpolate spectra onto a new set of energies, linearly in
+	log10(Energy). Energies which are not positive (or finite) are
+	ignored and the output is NaN outside of the energy range of each
+	spectrum (there is no extrapolation).
+
+	Inputs
+	======
+	Energy : float
+		Energy bins, either shape (ne,) where all spectra share the same
+		energy table, or (nt,ne) where each spectrum has its own (this
+		may also be an EnergyTable).
+	Spec : float
+		Spectra, shape (nt,ne).
+	NewEnergy : float
+		New energy bins, shape (nout,).
+
+	Returns
+	=======
+	out : float
+		Interpolated spectra, shape (nt,nout).
+
+	'''
+	Spec = np.asarray(Spec)
+	nt,ne = Spec.shape
+
+	if isinstance(Energy,EnergyTable):
+		#interpolate the records using each distinct table together
+		out = np.zeros((nt,np.size(NewEnergy)),dtype='float64') + np.nan
+		for k in np.unique(Energy.Index):
+			use = np.where(Energy.Index == k)[0]
+			out[use] = InterpLogEnergy(Energy.Table[k],Spec[use],NewEnergy)
+		return out
+
+	lo = np.log10(np.asarray(NewEnergy,dtype='float64'))
+	nout = lo.size
+	with np.errstate(invalid='ignore',divide='ignore'):
+		le = np.log10(np.float64(Energy))
+	le[~np.isfinite(le)] = np.inf
+
+	if le.ndim == 1:
+		#one energy table, so the weights are the same for all spectra
+		srt = np.argsort(le)
+		x = le[srt]
+		ngood = np.isfinite(x).sum()
+		if ngood < 2:
+			return np.zeros((nt,nout),dtype='float64') + np.nan
+		i = np.clip(np.searchsorted(x[:ngood],lo),1,ngood-1)
+		x0 = x[i-1]
+		x1 = x[i]
+		with np.errstate(invalid='ignore',divide='ignore'):
+			w = np.where(x1 > x0,(lo - x0)/(x1 - x0),0.0)
+		out = Spec[:,srt[i-1]]*(1.0 - w) + Spec[:,srt[i]]*w
+		out[:,(lo < x[0]) | (lo > x[ngood-1])] = np.nan
+		return out
+
+	#sort each energy table, bad energies are moved to the end
+	srt = np.argsort(le,axis=1)
+	x = np.take_along_axis(le,srt,axis=1)
+	z = np.take_along_axis(Spec,srt,axis=1)
+	ngood = np.isfinite(x).sum(axis=1)
+
+	#search all of the rows at once by offsetting each one so that the
+	#flattened array is sorted (log10 energies are well within +/-1000)
+	x = np.where(np.isfinite(x),x,1000.0)
+	off = 4000.0*np.arange(nt)[:,np.newaxis]
+	i = np.searchsorted((x + off).ravel(),(lo[np.newaxis,:] + off).ravel())
+	i = i.reshape((nt,nout)) - ne*np.arange(nt)[:,np.newaxis]
+	i = np.clip(i,1,np.clip(ngood-1,1,None)[:,np.newaxis])
+
+	x0 = np.take_along_axis(x,i-1,axis=1)
+	x1 = np.take_along_axis(x,i,axis=1)
+	with np.errstate(invalid='ignore',divide='ignore'):
+		w = np.where(x1 > x0,(lo - x0)/(x1 - x0),0.0)
+	out = np.take_along_axis(z,i-1,axis=1)*(1.0 - w) + np.take_along_axis(z,i,axis=1)*w
+
+	#remove anything outside of each energy range
+	xmin = x[:,:1]
+	xmax = np.take_along_axis(x,np.clip(ngood-1,0,None)[:,np.newaxis],axis=1)
+	bad = (lo < xmin) | (lo > xmax) | (ngood < 2)[:,np.newaxis]
+	out[bad] = np.nan
+	return out
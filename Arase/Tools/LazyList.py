@@ -0,0 +1,65 @@
+class LazyList(object):
+	def __init__(self,Func):
+		'''
+		A list whose elements are only calculated when they are first
+		accessed, then cached.
+
+		Inputs
+		======
+		Func : callable
+			Function which takes the index of an element and returns
+			its value.
+
+		'''
+		self._Func = Func
+		self._items = []
+		self._done = []
+
+	def append(self,x=None):
+		'''
+		Append an element - if x is None it will be calculated when
+		it is first accessed.
+
+		'''
+		self._items.append(x)
+		self._done.append(not x is None)
+
+	def extend(self,other):
+		'''
+		Extend the list with the elements of another list. Where the
+		other list is also a LazyList, any elements which it has not yet
+		calculated will be calculated by this list instead.
+
+		'''
+		if isinstance(other,LazyList):
+			self._items.extend(other._items)
+			self._done.extend(other._done)
+		else:
+			for x in other:
+				self.append(x)
+
+	def IsCalculated(self,i):
+		'''
+		Return True if element i has already been calculated.
+
+		'''
+		return self._done[i]
+
+	def __getitem__(self,i):
+		if isinstance(i,slice):
+			return [self[j] for j in range(*i.indices(len(self)))]
+		if not self._done[i]:
+			self._items[i] = self._Func(i % len(self))
+			self._done[i] = True
+		return self._items[i]
+
+	def __setitem__(self,i,x):
+		self._items[i] = x
+		self._done[i] = True
+
+	def __len__(self):
+		return len(self._items)
+
+	def __iter__(self):
+		for i in range(0,len(self)):
+			yield self[i]
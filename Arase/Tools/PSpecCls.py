@@ -15,6 +15,16 @@ from .KappaDist import KappaDistE
 from .MaxwellBoltzmannDist import MaxwellBoltzmannDistE
 from ..Pos.ReadFieldTraces import ReadFieldTraces
 from .RelVelocity import RelVelocity
+from .RunningStats import RunningStats
+from .GrowableArray import GrowableArray
+from .LazyList import LazyList
+from .EnergyTable import EnergyTable,UniqueRows
+from .SpecStore import SaveSpecArrays
+from .SpectrogramMesh import SpectrogramMesh
+from .SpecPyramid import SpecPyramid
+from .RasterSpectrogram import RasterSpectrogram,NewRasterImage,SaveRasterImage
+from .TimeIndex import TimeIndex
+from .InterpLogEnergy import InterpLogEnergy
 
 defargs = {	'Meta' : None,
 			'dt' : None,
@@ -27,7 +37,9 @@ defargs = {	'Meta' : None,
 			'ylog' : False,
 			'zlog' : False, 
 			'ScaleType' : 'range',
-			'nStd' : 2}
+			'nStd' : 2,
+			'Contiguous' : False,
+			'PSDdtype' : 'float64'}
 
 amu = 1.6605e-27
 
@@ -59,6 +71,14 @@ class PSpecCls(object):
 			True for logarithmic y-axis
 		zlog : bool
 			True for logarithmic color scale
+		Contiguous : bool
+			If True, the per-record arrays are appended into contiguous
+			buffers (one set per energy-table layout) and the lists 
+			below hold views of them - see PSpecCls.GetSeries.
+		PSDdtype : str
+			Data type used to store PSD, V and Vew, e.g. 'float32' to 
+			halve their memory use. These are calculated for each block
+			when they are first accessed.
 		
 		'''
 		
@@ -73,9 +93,10 @@ class PSpecCls(object):
 		self.dt = []
 		self.Meta = []
 		self.Label = []
-		self.V = []
-		self.Vew = []
-		self.PSD = []
+		self.V = LazyList(self._CalculateV)
+		self.Vew = LazyList(self._CalculateVew)
+		self.PSD = LazyList(self._CalculatePSD)
+		self.TimeIndex = []
 		self.Mass = ParticleMass.get(SpecType,9.10938356e-31)
 		self.n = 0
 		self.SpecType = SpecType
@@ -90,7 +111,20 @@ class PSpecCls(object):
 		self._zlog = kwargs.get('zlog',defargs['zlog'])
 		self._ScaleType = kwargs.get('ScaleType',defargs['ScaleType'])
 		self._nStd = kwargs.get('nStd',defargs['nStd'])
+		self._Contiguous = kwargs.get('Contiguous',defargs['Contiguous'])
+		self._PSDdtype = kwargs.get('PSDdtype',defargs['PSDdtype'])
 		
+		#running limits - blocks are folded in lazily (see _UpdateLimits)
+		self._ResetLimits()
+		
+		#segments of blocks which share an energy-table layout
+		self._segkeys = []
+		self._segs = {}
+		self._blocks = []
+		self._taxis = None
+		
+		#downsampled copies of each spectrogram (see _PlotSpectrogram)
+		self._pyramids = {}
 			
 
 	
@@ -101,6 +135,14 @@ class PSpecCls(object):
 		'''
 		
 		
+		if isinstance(Energy,EnergyTable):
+			#work out the widths for each distinct energy table
+			if isinstance(ew,EnergyTable):
+				return ew
+			if ew is None:
+				return Energy.Apply(lambda E: np.array([self._ProcessEW(None,e) for e in E]))
+			return Energy.Apply(lambda E: np.zeros(E.shape,dtype='float32') + ew)
+			
 		if ew is None:
 			#if bandwidth is None, then we must calculate it from the fequencies
 			#Energies are not necessarily in order annoyingly
@@ -128,16 +170,8 @@ class PSpecCls(object):
 				else:
 					ew = np.zeros(Energy.shape,dtype='float32') + np.nan	
 			else:
-				srt = np.argsort(Energy[0,:])
-				tmpF = np.log10(Energy[:,srt])
-			
-				df = tmpF[1:] - tmpF[:-1]
-				df = np.concatenate(([df[0]],df,[df[1]]))/2.0
-				ewtmp = df[1:] + df[:-1]
-				
-				
-				ew = np.zeros(Energy.shape,dtype='float32')
-				ew[srt] = 10**ewtmp	
+				#one set of widths for each record
+				ew = np.array([self._ProcessEW(None,e) for e in Energy])
 			
 		elif np.size(ew) == 1:
 			#if it is a single value, then turn it into an array the same size as Energy
@@ -157,22 +191,79 @@ class PSpecCls(object):
 		dt = np.zeros(ut.size,dtype='float32') + dt
 		return dt
 		
-	def _CalculatePSD(self,Spec,Energy,dE):
-		e = 1.6022e-19
-		V = RelVelocity(Energy,self.Mass)
-		le = np.log10(Energy)
-		lw = np.log10(dE)
+	def _EnergyTables(self,I,yparam='E'):
+		'''
+		Return the energies (or velocities if yparam == 'V') and their 
+		widths for the I'th set of spectra. Where
+		they are stored as EnergyTable objects (with the same index) only
+		the distinct rows are returned, along with the index (otherwise 
+		the index is None).
+		
+		'''
+		if yparam == 'V':
+			E = self.V[I]
+			ew = self.Vew[I]
+		else:
+			E = self.Energy[I]
+			ew = self.ew[I]
+		if isinstance(E,EnergyTable):
+			if isinstance(ew,EnergyTable) and ew.Index is E.Index:
+				return E.Table,ew.Table,E.Index
+			return np.asarray(E),np.asarray(ew),None
+		return E,ew,None
+	
+	def _CalculateV(self,I):
+		'''
+		Calculate the velocity of each energy bin of the I'th set of 
+		spectra.
+		
+		'''
+		Func = lambda E: np.asarray(RelVelocity(E,self.Mass),dtype=self._PSDdtype)
+		E = self.Energy[I]
+		if isinstance(E,EnergyTable):
+			return E.Apply(Func)
+		return Func(E)
+		
+	def _CalculateVew(self,I):
+		'''
+		Calculate the velocity bin widths of the I'th set of spectra.
+		
+		'''
+		E,ew,Index = self._EnergyTables(I)
+		
+		le = np.log10(E)
+		lw = np.log10(ew)
 		
 		E0 = 10**(le - 0.5*lw)
 		E1 = 10**(le + 0.5*lw)
 		V0 = RelVelocity(E0,self.Mass)
 		V1 = RelVelocity(E1,self.Mass)
-		self.V.append(V)
-		self.Vew.append(10**(np.log10(V1)-np.log10(V0)))
+		Vew = np.asarray(10**(np.log10(V1)-np.log10(V0)),dtype=self._PSDdtype)
+		if Index is None:
+			return Vew
+		return EnergyTable(Vew,Index)
 		
-		psd =  np.float64(Spec)*(np.float64(self.Mass)/(2000*e*np.float64(Energy/self.Mass))) * np.float64(10.0/e)
-		self.PSD.append(psd)
+	def _CalculatePSD(self,I):
+		'''
+		Calculate the phase space density of the I'th set of spectra.
 		
+		'''
+		e = 1.6022e-19
+		Energy = self.Energy[I]
+		if isinstance(Energy,EnergyTable):
+			Energy = Energy.Table
+		f0 = (np.float64(self.Mass)/(2000*e*np.float64(Energy/self.Mass)))
+		f1 = np.float64(10.0/e)
+		if isinstance(self.Energy[I],EnergyTable):
+			f0 = f0[self.Energy[I].Index]
+		psd = np.array(self.Spec[I],dtype=self._PSDdtype)
+		if psd.dtype == np.float64:
+			psd *= f0
+			psd *= f1
+		else:
+			#f0 alone would underflow single precision
+			psd *= f0*f1
+		return psd
 		
 					
 	
@@ -203,6 +294,14 @@ class PSpecCls(object):
 			String containing a plot label if desired
 		'''
 
+		#time-varying energy bins are stored as a table of the distinct
+		#rows and an index for each record
+		if len(np.shape(Energy)) == 2:
+			if np.shape(ew) == np.shape(Energy):
+				Energy,ew = UniqueRows(Energy,ew)
+			else:
+				Energy, = UniqueRows(Energy)
+
 		#store the input variables by appending to the existing lists
 		self.Date.append(Date)
 		self.ut.append(ut)
@@ -216,7 +315,10 @@ class PSpecCls(object):
 		#get the bandwidth in the appropriate format
 		self.ew.append(self._ProcessEW(ew,Energy))
 
-		self._CalculatePSD(Spec,Energy,self.ew[-1])
+		#PSD and velocities are calculated when first needed
+		self.V.append()
+		self.Vew.append()
+		self.PSD.append()
 		
 		#calculate continuous time axis
 		self.utc.append(TT.ContUT(Date,ut))
@@ -224,20 +326,400 @@ class PSpecCls(object):
 		#calculate dt
 		self.dt.append(self._ProcessDT(dt,ut))
 
-		#calculate the new time, energy and z scale limits
-		self._CalculateTimeLimits() 
-		self._CalculateEnergyLimits()
-		self._CalculateScale()
-		self._CalculateVLimits()
-		self._CalculatePSDScale()
+		#the time, energy and z scale limits are updated when needed
+		self._pending.append(self.n)
+		self._pendingpsd.append(self.n)
+		
+		#copy into the contiguous buffers if needed
+		self._AddToSegment(self.n)
+		self._taxis = None
+		
+		#find the continuous segments of data
+		self._AddTimeIndex(self.n)
 		
 		#add to the total count of spectrograms stored
 		self.n += 1
 	
-	def _GetSpectrum(self,I,sutc,dutc,Method,xparam,yparam):
+	def Merge(self,other):
+		'''
+		Add all of the spectra stored in another PSpecCls object to this
+		one. The arrays and derived quantities (energy bin widths, 
+		velocities and PSD) are adopted by reference rather than being 
+		recalculated, and the cached limits of both objects are combined,
+		so this scales with the number of blocks, not the size of the 
+		data.
+		
+		The merged blocks are not copied into this object's contiguous
+		buffers, even if it was created with Contiguous=True, so 
+		GetSeries returns concatenated copies for their segments.
+		
+		Inputs
+		======
+		other : PSpecCls
+			Object to merge into this one (its arrays are shared, not
+			copied).
+		
+		'''
+		n0 = self.n
+		for f in ['Date','ut','Epoch','Energy','Spec','utc','ew','dt',
+					'Meta','Label','V','Vew','PSD','TimeIndex']:
+			getattr(self,f).extend(getattr(other,f))
+			
+		#blocks which neither object has folded into its limits yet
+		self._pending += [n0 + i for i in other._pending]
+		self._pendingpsd += [n0 + i for i in other._pendingpsd]
+		
+		#and those which have been
+		self._MergeLimits(other)
+		
+		#cached pyramids are still valid
+		for k in other._pyramids:
+			self._pyramids[(k[0] + n0,) + k[1:]] = other._pyramids[k]
+		
+		#the adopted arrays are not copied into contiguous buffers
+		Contiguous = self._Contiguous
+		self._Contiguous = False
+		self.n += other.n
+		for i in range(n0,self.n):
+			self._AddToSegment(i)
+		self._Contiguous = Contiguous
+		self._taxis = None
+	
+	def _Kwargs(self):
+		'''
+		Return the keywords needed to create a similar empty object.
+		
+		'''
+		return {	'xlabel' : self.xlabel,
+					'ylabele' : self.ylabele,
+					'ylabelv' : self.ylabelv,
+					'zlabelf' : self.zlabelf,
+					'zlabelp' : self.zlabelp,
+					'ylog' : self._ylog,
+					'zlog' : self._zlog,
+					'ScaleType' : self._ScaleType,
+					'nStd' : self._nStd,
+					'Contiguous' : self._Contiguous,
+					'PSDdtype' : np.dtype(self._PSDdtype).name}
+	
+	def Slice(self,Date,ut=[0.0,24.0]):
+		'''
+		Return a new PSpecCls object containing only the spectra within
+		a time interval. The arrays of the new object are views of this
+		one's where possible (rather than copies) and its limits are 
+		calculated only from the spectra within the interval, so 
+		plotting or analysing a short event costs in proportion to its 
+		length.
+		
+		Inputs
+		======
+		Date : int32
+			Either a single date in the format yyyymmdd, or a 2 element
+			tuple/list/numpy.ndarray with the start and end dates.
+		ut : list/tuple
+			2-element start and end times, where each element is the 
+			time in hours since the start of the day, e.g. 17:30 == 17.5.
+			
+		Returns
+		=======
+		PSpecCls object
+		
+		'''
+		if np.size(Date) == 1:
+			Date0 = Date
+			Date1 = Date
+		else:
+			Date0 = Date[0]
+			Date1 = Date[1]
+		utclim = TT.ContUT(np.array([Date0,Date1]),np.array(ut))
+		return self[utclim[0]:utclim[1]]
+		
+	def __getitem__(self,key):
+		'''
+		Slice the object in time, e.g. Spec[utc0:utc1] where utc0 and 
+		utc1 are continuous times (hours since 1950-01-01, see 
+		DateTimeTools.ContUT). See PSpecCls.Slice.
+		
+		'''
+		if not isinstance(key,slice) or not key.step is None:
+			raise TypeError('PSpecCls objects can only be sliced in time, e.g. Spec[utc0:utc1]')
+		t0 = -np.inf if key.start is None else key.start
+		t1 = np.inf if key.stop is None else key.stop
+		
+		#views are kept separate rather than copied into new buffers
+		kwargs = self._Kwargs()
+		kwargs['Contiguous'] = False
+		out = PSpecCls(self.SpecType,**kwargs)
+		for I in range(0,self.n):
+			use,nt = self.TimeIndex[I].Slice(t0,t1)
+			if nt > 0:
+				out._AddSlice(self,I,use)
+		return out
+		
+	def _AddSlice(self,other,I,use):
+		'''
+		Add the records (use) of the I'th block of another PSpecCls
+		object to this one, without recalculating anything.
+		
+		'''
+		for f in ['Date','ut','Epoch','Spec','utc','dt']:
+			getattr(self,f).append(getattr(other,f)[I][use])
+		
+		#time-varying energies, keeping any shared table indices shared
+		Index = {}
+		def _Slice(x):
+			if isinstance(x,EnergyTable):
+				if not id(x.Index) in Index:
+					Index[id(x.Index)] = x.Index[use]
+				return EnergyTable(x.Table,Index[id(x.Index)])
+			elif np.ndim(x) == 2:
+				return x[use]
+			return x
+		self.Energy.append(_Slice(other.Energy[I]))
+		self.ew.append(_Slice(other.ew[I]))
+		
+		#derived quantities are only sliced if they already exist
+		for f in ['V','Vew','PSD']:
+			x = getattr(other,f)
+			if x.IsCalculated(I):
+				getattr(self,f).append(_Slice(x[I]))
+			else:
+				getattr(self,f).append()
+		self.Meta.append(other.Meta[I])
+		self.Label.append(other.Label[I])
+		
+		self._pending.append(self.n)
+		self._pendingpsd.append(self.n)
+		self._AddToSegment(self.n)
+		self._AddTimeIndex(self.n)
+		self._taxis = None
+		self.n += 1
+		
+	def Save(self,path):
+		'''
+		Save this object to a directory containing a JSON header and one
+		.npy file per array. It can be reopened (with the arrays memory
+		mapped) using Arase.Tools.LoadSpecObject. Velocities are not 
+		saved and PSD is only saved where it has already been 
+		calculated, otherwise they are recalculated when needed.
+		
+		Inputs
+		======
+		path : str
+			Directory to save to.
+		
+		'''
+		header,arrays = self._Pack()
+		SaveSpecArrays(path,header,arrays)
+		
+	def _Pack(self):
+		'''
+		Return a header dict describing this object and a dict of all of
+		the arrays needed to recreate it (see PSpecCls._Unpack).
+		
+		'''
+		arrays = {}
+		blocks = []
+		for i in range(0,self.n):
+			for f in ['Date','ut','Epoch','Spec','utc','dt']:
+				arrays['{:d}_{:s}'.format(i,f)] = getattr(self,f)[i]
+				
+			#energy tables are saved as their distinct rows and index
+			b = {'Label' : self.Label[i], 'Meta' : self.Meta[i]}
+			Index = None
+			for f in ['Energy','ew']:
+				x = getattr(self,f)[i]
+				name = '{:d}_{:s}'.format(i,f)
+				if isinstance(x,EnergyTable):
+					arrays[name] = x.Table
+					if Index is None or not x.Index is Index:
+						Index = x.Index
+						arrays[name+'Index'] = Index
+						b[f] = 'table'
+					else:
+						b[f] = 'shared'
+				else:
+					arrays[name] = x
+					b[f] = 'array'
+			b['PSD'] = self.PSD.IsCalculated(i)
+			if b['PSD']:
+				arrays['{:d}_PSD'.format(i)] = self.PSD[i]
+			blocks.append(b)
+			
+		header = {	'Class' : 'PSpecCls',
+					'SpecType' : self.SpecType,
+					'kwargs' : self._Kwargs(),
+					'Blocks' : blocks,
+					'Limits' : self._GetLimitState()}
+		return header,arrays
+		
+	def _Unpack(self,header,Reader):
+		'''
+		Fill this (empty) object using the header and arrays from 
+		PSpecCls._Pack, where Reader(name) returns each array (see 
+		Arase.Tools.LoadSpecObject).
+		
+		'''
+		#the arrays are used as they are (e.g. memory mapped) rather
+		#than being copied into contiguous buffers
+		Contiguous = self._Contiguous
+		self._Contiguous = False
+		for i,b in enumerate(header['Blocks']):
+			for f in ['Date','ut','Epoch','Spec','utc','dt']:
+				getattr(self,f).append(Reader('{:d}_{:s}'.format(i,f)))
+			Index = None
+			for f in ['Energy','ew']:
+				name = '{:d}_{:s}'.format(i,f)
+				x = Reader(name)
+				if b[f] == 'table':
+					Index = Reader(name+'Index')
+				if b[f] != 'array':
+					x = EnergyTable(x,Index)
+				getattr(self,f).append(x)
+			self.Meta.append(b['Meta'])
+			self.Label.append(b['Label'])
+			self.V.append()
+			self.Vew.append()
+			if b.get('PSD',False):
+				self.PSD.append(Reader('{:d}_PSD'.format(i)))
+			else:
+				self.PSD.append()
+			self._AddToSegment(i)
+			self._AddTimeIndex(i)
+			self.n += 1
+		self._Contiguous = Contiguous
+		self._SetLimitState(header['Limits'])
+	
+	def _AddTimeIndex(self,I):
+		'''
+		Create the time index of the I'th block, which splits it into
+		continuous segments wherever there are gaps in time or the 
+		energy table changes (see TimeIndex).
+		
+		'''
+		self.TimeIndex.append(TimeIndex(self.utc[I],self.dt[I],[self.Energy[I],self.ew[I]]))
+		
+	def _SegmentKey(self,I):
+		'''
+		Blocks which can share contiguous storage have the same number
+		of energy bins and the same energy array dimensions.
+		
+		'''
+		E = self.Energy[I]
+		return (np.ndim(E),np.shape(E)[-1])
+		
+	def _SegmentFields(self,key):
+		'''
+		List the per-record fields stored in each segment.
+		
+		'''
+		fields = ['Date','ut','Epoch','utc','dt','Spec']
+		if key[0] == 2:
+			fields += ['Energy','ew']
+		return fields
+		
+	def _AddToSegment(self,I):
+		'''
+		Append the I'th block to its segment, then replace the entries
+		in the lists of arrays with views of the contiguous buffers.
+		
+		'''
+		key = self._SegmentKey(I)
+		if not key in self._segs:
+			self._segkeys.append(key)
+			self._segs[key] = {'blocks' : []}
+		seg = self._segs[key]
+		seg['blocks'].append(I)
+		self._blocks.append(key)
+		if not self._Contiguous:
+			return
+		
+		nt = np.size(self.utc[I])
+		for f in self._SegmentFields(key):
+			x = getattr(self,f)
+			if np.shape(x[I])[:1] != (nt,) or isinstance(x[I],EnergyTable):
+				continue
+			if not f in seg:
+				seg[f] = GrowableArray()
+				seg[f+'_idx'] = []
+			i0,i1,grew = seg[f].Append(x[I])
+			seg[f+'_idx'].append((I,i0,i1))
+			buf = seg[f].data
+			if grew:
+				#all blocks in this segment need new views
+				for j,j0,j1 in seg[f+'_idx']:
+					x[j] = buf[j0:j1]
+			else:
+				x[I] = buf[i0:i1]
+	
+	def GetSeries(self,Param):
+		'''
+		Return the whole series of a per-record parameter, as one array
+		per energy-table segment (blocks with the same number of 
+		energy bins). When the object was created with Contiguous=True
+		these are views of the underlying buffers, otherwise (and always
+		for the lazily calculated 'PSD', 'V' and 'Vew') they are 
+		concatenated copies.
+		
+		Inputs
+		======
+		Param : str
+			Name of the parameter, e.g. 'Date'|'ut'|'utc'|'dt'|'Spec'|
+			'PSD' (or 'Energy'|'ew'|'V'|'Vew' if they vary with time).
+			
+		Returns
+		=======
+		list of numpy.ndarray
+		
+		'''
+		x = getattr(self,Param)
+		out = []
+		for key in self._segkeys:
+			seg = self._segs[key]
+			if Param in seg and len(seg[Param+'_idx']) == len(seg['blocks']):
+				out.append(seg[Param].data)
+			else:
+				out.append(np.concatenate([x[j] for j in seg['blocks']]))
+		return out
+		
+	def _GetTimeAxis(self):
+		'''
+		Return the sorted dates and continuous times of every record, 
+		these are cached until more data are added.
+		
+		'''
+		if self._taxis is None:
+			tdate = self.GetSeries('Date')
+			tutc = self.GetSeries('utc')
+			if len(tutc) == 1:
+				tdate = tdate[0]
+				tutc = tutc[0]
+			else:
+				tdate = np.concatenate(tdate)
+				tutc = np.concatenate(tutc)
+			if (tutc[1:] < tutc[:-1]).any():
+				srt = np.argsort(tutc)
+				tdate = tdate[srt]
+				tutc = tutc[srt]
+			self._taxis = (tdate,tutc)
+		return self._taxis
 	
+	def _GetSpectra(self,I,sutc,dutc,Method,xparam,yparam):
+		'''
+		Get the spectra from a single block at an array of times.
+		
+		Returns
+		=======
+		e : float
+			Energy/velocity bins, shape (M,ne), NaN where unavailable.
+		s : float
+			Spectra, shape (M,ne).
+		d : float
+			Distance in time (hours) to the nearest record, inf where
+			it is further than dutc.
+		
+		'''
 		#get the appropriate data
-		l = self.Label[I]
 		utc = self.utc[I]
 		if xparam == 'V':
 			f = self.V[I]
@@ -249,62 +731,51 @@ class PSpecCls(object):
 		else:
 			Spec = self.Spec[I]		
 		
-		#find the nearest
-		dt = np.abs(utc - sutc)
-		near = np.where(dt == dt.min())[0][0]
+		#find the nearest and surrounding records (those either side of
+		#a gap or change of energy table are not interpolated between)
+		near,bef,aft = self.TimeIndex[I].Search(sutc,Segmented=True)
+		d = np.abs(utc[near] - sutc)
+		d[d > dutc] = np.inf
 		
-		#check if the nearest is within dutc
-		if dt[near] > dutc:
-			return [],[],[]
-			
-		
-		#check if we are past the end of the time series, or Method is nearest
-		if (Method == 'nearest') or (sutc < utc[0]) or (sutc > utc[-1]):
-			s = Spec[near,:]
-			if len(f.shape) == 2:
-				e = f[near,:]
-			else:
-				e = f
-			
+		s = np.float64(Spec[near])
+		if len(f.shape) == 2:
+			e = np.float64(f[near])
 		else:
-			#in this case we need to find the two surrounding neighbours
-			#and interpolate between them
-			bef = np.where(utc <= sutc)[0][-1]
-			aft = np.where(utc > sutc)[0][0]
-			
-			s0 = Spec[bef,:]
-			s1 = Spec[aft,:]
-			
-			if len(f.shape) == 2:
-				e0 = f[near,:]
-				e1 = f[near,:]
-			else:
-				e0 = f
-				e1 = f
-			
-			dx = utc[aft] - utc[bef]
-			ds = s1 - s0
-			de = e1 - e0
-			
-			dsdx = ds/dx
-			dedx = de/dx
-			
-			dt = sutc - utc[bef]
+			e = np.zeros(s.shape,dtype='float64') + f
+		
+		#interpolate between the two surrounding records where possible
+		if Method != 'nearest':
+			use = np.where(np.isfinite(d) & (bef >= 0) & (aft < utc.size))[0]
+			b0 = bef[use]
+			b1 = aft[use]
+			w = ((sutc[use] - utc[b0])/(utc[b1] - utc[b0]))[:,np.newaxis]
+			s[use] = Spec[b0] + w*(Spec[b1] - Spec[b0])
 			
-			s = s0 + dt*dsdx
-			e = e0 + dt*dedx
+		#remove rubbish
+		bad = ~(e > 0) | ~np.isfinite(d)[:,np.newaxis]
+		e[bad] = np.nan
+		s[bad] = np.nan
+		
+		return e,s,d
 		
+	def _GetSpectrum(self,I,sutc,dutc,Method,xparam,yparam):
+	
+		e,s,d = self._GetSpectra(I,np.array([sutc]),dutc,Method,xparam,yparam)
 		
+		#check if the nearest is within dutc
+		if not np.isfinite(d[0]):
+			return [],[],[]
+			
 		#remove rubbish
-		good = np.where(e > 0)[0]
-		e = e[good]
-		s = s[good]
+		good = np.where(np.isfinite(e[0]))[0]
+		e = e[0,good]
+		s = s[0,good]
 			
 		#sort by e
 		srt = np.argsort(e)
 		e = e[srt]
 		s = s[srt]
-		return e,s,l
+		return e,s,self.Label[I]
 
 	
 	def GetSpectrum(self,Date,ut,Method='nearest',Maxdt=60.0,Split=False,xparam='E',yparam='Flux'):
@@ -320,7 +791,8 @@ class PSpecCls(object):
 		Method : str
 			'nearest'|'interpolate' - will find the nearest spectrum to
 			the time specified time, or will interpolate between two 
-			surrounding spectra.
+			surrounding spectra (the nearest is used where these are
+			either side of a gap or a change in energy table).
 		Maxdt : float
 			Maximum difference in time between the specified time and the
 			time of the spectra in seconds.
@@ -372,6 +844,209 @@ class PSpecCls(object):
 			
 		return energy,spec,labs
 		
+	def GetSpectra(self,Date,ut,Method='nearest',Maxdt=60.0,xparam='E',yparam='Flux'):
+		'''
+		This method will return the spectra at an array of times.
+		
+		Inputs
+		======
+		Date : int
+			Date(s) in format yyyymmdd, either a scalar or an array with
+			the same length as ut.
+		ut : float
+			Array of times in hours since beginning of the day.
+		Method : str
+			'nearest'|'interpolate' - will find the nearest spectrum to
+			the time specified time, or will interpolate between two 
+			surrounding spectra (the nearest is used where these are
+			either side of a gap or a change in energy table).
+		Maxdt : float
+			Maximum difference in time between the specified time and the
+			time of the spectra in seconds.
+		xparam : str
+			Sets the x-axis of the returned spectrum to be either energy
+			(keV) or velocity (m/s): 'E'|'V'
+		yparam : str
+			Sets the type of spectrum output to either differential
+			energy flux or phase space density: 'Flux'|'PSD'
+		
+		Returns
+		=======
+		energy : float
+			Array of energies or velocities, shape (M,ne), with each row
+			sorted and padded with NaNs at the end.
+		spec : float
+			Array of spectra, shape (M,ne).
+		
+		'''
+	
+		#convert to continuous time
+		ut = np.array([ut]).flatten()
+		Date = np.zeros(ut.size,dtype='int32') + Date
+		utc = TT.ContUT(Date,ut)
+		dutc = Maxdt/3600.0
+		
+		#blocks with the same energy-table layout are combined by 
+		#picking the one with the nearest record
+		keys = []
+		energy = {}
+		spec = {}
+		dist = {}
+		for i in range(0,self.n):
+			e,s,d = self._GetSpectra(i,utc,dutc,Method,xparam,yparam)
+			k = self._SegmentKey(i)
+			if not k in keys:
+				keys.append(k)
+				energy[k] = e
+				spec[k] = s
+				dist[k] = d
+			else:
+				use = d < dist[k]
+				energy[k][use] = e[use]
+				spec[k][use] = s[use]
+				dist[k][use] = d[use]
+				
+		if len(keys) == 0:
+			return np.zeros((ut.size,0)),np.zeros((ut.size,0))
+		
+		#combine and sort each row by energy (NaNs go to the end)
+		energy = np.concatenate([energy[k] for k in keys],axis=1)
+		spec = np.concatenate([spec[k] for k in keys],axis=1)
+		srt = np.argsort(energy,axis=1)
+		energy = np.take_along_axis(energy,srt,axis=1)
+		spec = np.take_along_axis(spec,srt,axis=1)
+		
+		#remove columns which are never used
+		good = np.where(np.isfinite(energy).any(axis=0))[0]
+		
+		return energy[:,good],spec[:,good]
+		
+	def Regrid(self,Date,ut,Energy,Method='mean',zparam='Flux',Overlap='mean',Maxdt=60.0):
+		'''
+		Resample all of the stored spectra onto a common time-energy 
+		grid. Each spectrum is interpolated linearly in log10(Energy) 
+		onto the new energy bins, then the spectra are combined in time
+		according to Method.
+		
+		Inputs
+		======
+		Date : int
+			Date(s) in format yyyymmdd, either a scalar or an array with
+			the same length as ut.
+		ut : float
+			Edges of the time bins in hours since the beginning of the
+			day, shape (nt+1,).
+		Energy : float
+			Energies of the new grid (keV), shape (ne,).
+		Method : str
+			'mean' - average all spectra which start within each time
+				bin.
+			'nearest'|'interpolate' - use the nearest spectrum to the 
+				centre of each time bin (within Maxdt), or interpolate 
+				between the two surrounding spectra.
+		zparam : str
+			'Flux'|'PSD' - which spectrum to regrid.
+		Overlap : str
+			How to combine blocks of spectra (e.g. different instruments)
+			which cover the same grid cell:
+			'mean' - average of all of the spectra in the cell.
+			'max' - the largest of the blocks' averages.
+			'first' - the first block which has data in the cell.
+		Maxdt : float
+			Maximum difference in time between the centre of each time
+			bin and the time of the spectra in seconds (only used when
+			Method is 'nearest' or 'interpolate').
+			
+		Returns
+		=======
+		spec : float
+			Regridded spectra, shape (nt,ne), NaN where there are no 
+			data.
+		
+		'''
+		
+		#convert to continuous time
+		ut = np.array([ut]).flatten()
+		Date = np.zeros(ut.size,dtype='int32') + Date
+		te = TT.ContUT(Date,ut)
+		Energy = np.array([Energy]).flatten()
+		nt = te.size - 1
+		ne = Energy.size
+		
+		if Overlap == 'mean':
+			tot = np.zeros((nt,ne),dtype='float64')
+			cnt = np.zeros((nt,ne),dtype='float64')
+		else:
+			out = np.zeros((nt,ne),dtype='float64') + np.nan
+			
+		for i in range(0,self.n):
+			s,c = self._RegridBlock(i,te,Energy,Method,zparam,Maxdt/3600.0)
+			if s is None:
+				continue
+			if Overlap == 'mean':
+				tot += s
+				cnt += c
+			else:
+				with np.errstate(invalid='ignore',divide='ignore'):
+					m = s/c
+				if Overlap == 'max':
+					out = np.fmax(out,m)
+				else:
+					out = np.where(np.isfinite(out),out,m)
+		
+		if Overlap == 'mean':
+			with np.errstate(invalid='ignore',divide='ignore'):
+				out = tot/cnt
+		return out
+		
+	def _RegridBlock(self,I,te,Energy,Method,zparam,dutc):
+		'''
+		Regrid a single block of spectra (see PSpecCls.Regrid).
+		
+		Returns
+		=======
+		s : float
+			Sum of the spectra in each grid cell (None if the block is
+			outside of the grid).
+		c : float
+			Number of spectra in each grid cell.
+		
+		'''
+		tind = self.TimeIndex[I]
+		nt = te.size - 1
+		ne = Energy.size
+		
+		if Method == 'mean':
+			#spectra which start within the grid
+			use,n = tind.Slice(te[0],np.nextafter(te[-1],-np.inf))
+			if n == 0:
+				return None,None
+			if zparam == 'PSD':
+				Spec = self.PSD[I][use]
+			else:
+				Spec = self.Spec[I][use]
+			E = self.Energy[I]
+			if len(E.shape) == 2:
+				E = E[use]
+			z = InterpLogEnergy(E,Spec,Energy)
+			
+			#sum them in each time bin
+			ti = np.searchsorted(te,self.utc[I][use],side='right') - 1
+			fin = np.isfinite(z)
+			ind = (ti[:,np.newaxis]*ne + np.arange(ne)).ravel()
+			s = np.bincount(ind,weights=np.where(fin,z,0.0).ravel(),minlength=nt*ne)
+			c = np.bincount(ind,weights=fin.ravel(),minlength=nt*ne)
+			return s.reshape((nt,ne)),c.reshape((nt,ne))
+		else:
+			#the spectra at the centre of each bin
+			tc = 0.5*(te[1:] + te[:-1])
+			if (tind.utc[0] - dutc > tc[-1]) or (tind.utc[-1] + dutc < tc[0]):
+				return None,None
+			e,Spec,_ = self._GetSpectra(I,tc,dutc,Method,'E',zparam)
+			z = InterpLogEnergy(e,Spec,Energy)
+			fin = np.isfinite(z)
+			return np.where(fin,z,0.0),np.float64(fin)
+		
 	def PlotSpectrum(self,Date,ut,Method='nearest',Maxdt=60.0,Split=False,
 		fig=None,maps=[1,1,0,0],color=None,xlog=True,ylog=None,xparam='E',yparam='Flux',
 		FitKappa=False,FitMaxwellian=False,nox=False,noy=False,Erange=(0.0,np.inf),
@@ -388,7 +1063,8 @@ class PSpecCls(object):
 		Method : str
 			'nearest'|'interpolate' - will find the nearest spectrum to
 			the time specified time, or will interpolate between two 
-			surrounding spectra.
+			surrounding spectra (the nearest is used where these are
+			either side of a gap or a change in energy table).
 		Maxdt : float
 			Maximum difference in time between the specified time and the
 			time of the spectra in seconds.
@@ -548,7 +1224,8 @@ class PSpecCls(object):
 				
 		
 	def Plot(self,Date=None,ut=[0.0,24.0],fig=None,maps=[1,1,0,0],ylog=None,scale=None,zlog=None,
-			cmap='gnuplot',yparam='E',zparam='Flux',nox=False,noy=False,TickFreq='auto',PosAxis=True):
+			cmap='gnuplot',yparam='E',zparam='Flux',nox=False,noy=False,TickFreq='auto',PosAxis=True,
+			Downsample=True):
 		'''
 		Plots the spectrogram
 		
@@ -590,6 +1267,10 @@ class PSpecCls(object):
 			If True, no labels or tick marks are drawn for the x-axis
 		noy : bool
 			If True, no labels or tick marks are drawn for the y-axis
+		Downsample : bool
+			If True, long time ranges are plotted using the mean of 
+			groups of records, such that there is roughly one record per
+			pixel (see SpecPyramid).
 		'''
 		
 		
@@ -600,6 +1281,9 @@ class PSpecCls(object):
 			fig.figure()
 		ax = fig.subplot2grid((maps[1],maps[0]),(maps[3],maps[2]))
 		
+		#make sure that the limits include all of the data
+		self._UpdateLimits(PSD=(yparam == 'V') or (zparam == 'PSD'))
+		
 		#set axis limits
 		if Date is None:
 			ax.set_xlim(self._utlim)
@@ -643,37 +1327,16 @@ class PSpecCls(object):
 
 			
 		#get color scale
-		if zlog is None:
-			zlog = self._zlog
-		if zparam == 'PSD':
-			if scale is None:
-				if zlog:
-					scale = self._psdlogscale
-				else:
-					scale = self._psdscale
-		elif zparam == 'Flux':
-			if scale is None:
-				if zlog:
-					scale = self._logscale
-				else:
-					scale = self._scale
-		if zlog:
-			norm = colors.LogNorm(vmin=scale[0],vmax=scale[1])
-		else:
-			norm = colors.Normalize(vmin=scale[0],vmax=scale[1])
+		norm = self._GetNorm(zparam,zlog,scale)
 			
 		#create plots
 		for i in range(0,self.n):
-			tmp = self._PlotSpectrogram(ax,i,norm,cmap,yparam,zparam)
+			tmp = self._PlotSpectrogram(ax,i,norm,cmap,yparam,zparam,Downsample)
 			if i == 0:
 				sm = tmp
 
 		#sort the UT axis out
-		tdate = np.concatenate(self.Date)
-		tutc = np.concatenate(self.utc)
-		srt = np.argsort(tutc)
-		tdate = tdate[srt]
-		tutc = tutc[srt]
+		tdate,tutc = self._GetTimeAxis()
 
 
 
@@ -757,11 +1420,7 @@ class PSpecCls(object):
 			ax.set_xlim(utclim)		
 			
 		#now update the axis
-		tdate = np.concatenate(self.Date)
-		tutc = np.concatenate(self.utc)
-		srt = np.argsort(tutc)
-		tdate = tdate[srt]
-		tutc = tutc[srt]
+		tdate,tutc = self._GetTimeAxis()
 		if PosAxis:
 			udate = np.unique(tdate)
 			
@@ -779,27 +1438,141 @@ class PSpecCls(object):
 			TT.DTPlotLabel(ax,tutc,tdate,TickFreq=TickFreq)		
 		
 
-	def _PlotSpectrogram(self,ax,I,norm,cmap,yparam,zparam):
+	def _GetNorm(self,zparam,zlog,scale):
 		'''
-		This will plot a single spectrogram (multiple may be stored in
-		this object at any one time
+		Return the colour normalization for a spectrogram.
+		
+		'''
+		if zlog is None:
+			zlog = self._zlog
+		if zparam == 'PSD':
+			if scale is None:
+				if zlog:
+					scale = self._psdlogscale
+				else:
+					scale = self._psdscale
+		elif zparam == 'Flux':
+			if scale is None:
+				if zlog:
+					scale = self._logscale
+				else:
+					scale = self._scale
+		if zlog:
+			norm = colors.LogNorm(vmin=scale[0],vmax=scale[1])
+		else:
+			norm = colors.Normalize(vmin=scale[0],vmax=scale[1])
+		return norm
+		
+	def Rasterize(self,Date=None,ut=[0.0,24.0],Width=800,Height=200,ylog=None,
+			scale=None,zlog=None,cmap='gnuplot',yparam='E',zparam='Flux',
+			Downsample=True):
+		'''
+		Draw the spectrogram directly into an RGBA image (no matplotlib
+		figure or artists are created), using the same axis limits and 
+		colours as PSpecCls.Plot. This is much faster than Plot when 
+		creating lots of quicklook images. Pixels with no data are 
+		transparent.
+		
+		Inputs
+		======
+		Date : int32
+			Either a single date in the format yyyymmdd, or a 2 element
+			tuple/list/numpy.ndarray with the start and end dates. If
+			None (default) then the time limits are calculated 
+			automatically.
+		ut : list/tuple
+			2-element start and end times, where each element is the 
+			time in hours since the start of the day, e.g. 17:30 == 17.5.
+		Width : int
+			Width of the image in pixels.
+		Height : int
+			Height of the image in pixels.
+		ylog : bool
+			If True, y-axis is logarithmic
+		scale : list
+			2-element list or tuple containing the minimum and maximum
+			extents of the color scale
+		zlog : bool
+			if True, color scale is logarithmic
+		cmap : str
+			String containing the name of the colomap to use
+		yparam : str
+			Sets the y-axis to be either energy (keV) or velocity (m/s):
+			'E'|'V'
+		zparam : str
+			Sets the type of spectrum to either differential
+			energy flux or phase space density: 'Flux'|'PSD'
+		Downsample : bool
+			If True, long time ranges are drawn using the mean of 
+			groups of records, such that there is roughly one record per
+			pixel (see SpecPyramid).
+			
+		Returns
+		=======
+		img : uint8
+			RGBA image, shape (Height,Width,4).
+		
+		'''
+		self._UpdateLimits(PSD=(yparam == 'V') or (zparam == 'PSD'))
+		
+		#the same limits as Plot
+		if Date is None:
+			tlim = self._utlim
+		else:
+			if np.size(Date) == 1:
+				Date0 = Date
+				Date1 = Date
+			else:
+				Date0 = Date[0]
+				Date1 = Date[1]
+			tlim = TT.ContUT(np.array([Date0,Date1]),np.array(ut))
+		if ylog is None:
+			ylog = self._ylog
+		if yparam == 'V':
+			ylim = self._logvlim if ylog else self._vlim
+		else:
+			ylim = self._logelim if ylog else self._elim
+		norm = self._GetNorm(zparam,zlog,scale)
+		
+		img = NewRasterImage(Width,Height)
+		for i in range(0,self.n):
+			key = (i,yparam,zparam)
+			if Downsample:
+				if not key in self._pyramids:
+					self._pyramids[key] = SpecPyramid(*self._SpectrogramData(i,yparam,zparam),
+											Blocks=self.TimeIndex[i].Blocks)
+				self._pyramids[key].Rasterize(img,tlim,ylim,norm,cmap,ylog)
+			else:
+				utc,dt,e0,e1,Spec = self._SpectrogramData(i,yparam,zparam)
+				RasterSpectrogram(img,utc,dt,e0,e1,Spec,norm,cmap,tlim,ylim,ylog,
+								Blocks=self.TimeIndex[i].Blocks)
+		return img
+		
+	def SaveQuicklook(self,fname,*args,**kwargs):
+		'''
+		Save a quicklook PNG image of the spectrogram, without using a
+		matplotlib figure. The arguments are the same as 
+		PSpecCls.Rasterize.
 		
+		Inputs
+		======
+		fname : str
+			Name of the PNG file.
+		
+		'''
+		SaveRasterImage(fname,self.Rasterize(*args,**kwargs))
 		
+	def _SpectrogramData(self,I,yparam,zparam):
+		'''
+		Return the time axis, bin limits and data used to plot the I'th
+		spectrogram.
 		
 		'''
 		#get the appropriate data
-		Date = self.Date[I]
 		utc = self.utc[I]
-		ut = self.ut[I]
 		dt = self.dt[I]
-		ew = self.ew[I]
 		
-		if yparam == 'V':
-			ew = self.Vew[I]
-			e = self.V[I]
-		elif yparam == 'E':	
-			ew = self.ew[I]
-			e = self.Energy[I]
+		e,ew,Index = self._EnergyTables(I,yparam)
 		
 		if zparam == 'PSD'	:
 			Spec = self.PSD[I]		
@@ -807,258 +1580,197 @@ class PSpecCls(object):
 			Spec = self.Spec[I]	
 		
 		#get the energy band limits
-		bad = np.where(np.isnan(e))
-		e[bad] = 0.0
 		le = np.log10(e)
 		lw = np.log10(ew)
 		e0 = 10**(le - 0.5*lw)
 		e1 = 10**(le + 0.5*lw)
+		if not Index is None:
+			e0 = EnergyTable(e0,Index)
+			e1 = EnergyTable(e1,Index)
+		return utc,dt,e0,e1,Spec
+		
+	def _PlotSpectrogram(self,ax,I,norm,cmap,yparam,zparam,Downsample=False):
+		'''
+		This will plot a single spectrogram (multiple may be stored in
+		this object at any one time), using one mesh per continuous 
+		block of data within the current time axis limits.
+		
+		'''
+		#use the cached pyramid if there is one
+		key = (I,yparam,zparam)
+		if Downsample and key in self._pyramids:
+			return self._pyramids[key].Plot(ax,norm,cmap)
+			
+		utc,dt,e0,e1,Spec = self._SpectrogramData(I,yparam,zparam)
 
 		self.e0 = e0
 		self.e1 = e1
 
-		#get the ut array limits
-		t0 = utc
-		t1 = utc + dt
-		
-		
-		#look for gaps in ut
-		if len(e.shape) > 1:
+		if Downsample:
+			self._pyramids[key] = SpecPyramid(utc,dt,e0,e1,Spec,Blocks=self.TimeIndex[I].Blocks)
+			return self._pyramids[key].Plot(ax,norm,cmap)
 
-			isgap = ((utc[1:] - utc[:-1]) > 60.0/3600.0) | ((e[1:,:] - e[:-1,:]) != 0).any(axis=1)
-			ne = e.shape[1]
-		else:
-			#isgap = (utc[1:] - utc[:-1]) > 1.1*dt[:-1]
-			isgap = (utc[1:] - utc[:-1]) > 60.0/3600.0
-			ne = e.size
-		gaps = np.where(isgap)[0] + 1
-		if gaps.size == 0:
-			#no gaps
-			i0 = [0]
-			i1 = [utc.size]
-		else:
-			#lots of gaps
-			i0 = np.append(0,gaps)
-			i1 = np.append(gaps,utc.size)
-		ng = np.size(i0)
-
-		#loop through each continuous block of utc
-		for i in range(0,ng):
-			ttmp = np.append(t0[i0[i]:i1[i]],t1[i1[i]-1])
-			st = Spec[i0[i]:i1[i]]
-			for j in range(0,ne):				
-				if len(e.shape) > 1:
-					etmp = np.array([e0[i0[i],j],e1[i0[i],j]])
-				else:
-					etmp = np.array([e0[j],e1[j]])
-				if np.isfinite(etmp).all():
-					#plot each row of energy
-					tg,eg = np.meshgrid(ttmp,etmp)
-					
-					s = np.array([st[:,j]])
-					
-					sm = ax.pcolormesh(tg,eg,s,cmap=cmap,norm=norm)
-			
-		return sm
+		return SpectrogramMesh(ax,utc,dt,e0,e1,Spec,norm,cmap,tlim=ax.get_xlim(),
+							Blocks=self.TimeIndex[I].Blocks)
 		
-	def _CalculateTimeLimits(self):
+	def _ResetLimits(self):
 		'''
-		Loop through all of the stored spectra and find the time limits.
+		Reset the running time, energy, velocity and scale limits.
 		
 		'''
-		#initialize time limits
-		utlim = [np.inf,-np.inf]
-		
-		#loop through each array
-		n = len(self.utc)
-		for i in range(0,n):
-			mn = np.nanmin(self.utc[i])
-			mx = np.nanmax(self.utc[i] + self.dt[i])
-			if mn < utlim[0]:
-				utlim[0] = mn
-			if mx > utlim[1]:
-				utlim[1] = mx
-		self._utlim = utlim
-		
-	def _CalculateEnergyLimits(self):
+		self._pending = []
+		self._pendingpsd = []
+		self._utlim = [np.inf,-np.inf]
+		self._elim = [0.0,-np.inf]
+		self._lelim = [np.inf,-np.inf]
+		self._logelim = 10**np.array(self._lelim)
+		self._vlim = [0.0,-np.inf]
+		self._lvlim = [np.inf,-np.inf]
+		self._logvlim = 10**np.array(self._lvlim)
+		self._stats = RunningStats()
+		self._psdstats = RunningStats()
+		self._scale = [np.inf,-np.inf]
+		self._logscale = [np.inf,-np.inf]
+		self._psdscale = [np.inf,-np.inf]
+		self._psdlogscale = [np.inf,-np.inf]
+		
+	def _UpdateLimits(self,PSD=False):
 		'''
-		Loop through all of the stored spectra and work out the energy
-		range to plot.
+		Fold any spectra added since the last call into the running 
+		time, energy and flux scale limits (and the velocity and PSD 
+		limits if PSD is True). Each block of spectra is only processed
+		once.
 		
 		'''
-		#initialize energy limits
-		elim = [0.0,-np.inf]
-		logelim = [np.inf,-np.inf]
-		
-
-		#loop through each array
-		n = len(self.Energy)
-		for i in range(0,n):
-			le = np.log10(self.Energy[i])
-			lw = np.log10(self.ew[i])
-			e0 = 10**(le - 0.5*lw)
-			e1 = 10**(le + 0.5*lw)
-			mn = np.nanmin(e0)
-			mx = np.nanmax(e1)
-			if mn < elim[0]:
-				elim[0] = mn
-			if mx > elim[1]:
-				elim[1] = mx
-			le0 = np.log10(e0)
-			le1 = np.log10(e1)
-			bad = np.where(self.Energy[i] <= 0.0)
-			le0[bad] = np.nan
-			le1[bad] = np.nan
-
-			lmn = np.nanmin(le0)
-			lmx = np.nanmax(le1)
-			if lmn < logelim[0]:
-				logelim[0] = lmn
-			if lmx > logelim[1]:
-				logelim[1] = lmx
-
-		self._elim = elim
-		self._logelim = 10**np.array(logelim)
-
-
-	def _CalculateVLimits(self):
+		if len(self._pending) > 0:
+			for i in self._pending:
+				self._CalculateTimeLimits(i)
+				self._CalculateEnergyLimits(i)
+				self._stats.Add(self.Spec[i])
+			self._pending = []
+			self._scale,self._logscale = self._stats.Scale(self._ScaleType,self._nStd)
+			
+		if PSD and len(self._pendingpsd) > 0:
+			for i in self._pendingpsd:
+				self._CalculateVLimits(i)
+				self._psdstats.Add(self.PSD[i])
+			self._pendingpsd = []
+			self._psdscale,self._psdlogscale = self._psdstats.Scale(self._ScaleType,self._nStd)
+		
+	def _GetLimitState(self):
 		'''
-		Loop through all of the stored spectra and work out the velocity
-		range to plot.
+		Return the running limits as a JSON-serializable dict.
 		
 		'''
-		#initialize velocity limits
-		vlim = [0.0,-np.inf]
-		logvlim = [np.inf,-np.inf]
+		state = {}
+		for l in ['_pending','_pendingpsd','_utlim','_elim','_lelim','_vlim','_lvlim']:
+			state[l] = list(getattr(self,l))
+		state['_stats'] = dict(self._stats.__dict__)
+		state['_psdstats'] = dict(self._psdstats.__dict__)
+		return state
+		
+	def _SetLimitState(self,state):
+		'''
+		Restore the running limits saved by _GetLimitState.
 		
-
-		#loop through each array
-		n = len(self.V)
-		for i in range(0,n):
-			f0 = self.V[i] - self.Vew[i]/2.0
-			f1 = self.V[i] + self.Vew[i]/2.0
-			mn = np.nanmin(f0)
-			mx = np.nanmax(f1)
-			if mn < vlim[0]:
-				vlim[0] = mn
-			if mx > vlim[1]:
-				vlim[1] = mx
-			lf0 = np.log10(f0)
-			lf1 = np.log10(f1)
-			bad = np.where(self.V[i] <= 0.0)
-			lf0[bad] = np.nan
-			lf1[bad] = np.nan
-
-			lmn = np.nanmin(lf0)
-			lmx = np.nanmax(lf1)
-			if lmn < logvlim[0]:
-				logvlim[0] = lmn
-			if lmx > logvlim[1]:
-				logvlim[1] = lmx
-
-		self._vlim = vlim
-		self._logvlim = 10**np.array(logvlim)
-
-
+		'''
+		for l in ['_pending','_pendingpsd','_utlim','_elim','_lelim','_vlim','_lvlim']:
+			setattr(self,l,list(state[l]))
+		self._logelim = 10**np.array(self._lelim)
+		self._logvlim = 10**np.array(self._lvlim)
+		self._stats.__dict__.update(state['_stats'])
+		if self._stats.size > 0:
+			self._scale,self._logscale = self._stats.Scale(self._ScaleType,self._nStd)
+		self._psdstats.__dict__.update(state['_psdstats'])
+		if self._psdstats.size > 0:
+			self._psdscale,self._psdlogscale = self._psdstats.Scale(self._ScaleType,self._nStd)
+		
+	def _MergeLimits(self,other):
+		'''
+		Combine the limits of another PSpecCls object with these.
 		
-	def _CalculateScale(self):
 		'''
-		Calculate the default scale limits for the plot.
+		for l in ['_utlim','_elim','_lelim','_vlim','_lvlim']:
+			a = getattr(self,l)
+			b = getattr(other,l)
+			setattr(self,l,[min(a[0],b[0]),max(a[1],b[1])])
+		self._logelim = 10**np.array(self._lelim)
+		self._logvlim = 10**np.array(self._lvlim)
+		
+		self._stats.Merge(other._stats)
+		if self._stats.size > 0:
+			self._scale,self._logscale = self._stats.Scale(self._ScaleType,self._nStd)
+		self._psdstats.Merge(other._psdstats)
+		if self._psdstats.size > 0:
+			self._psdscale,self._psdlogscale = self._psdstats.Scale(self._ScaleType,self._nStd)
+		
+	def _CalculateTimeLimits(self,I):
+		'''
+		Update the time limits using the I'th set of spectra.
 		
 		'''
-		scale = [np.inf,-np.inf]
-		logscale = [np.inf,-np.inf]
+		mn = np.nanmin(self.utc[I])
+		mx = np.nanmax(self.utc[I] + self.dt[I])
+		if mn < self._utlim[0]:
+			self._utlim[0] = mn
+		if mx > self._utlim[1]:
+			self._utlim[1] = mx
+		
+	def _CalculateEnergyLimits(self,I):
+		'''
+		Update the energy range to plot using the I'th set of spectra.
 		
-		n = len(self.Spec)
-		for i in range(0,n):
-			ls = np.log10(self.Spec[i])
-			bad = np.where(self.Spec[i] <= 0)
-			ls[bad] = np.nan
-				
-			if self._ScaleType == 'std':
-				mu = np.nanmean(self.Spec[i])
-				std = np.std(self.Spec[i])
-				
-				lmu = np.nanmean(ls)
-				lstd = np.std(ls)
-					
-				tmpscale = [mu - self._nStd*std, mu + self._nStd*std]
-				tmplogscale = 10**np.array([lmu - self._nStd*lstd, lmu + self._nStd*lstd])					
-				
-			elif self._ScaleType == 'positive':
-				#calculate the scale based on all values being positive 
-				std = np.sqrt((1.0/np.sum(self.Spec[i].size))*np.nansum((self.Spec[i])**2))
-				lstd = np.sqrt(((1.0/np.sum(np.isfinite(ls))))*np.nansum((ls)**2))
-					
-				tmpscale = [0.0,std*self._nStd]
-				tmplogscale = 10**np.array([np.nanmin(ls),lstd*self._nStd])			
-			else:
-				#absolute range
-				tmpscale = [np.nanmin(self.Spec[i]),np.nanmax(self.Spec[i])]
-				tmplogscale = 10**np.array([np.nanmin(ls),np.nanmax(ls)])
+		'''
+		E,ew,_ = self._EnergyTables(I)
+		le = np.log10(E)
+		lw = np.log10(ew)
+		e0 = 10**(le - 0.5*lw)
+		e1 = 10**(le + 0.5*lw)
+		mn = np.nanmin(e0)
+		mx = np.nanmax(e1)
+		if mn < self._elim[0]:
+			self._elim[0] = mn
+		if mx > self._elim[1]:
+			self._elim[1] = mx
+		le0 = np.log10(e0)
+		le1 = np.log10(e1)
+		bad = np.where(E <= 0.0)
+		le0[bad] = np.nan
+		le1[bad] = np.nan
 
+		lmn = np.nanmin(le0)
+		lmx = np.nanmax(le1)
+		if lmn < self._lelim[0]:
+			self._lelim[0] = lmn
+		if lmx > self._lelim[1]:
+			self._lelim[1] = lmx
+		self._logelim = 10**np.array(self._lelim)
 
-			if tmpscale[0] < scale[0]:
-				scale[0] = tmpscale[0]
-			if tmpscale[1] > scale[1]:
-				scale[1] = tmpscale[1]
-			
-			if tmplogscale[0] < logscale[0]:
-				logscale[0] = tmplogscale[0]
-			if tmplogscale[1] > logscale[1]:
-				logscale[1] = tmplogscale[1]
-	
-		
-		self._scale = scale
-		self._logscale = logscale
-	
-	def _CalculatePSDScale(self):
+
+	def _CalculateVLimits(self,I):
 		'''
-		Calculate the default scale limits for the plot.
+		Update the velocity range to plot using the I'th set of spectra.
 		
 		'''
-		scale = [np.inf,-np.inf]
-		logscale = [np.inf,-np.inf]
-		
-		n = len(self.PSD)
-		for i in range(0,n):
-			ls = np.log10(self.PSD[i])
-			bad = np.where(self.PSD[i] <= 0)
-			ls[bad] = np.nan
-				
-			if self._ScaleType == 'std':
-				mu = np.nanmean(self.PSD[i])
-				std = np.std(self.PSD[i])
-				
-				lmu = np.nanmean(ls)
-				lstd = np.std(ls)
-					
-				tmpscale = [mu - self._nStd*std, mu + self._nStd*std]
-				tmplogscale = 10**np.array([lmu - self._nStd*lstd, lmu + self._nStd*lstd])					
-				
-			elif self._ScaleType == 'positive':
-				#calculate the scale based on all values being positive 
-				std = np.sqrt((1.0/np.sum(self.Spec[i].size))*np.nansum((self.PSD[i])**2))
-				lstd = np.sqrt(((1.0/np.sum(np.isfinite(ls))))*np.nansum((ls)**2))
-					
-				tmpscale = [0.0,std*self._nStd]
-				tmplogscale = 10**np.array([np.nanmin(ls),lstd*self._nStd])			
-			else:
-				#absolute range
-				tmpscale = [np.nanmin(self.PSD[i]),np.nanmax(self.PSD[i])]
-				tmplogscale = 10**np.array([np.nanmin(ls),np.nanmax(ls)])
-
+		V,Vew,_ = self._EnergyTables(I,'V')
+		f0 = V - Vew/2.0
+		f1 = V + Vew/2.0
+		mn = np.nanmin(f0)
+		mx = np.nanmax(f1)
+		if mn < self._vlim[0]:
+			self._vlim[0] = mn
+		if mx > self._vlim[1]:
+			self._vlim[1] = mx
+		lf0 = np.log10(f0)
+		lf1 = np.log10(f1)
+		bad = np.where(V <= 0.0)
+		lf0[bad] = np.nan
+		lf1[bad] = np.nan
 
-			if tmpscale[0] < scale[0]:
-				scale[0] = tmpscale[0]
-			if tmpscale[1] > scale[1]:
-				scale[1] = tmpscale[1]
-			
-			if tmplogscale[0] < logscale[0]:
-				logscale[0] = tmplogscale[0]
-			if tmplogscale[1] > logscale[1]:
-				logscale[1] = tmplogscale[1]
-	
-		
-		self._psdscale = scale
-		self._psdlogscale = logscale
+		lmn = np.nanmin(lf0)
+		lmx = np.nanmax(lf1)
+		if lmn < self._lvlim[0]:
+			self._lvlim[0] = lmn
+		if lmx > self._lvlim[1]:
+			self._lvlim[1] = lmx
+		self._logvlim = 10**np.array(self._lvlim)
@@ -13,6 +13,11 @@ from ..Pos.ReadFieldTraces import ReadFieldTraces
 from .PosDTPlotLabel import PosDTPlotLabel
 from .RelVelocity import RelVelocity
 from .ColorMap import jetish
+from .SpectrogramMesh import SpectrogramMesh,SpectrogramBinEdges
+from .SpecPyramid import SpecPyramid
+from .RasterSpectrogram import RasterSpectrogram,NewRasterImage,SaveRasterImage
+from .TimeIndex import TimeIndex
+from .SpecStore import SaveSpecArrays
 import matplotlib.patheffects as path_effects
 from scipy.stats import mode
 import matplotlib.patheffects as path_effects
@@ -29,7 +34,8 @@ defargs = {	'tlabel' : 'UT',
 			'flog' : True, 
 			'plog' : True, 
 			'ScaleType' : 'range',
-			'nStd' : 2}
+			'nStd' : 2,
+			'PSDdtype' : 'float64'}
 
 amu = 1.6605e-27
 
@@ -81,6 +87,10 @@ class PSpecPADCls(object):
 			True for logarithmic flux axis
 		plog : bool
 			True for logarithmic PSD axis
+		PSDdtype : str
+			Data type used to store PSD, e.g. 'float32' to halve its
+			memory use. PSD (and its scale limits) are only calculated
+			when they are first accessed.
 		
 		'''
 		
@@ -108,12 +118,16 @@ class PSpecPADCls(object):
 		#Process the energy bins
 		self._ProcessEnergy()
 
-		#get phase space density
-		self._CalculatePSD()
+		#get the velocities (PSD is calculated when first needed)
+		self._PSDdtype = kwargs.get('PSDdtype',defargs['PSDdtype'])
+		self._CalculateV()
 		
 		#calculate dt
 		self._ProcessDT()
 
+		#find the continuous segments of data
+		self._CalculateTimeIndex()
+
 
 		
 		
@@ -131,14 +145,144 @@ class PSpecPADCls(object):
 		self._ScaleType = kwargs.get('ScaleType',defargs['ScaleType'])
 		self._nStd = kwargs.get('nStd',defargs['nStd'])
 		
+		#downsampled copies of each spectrogram (see _PlotSpectrogram)
+		#and loss cone pitch angles (see _PlotLossCone)
+		self._pyramids = {}
+		self._losscone = {}
+		
 		#calculate the new time, energy and z scale limits
 		self._CalculateTimeLimits() 
 		self._CalculateEnergyLimits()
 		self._CalculateScale()
 		self._CalculateVLimits()
-		self._CalculatePSDScale()		
 
+	def __getattr__(self,name):
+		'''
+		Calculate PSD and its scale limits the first time that they are
+		accessed, after which they are ordinary attributes.
+		
+		'''
+		if name == 'PSD':
+			self.PSD = self._CalculatePSD()
+			return self.PSD
+		if name in ['_psdscale','_psdlogscale']:
+			self._CalculatePSDScale()
+			return getattr(self,name)
+		raise AttributeError("'PSpecPADCls' object has no attribute '{:s}'".format(name))
 	
+	def Slice(self,ut):
+		'''
+		Return a new PSpecPADCls object containing only the spectra 
+		within a time interval. The arrays of the new object are views 
+		of this one's where possible (rather than copies) and its limits
+		are calculated only from the spectra within the interval.
+		
+		Inputs
+		======
+		ut : list/tuple
+			2-element start and end times, where each element is the 
+			time in hours since the start of the day, e.g. 17:30 == 17.5.
+			
+		Returns
+		=======
+		PSpecPADCls object
+		
+		'''
+		Date = mode(self.Date,keepdims=True)[0][0]
+		utclim = TT.ContUT(np.array([Date,Date]),np.array(ut))
+		return self[utclim[0]:utclim[1]]
+		
+	def __getitem__(self,key):
+		'''
+		Slice the object in time, e.g. PAD[utc0:utc1] where utc0 and 
+		utc1 are continuous times (hours since 1950-01-01, see 
+		DateTimeTools.ContUT). See PSpecPADCls.Slice.
+		
+		'''
+		if not isinstance(key,slice) or not key.step is None:
+			raise TypeError('PSpecPADCls objects can only be sliced in time, e.g. PAD[utc0:utc1]')
+		t0 = -np.inf if key.start is None else key.start
+		t1 = np.inf if key.stop is None else key.stop
+		use,nt = self.TimeIndex.Slice(t0,t1)
+		if nt == 0:
+			raise ValueError('There are no spectra within this time interval')
+		
+		#per-record arrays are sliced, everything else is shared
+		out = PSpecPADCls.__new__(PSpecPADCls)
+		out.__dict__.update(self.__dict__)
+		fields = ['Date','ut','utc','dt','Flux','PSD',
+				'Alt','AltMid','Bm','BmMid','B0','AlphaN','AlphaS','BaltN','BaltS']
+		if np.ndim(self.Emid) == 2:
+			fields += ['Emid','Emin','Emax','V','V0','V1']
+		for f in fields:
+			if f in self.__dict__:
+				setattr(out,f,getattr(self,f)[use])
+		for f in ['_psdscale','_psdlogscale']:
+			out.__dict__.pop(f,None)
+		out._pyramids = {}
+		out._losscone = {}
+		out._CalculateTimeIndex()
+		if hasattr(out,'currax'):
+			del out.currax
+		
+		#limits of the new object only
+		out._CalculateTimeLimits() 
+		out._CalculateEnergyLimits()
+		out._CalculateScale()
+		out._CalculateVLimits()
+		return out
+		
+	def Save(self,path):
+		'''
+		Save this object to a directory containing a JSON header and one
+		.npy file per array. It can be reopened (with the arrays memory
+		mapped) using Arase.Tools.LoadSpecObject.
+		
+		Inputs
+		======
+		path : str
+			Directory to save to.
+		
+		'''
+		header,arrays = self._Pack()
+		SaveSpecArrays(path,header,arrays)
+		
+	def _Pack(self):
+		'''
+		Return a header dict describing this object and a dict of all of
+		the arrays needed to recreate it (see PSpecPADCls._Unpack).
+		
+		'''
+		arrays = {}
+		attrs = {}
+		for k in self.__dict__:
+			x = self.__dict__[k]
+			if isinstance(x,np.ndarray):
+				arrays[k] = x
+			elif k in ['currax','_pyramids','_losscone','TimeIndex']:
+				continue
+			else:
+				attrs[k] = x
+		header = {	'Class' : 'PSpecPADCls',
+					'Attributes' : attrs,
+					'Arrays' : list(arrays.keys())}
+		return header,arrays
+		
+	def _Unpack(self,header,Reader):
+		'''
+		Fill this (empty) object using the header and arrays from 
+		PSpecPADCls._Pack, where Reader(name) returns each array (see 
+		Arase.Tools.LoadSpecObject).
+		
+		'''
+		for k in header['Arrays']:
+			setattr(self,k,Reader(k))
+		for k in header['Attributes']:
+			setattr(self,k,header['Attributes'][k])
+		self._pyramids = {}
+		self._losscone = {}
+		self._CalculateTimeIndex()
+		
 	def _ProcessEnergy(self):
 		'''
 		Process the energy bins
@@ -156,15 +300,16 @@ class PSpecPADCls(object):
 		if len(self.Emid.shape) == 2:
 			m,_ = mode(self.Emid,axis=0,keepdims=True)
 			srt = np.argsort(m[0])
-			self.Emid = self.Emid[:,srt]
-			self.Emin = self.Emin[:,srt]
-			self.Emax = self.Emax[:,srt]
 		else:
 			srt = np.argsort(self.Emid)
-			self.Emid = self.Emid[srt]
-			self.Emin = self.Emin[srt]
-			self.Emax = self.Emax[srt]		
-		self.Flux = self.Flux[:,srt,:]
+		
+		#only reorder if needed, so the flux array is not copied (it may 
+		#be memory mapped, or one of the buffers from _Combine)
+		if (srt != np.arange(srt.size)).any():
+			self.Emid = self.Emid[...,srt]
+			self.Emin = self.Emin[...,srt]
+			self.Emax = self.Emax[...,srt]
+			self.Flux = self.Flux[:,srt,:]
 		
 		
 	def _ProcessDT(self):
@@ -174,26 +319,42 @@ class PSpecPADCls(object):
 		self.dt = np.append(dt,dt[-1]).clip(max=8.0/3600.0)
 		
 
-	def _CalculatePSD(self):
-		e = 1.6022e-19
-		self.V = np.sqrt(np.float64(e*2000.0*self.Emid)/self.Mass)
-		self.V0 = np.sqrt(np.float64(e*2000.0*(self.Emin)/self.Mass))
-		self.V1 = np.sqrt(np.float64(e*2000.0*(self.Emax)/self.Mass))
+	def _CalculateTimeIndex(self):
+		'''
+		Create the time index, which splits the data into continuous
+		segments wherever there are gaps in time or the energy bins
+		change (see TimeIndex).
 		
+		'''
+		self.TimeIndex = TimeIndex(self.utc,self.dt,[self.Emin,self.Emax])
+
+	def _CalculateV(self):
+		'''
+		Calculate the velocity at the middle and limits of each energy
+		bin.
+		
+		'''
 		self.V = RelVelocity(self.Emid,self.Mass)
 		self.V0 = RelVelocity(self.Emin,self.Mass)
 		self.V1 = RelVelocity(self.Emax/2.0,self.Mass)
 
-		psd = np.zeros(self.Flux.shape,dtype='float64')
-		if np.size(self.V.shape) == 1: 
-			nv = self.V.size
-			for i in range(0,nv):
-				psd[:,i,:] =  np.float64(self.Flux[:,i,:])*(np.float64(self.Mass)/(2000*e*np.float64(self.Emid[i]/self.Mass))) * np.float64(10.0/e)
+	def _CalculatePSD(self):
+		'''
+		Calculate the phase space density from the flux of every record,
+		energy and pitch angle at once.
+		
+		'''
+		e = 1.6022e-19
+		f0 = (np.float64(self.Mass)/(2000*e*np.float64(self.Emid/self.Mass)))[...,np.newaxis]
+		f1 = np.float64(10.0/e)
+		psd = np.array(self.Flux,dtype=getattr(self,'_PSDdtype','float64'))
+		if psd.dtype == np.float64:
+			psd *= f0
+			psd *= f1
 		else:
-			nv = self.V.shape[-1]
-			for i in range(0,nv):
-				psd[:,i,:] =  (np.float64(self.Flux[:,i,:].T)*(np.float64(self.Mass)/(2000*e*np.float64(self.Emid[:,i]/self.Mass))) * np.float64(10.0/e)).T
-		self.PSD = psd
+			#f0 alone would underflow single precision
+			psd *= f0*f1
+		return psd
 			
 	
 	
@@ -266,102 +427,146 @@ class PSpecPADCls(object):
 		# s = s[srt]
 		# return e,s,l
 
-	def _GetSpectrum(self,sutc,dutc,Method,xparam,zparam):
+	def _GetSpectra(self,sutc,dutc,Method,xparam,zparam):
 		'''
-		Return a 2D array of the nearest spectrum to the specified time
-		(or interpolated between the two surrounding ones)
+		Return 2D arrays of the nearest spectra to an array of times
+		(or interpolated between the two surrounding ones), with the 
+		E/V axis sorted. Spectra further than dutc from the nearest 
+		record are filled with NaNs and d is set to inf.
+		
 		'''
 		#select PSD or Flux
 		if xparam == 'V':
 			x = self.V
 			x0 = self.V0
 			x1 = self.V1
-			xlabel = self.vlabel
 		else:
 			x = self.Emid
 			x0 = self.Emin
 			x1 = self.Emax
-			xlabel = self.elabel
-		y = 0.5*(self.Alpha[1:] + self.Alpha[:-1])
-		y0 = self.Alpha[:-1]
-		y1 = self.Alpha[1:]
-		ylabel = self.alabel
 		if zparam == 'PSD':
 			z = self.PSD
-			zlabel = self.plabel
 		else:
 			z = self.Flux
-			zlabel = self.flabel
 			
-		#sort the E/V axis
+		#the order of the E/V axis
 		if len(x.shape) == 1:
 			srt = np.argsort(x)
-			x = x[srt]
-			x0 = x0[srt]
-			x1 = x1[srt]
 		else:
 			srt = np.argsort(x[0,:])
-			x = x[:,srt]
-			x0 = x0[:,srt]
-			x1 = x1[:,srt]
-		z = z[:,srt,:]
 			
-		#find the surrounding utc
+		#find the nearest and surrounding records (those either side of
+		#a gap or change of energy bins are not interpolated between)
 		utc = self.utc
-		dt = np.abs(utc - sutc)
-		near = np.where(dt == dt.min())[0][0]
+		near,bef,aft = self.TimeIndex.Search(sutc,Segmented=True)
+		d = np.abs(utc[near] - sutc)
+		d[d > dutc] = np.inf
 		
-		#check if the nearest is within dutc
-		if dt[near] > dutc:
-			return None,None,None		
-			
-		if (Method == 'nearest') or (sutc < utc[0]) or (sutc > utc[-1]):
-			z = z[near,:,:]
-			if len(x.shape) == 2:
-				x = x[near,:]
-				x0 = x0[near,:]
-				x1 = x1[near,:]
-			
+		#only the requested records are copied
+		zs = z[near[:,np.newaxis],srt[np.newaxis,:]]
+		if len(x.shape) == 1:
+			x = x[srt]
+			x0 = x0[srt]
+			x1 = x1[srt]
 		else:
-			#in this case we need to find the two surrounding neighbours
-			#and interpolate between them
-			bef = np.where(utc <= sutc)[0][-1]
-			aft = np.where(utc > sutc)[0][0]
-			
-			z0 = z[bef,:,:]
-			z1 = z[aft,:,:]
-			
-			if len(x.shape) == 2:
-				_x0 = x[near,:]
-				_x1 = x[near,:]
-				_x00 = x0[near,:]
-				_x01 = x0[near,:]
-				_x10 = x1[near,:]
-				_x11 = x1[near,:]
-			else:
-				_x0 = x
-				_x1 = x
-				_x00 = x0
-				_x01 = x0
-				_x10 = x1
-				_x11 = x1
+			x = x[near[:,np.newaxis],srt[np.newaxis,:]]
+			x0 = x0[near[:,np.newaxis],srt[np.newaxis,:]]
+			x1 = x1[near[:,np.newaxis],srt[np.newaxis,:]]
 			
-			dt = utc[aft] - utc[bef]
-			dz = z1 - z0
-			dx = _x1 - _x0
+		#interpolate between the two surrounding records where possible
+		if Method != 'nearest':
+			zs = np.float64(zs)
+			use = np.where(np.isfinite(d) & (bef >= 0) & (aft < utc.size))[0]
+			z0 = z[bef[use][:,np.newaxis],srt[np.newaxis,:]]
+			z1 = z[aft[use][:,np.newaxis],srt[np.newaxis,:]]
+			w = (sutc[use] - utc[bef[use]])/(utc[aft[use]] - utc[bef[use]])
+			zs[use] = z0 + w[:,np.newaxis,np.newaxis]*(z1 - z0)
 			
-			dzdt = dz/dt
-			dxdt = dx/dt
+		bad = np.where(~np.isfinite(d))[0]
+		if bad.size > 0:
+			zs = np.float64(zs)
+			zs[bad] = np.nan
 			
-			m = sutc - utc[bef]
+		return x,x0,x1,zs,d
+
+	def _GetSpectrum(self,sutc,dutc,Method,xparam,zparam):
+		'''
+		Return a 2D array of the nearest spectrum to the specified time
+		(or interpolated between the two surrounding ones)
+		'''
+		x,x0,x1,z,d = self._GetSpectra(np.array([sutc]),dutc,Method,xparam,zparam)
+		
+		#check if the nearest is within dutc
+		if not np.isfinite(d[0]):
+			return None,None,None		
+		
+		if len(x.shape) == 2:
+			x = x[0]
+			x0 = x0[0]
+			x1 = x1[0]
+		z = z[0]
 			
-			z = z0 + m*dzdt
-			x = _x0 + m*dxdt	
-			x0 = _x00 + m*dxdt	
-			x1 = _x10 + m*dxdt	
+		#labels and pitch angle bins
+		if xparam == 'V':
+			xlabel = self.vlabel
+		else:
+			xlabel = self.elabel
+		y = 0.5*(self.Alpha[1:] + self.Alpha[:-1])
+		y0 = self.Alpha[:-1]
+		y1 = self.Alpha[1:]
+		ylabel = self.alabel
+		if zparam == 'PSD':
+			zlabel = self.plabel
+		else:
+			zlabel = self.flabel
 				
 		return (x,x0,x1),(y,y0,y1),z,xlabel,ylabel,zlabel
 		
+	def GetSpectra(self,ut,Method='nearest',Maxdt=60.0,xparam='E',zparam='Flux'):
+		'''
+		Return 2D particle spectra at an array of times.
+		
+		Inputs
+		======
+		ut : float
+			Array of times (hours from start of day)
+		Method : str
+			'nearest'|'interpolate' - either find the nearest time 
+			(within Maxdt seconds of ut), or interpolate if possible 
+			between two nearest spectra
+		Maxdt : float
+			Maximum acceptable difference in time between ut and the 
+			returned spectrum
+		xparam : str
+			One dimension of the returned spectrum
+			'E' - Energy
+			'V' - Velocity
+		zparam : str
+			'Flux'|'PSD' - type of spectrum to return.
+		
+		Returns
+		=======
+		(x,x0,x1) : middle,minimum,maximum of xparam bins, either 
+			shape (ne,) or (M,ne)
+		(y,y0,y1) : middle,minimum,maximum of alpha (pitch angle) bins
+		z : 3D array of either Flux or PSD, shape (M,ne,na), filled with
+			NaNs where there is no spectrum within Maxdt
+		'''
+		
+		#get the current date
+		Date = mode(self.Date,keepdims=True)[0][0]
+		
+		#get the utc
+		ut = np.array([ut]).flatten()
+		utc = TT.ContUT(np.zeros(ut.size,dtype='int32') + Date,ut)
+		
+		x,x0,x1,z,_ = self._GetSpectra(utc,Maxdt/3600.0,Method,xparam,zparam)
+		y = 0.5*(self.Alpha[1:] + self.Alpha[:-1])
+		y0 = self.Alpha[:-1]
+		y1 = self.Alpha[1:]
+		
+		return (x,x0,x1),(y,y0,y1),z
+		
 	def GetSpectrum2D(self,ut,Method='nearest',Maxdt=60.0,xparam='E',zparam='Flux'):
 		'''
 		Return a 2D particle spectrum
@@ -686,15 +891,15 @@ class PSpecPADCls(object):
 		else:
 			norm = colors.Normalize(vmin=scale[0],vmax=scale[1])
 	
-		for i in range(0,x[0].size):				
-			xtmp = np.array([x0[i],x1[i]])
-			if np.isfinite(xtmp).all():
-				#plot each row of energy/velocity
-				xg,yg = np.meshgrid(xtmp,ye)
-				
-				ztmp = np.array([z[i]])
-				
-				sm = ax.pcolormesh(xg,yg,ztmp.T,cmap=cmap,norm=norm)
+		#plot all of the energy/velocity bins in a single mesh
+		srt,col,xe = SpectrogramBinEdges(x0,x1)
+		if srt is None:
+			sm = plt.cm.ScalarMappable(norm=norm,cmap=cmap)
+			sm.set_array([])
+		else:
+			c = np.zeros((ye.size-1,xe.size-1),dtype='float64') + np.nan
+			c[:,col] = z[srt].T
+			sm = ax.pcolormesh(xe,ye,np.ma.masked_invalid(c),cmap=cmap,norm=norm)
 		
 		#colorbar
 		divider = make_axes_locatable(ax)
@@ -705,14 +910,14 @@ class PSpecPADCls(object):
 		
 		#get the title
 		Date = mode(self.Date,keepdims=True)[0][0]
-		hh,mm,ss = TT.DectoHHMM(ut,ss=True,Split=True)
-		ax.set_title('{:08d} {:02d}:{:02d}:{:02d} UT'.format(Date,hh,mm,ss))	
+		hh,mm,ss,_ = TT.DectoHHMM(ut)
+		ax.set_title('{:08d} {:02d}:{:02d}:{:02d} UT'.format(Date,hh[0],mm[0],ss[0]))	
 						
 		return ax
 	
 	def PlotSpectrogramStack(self,Bins=None,ut=None,fig=None,
-				scale=[1e3,1e9],cmap='gnuplot',zparam='Flux',
-				ShowLossCone=True,LCAlt=100.0):
+				scale=None,cmap='gnuplot',zparam='Flux',
+				ShowLossCone=True,LCAlt=100.0,Downsample=True,PosAxis=True):
 		'''
 		Plot a stack of spectrograms.
 		
@@ -731,11 +936,19 @@ class PSpecPADCls(object):
 			If Axes instance, then plotting is done on existing Axes
 		scale : list
 			2-element list or tuple containing the minimum and maximum
-			extents of the color scale
+			extents of the (logarithmic) color scale, which is shared by
+			every panel. If None, [1e3,1e9] is used for Flux and the 
+			default scale for PSD.
 		cmap : str
 			String containing the name of the colomap to use
 		zparam : str
 			'Flux'|'PSD' - type of spectrum to return.
+		Downsample : bool
+			If True, long time ranges are plotted using the mean of 
+			groups of records (see PSpecPADCls.PlotSpectrogram).
+		PosAxis : bool
+			If True, the position of the spacecraft is included in the
+			time axis labels.
 
 		Returns
 		=======
@@ -765,17 +978,26 @@ class PSpecPADCls(object):
 		
 		if cmap == 'jetish':
 			cmap = jetish
-		sm = plt.cm.ScalarMappable(cmap=cmap, norm=colors.LogNorm(vmin=scale[0], vmax=scale[1]))
+		
+		#one colour normalization for every panel and the colour bar
+		if scale is None:
+			if zparam == 'PSD':
+				scale = self._psdlogscale
+			else:
+				scale = [1e3,1e9]
+		norm = colors.LogNorm(vmin=scale[0], vmax=scale[1])
+		sm = plt.cm.ScalarMappable(cmap=cmap, norm=norm)
 		sm._A = []
 		
 		
-		#plot each one
+		#plot each one (only the bottom panel has a time axis)
 		ax = []
 		for i in range(0,na):
 			nox = i != 0
 			tmpax = self.PlotSpectrogram(Bins[i],ut=ut,fig=fig,
-					maps=[1,na,0,na-i-1],cmap=cmap,scale=scale,yparam='alpha',
-					nox=nox,ColorBar=False,ShowLossCone=ShowLossCone,LCAlt=LCAlt)
+					maps=[1,na,0,na-i-1],cmap=cmap,norm=norm,yparam='alpha',
+					zparam=zparam,nox=nox,ColorBar=False,ShowLossCone=ShowLossCone,
+					LCAlt=LCAlt,Downsample=Downsample,PosAxis=PosAxis)
 			title = tmpax.get_title()
 			tmpax.set_title('')
 			tmpax.set_ylabel(r'$\alpha$ ($^\circ$)')
@@ -802,7 +1024,8 @@ class PSpecPADCls(object):
 	def PlotSpectrogram(self,Bin,ut=None,fig=None,maps=[1,1,0,0],
 			yparam='E',zparam='Flux',ylog=None,scale=None,zlog=None,
 			cmap='gnuplot',nox=False,noy=False,TickFreq='auto',
-			PosAxis=True,ColorBar=True,ShowLossCone=True,LCAlt=100.0):
+			PosAxis=True,ColorBar=True,ShowLossCone=True,LCAlt=100.0,
+			Downsample=True,norm=None):
 		'''
 		Plots the spectrogram
 		
@@ -842,24 +1065,17 @@ class PSpecPADCls(object):
 			If True, no labels or tick marks are drawn for the x-axis
 		noy : bool
 			If True, no labels or tick marks are drawn for the y-axis
+		Downsample : bool
+			If True, long time ranges are plotted using the mean of 
+			groups of records, such that there is roughly one record per
+			pixel (see SpecPyramid).
+		norm : None or matplotlib.colors.Normalize
+			If set, this colour normalization is used instead of the one
+			defined by scale and zlog (e.g. to share one between plots).
 		'''
 		
 		#get the list of bins to use
-		if hasattr(Bin,'__iter__'):
-			if np.size(Bin) == 2:
-				bins = np.arange(Bin[0],Bin[1]+1)
-				binstr = 'Bins {:d} to {:d}'.format(bins[0],bins[-1])
-			else:
-				bins = np.array(Bins)
-				if np.size(bins) == 1:
-					binstr = 'Bin {:d}'.format(bins[0])
-				else:
-					binstr = ['{:d}, '.format(bins[i]) for i in range(bins.size-1)]
-					binstr.append('and {:d}'.format(bins[-1]))
-					binstr = 'Bins '+''.join(binstr)
-		else:
-			bins = np.array([Bin])
-			binstr = 'Bin {:d}'.format(Bin)
+		bins,binstr = self._SpectrogramBins(Bin)
 
 
 		#create the plot
@@ -883,8 +1099,6 @@ class PSpecPADCls(object):
 			if ylog is None:
 				ylog = self._elog
 			ax.set_ylim(self._elim)
-			y0 = self.Emin
-			y1 = self.Emax
 			ax.set_ylabel(self.elabel)
 		elif yparam == 'V':
 			Arange = [self.Alpha[bins[0]],self.Alpha[bins[-1]+1]]
@@ -892,8 +1106,6 @@ class PSpecPADCls(object):
 			if ylog is None:
 				ylog = self._vlog
 			ax.set_ylim(self._vlim)
-			y0 = self.V0
-			y1 = self.V1
 			ax.set_ylabel(self.vlabel)
 		elif yparam == 'alpha':
 			if len(self.Emin.shape) == 2:
@@ -904,8 +1116,6 @@ class PSpecPADCls(object):
 			title = '$E$/$V$ {:s} ({:5.2f} - {:5.2f} keV)'.format(binstr,Erange[0],Erange[1])
 			ylog = False
 			ax.set_ylim([0.0,180.0])
-			y0 = self.Alpha[:-1]
-			y1 = self.Alpha[1:]
 			ax.set_ylabel(self.alabel)
 		else:
 			return			
@@ -917,39 +1127,25 @@ class PSpecPADCls(object):
 
 
 		#get z stuff
+		y0,y1,z = self._SpectrogramData(bins,yparam,zparam)
 		if zparam == 'Flux':
-			if yparam == 'alpha':
-				z = np.nansum(self.Flux[:,bins,:],axis=1)
-			else:
-				z = np.nansum(self.Flux[:,:,bins],axis=2)
-			
 			zlabel = self.flabel
-			if zlog is None:
-				zlog = self._flog
-			if scale is None:
-				scale = self._scale
 		elif zparam == 'PSD':
-			if yparam == 'alpha':
-				z = np.nansum(self.PSD[:,bins,:],axis=1)
-			else:
-				z = np.nansum(self.PSD[:,:,bins],axis=2)
 			zlabel = self.plabel
-			if zlog is None:
-				zlog = self._plog
-			if scale is None:
-				scale = self._psdscale
 			
 		#get color scale
-		if zlog:
-			norm = colors.LogNorm(vmin=scale[0],vmax=scale[1])
-		else:
-			norm = colors.Normalize(vmin=scale[0],vmax=scale[1])
+		if norm is None:
+			norm = self._GetNorm(zparam,zlog,scale)
 		if cmap == 'jetish':
 			cmap = jetish
 		
 		
 		#create plots
-		sm = self._PlotSpectrogram(ax,y0,y1,z,norm,cmap)
+		if Downsample:
+			key = (yparam,zparam,tuple(bins))
+		else:
+			key = None
+		sm = self._PlotSpectrogram(ax,y0,y1,z,norm,cmap,key)
 
 		#turn axes off when needed
 		if nox:
@@ -989,7 +1185,16 @@ class PSpecPADCls(object):
 		self.currax = ax	
 		return ax
 
-	def _PlotLossCone(self,ax,LCAlt):
+	def _LossCone(self,LCAlt):
+		'''
+		Return the northern and southern loss cone pitch angles at an 
+		altitude, these are cached so that they are only calculated
+		once for each altitude (e.g. for each panel of a stack plot).
+		
+		'''
+		if LCAlt in self._losscone:
+			return self._losscone[LCAlt]
+		
 		
 		#interpolate the loss cone altitudes first
 		if LCAlt < 0.0:
@@ -1030,7 +1235,13 @@ class PSpecPADCls(object):
 				An = dANdA*(LCAlt-A0) + CN
 				As = dASdA*(LCAlt-A0) + CS
 
-			
+		self._losscone[LCAlt] = (An,As)
+		return An,As
+
+	def _PlotLossCone(self,ax,LCAlt):
+		
+		An,As = self._LossCone(LCAlt)
+		
 		#plot North at bottom and South at top
 		ln = ax.plot(self.utc,An,color=[0.0,1.0,0.0],linestyle='--')
 		ls = ax.plot(self.utc,180.0-As,color=[0.0,1.0,0.0],linestyle='--')
@@ -1087,58 +1298,189 @@ class PSpecPADCls(object):
 			TT.DTPlotLabel(ax,self.utc,self.Date,TickFreq=TickFreq)
 
 
-	def _PlotSpectrogram(self,ax,y0,y1,z,norm,cmap):
+	def _SpectrogramBins(self,Bin):
 		'''
-		This will plot a single spectrogram
+		Return the array of bins to be summed for a spectrogram and a 
+		string describing them.
 		
 		'''
-		#get the y ranges for each row of data
-		bad = np.where(np.isnan(y0) | np.isnan(y1))
-		y0[bad] = 0.0
-		y1[bad] = 0.0
-
-		#get the ut array limits
-		t0 = self.utc
-		t1 = self.utc + self.dt
-		utc = self.utc
+		if hasattr(Bin,'__iter__'):
+			if np.size(Bin) == 2:
+				bins = np.arange(Bin[0],Bin[1]+1)
+				binstr = 'Bins {:d} to {:d}'.format(bins[0],bins[-1])
+			else:
+				bins = np.array(Bin)
+				if np.size(bins) == 1:
+					binstr = 'Bin {:d}'.format(bins[0])
+				else:
+					binstr = ['{:d}, '.format(bins[i]) for i in range(bins.size-1)]
+					binstr.append('and {:d}'.format(bins[-1]))
+					binstr = 'Bins '+''.join(binstr)
+		else:
+			bins = np.array([Bin])
+			binstr = 'Bin {:d}'.format(Bin)
+		return bins,binstr
 		
-		#look for gaps in ut
-		if len(y0.shape) > 1:
-
-			isgap = ((utc[1:] - utc[:-1]) > 60.0/3600.0) | (((y0[1:,:] - y0[:-1,:]) != 0) | ((y0[1:,:] - y0[:-1,:]) != 0)).any(axis=1)
-			ne = y0.shape[1]
+	def _SpectrogramData(self,bins,yparam,zparam):
+		'''
+		Return the bin limits and data used to plot a spectrogram, 
+		summed over the pitch angle bins (or E/V bins if yparam is 
+		'alpha').
+		
+		'''
+		if yparam == 'E':
+			y0 = self.Emin
+			y1 = self.Emax
+		elif yparam == 'V':
+			y0 = self.V0
+			y1 = self.V1
 		else:
-			#isgap = (utc[1:] - utc[:-1]) > 1.1*dt[:-1]
-			isgap = (utc[1:] - utc[:-1]) > 60.0/3600.0
-			ne = y0.size
-		gaps = np.where(isgap)[0] + 1
-		if gaps.size == 0:
-			#no gaps
-			i0 = [0]
-			i1 = [utc.size]
+			y0 = self.Alpha[:-1]
+			y1 = self.Alpha[1:]
+			
+		if zparam == 'PSD':
+			data = self.PSD
 		else:
-			#lots of gaps
-			i0 = np.append(0,gaps)
-			i1 = np.append(gaps,utc.size)
-		ng = np.size(i0)
-
-		#loop through each continuous block of utc
-		for i in range(0,ng):
-			ttmp = np.append(t0[i0[i]:i1[i]],t1[i1[i]-1])
-			st = z[i0[i]:i1[i]]
-			for j in range(0,ne):				
-				if len(y0.shape) > 1:
-					etmp = np.array([y0[i0[i],j],y1[i0[i],j]])
-				else:
-					etmp = np.array([y0[j],y1[j]])
-				if np.isfinite(etmp).all():
-					#plot each row of energy
-					tg,eg = np.meshgrid(ttmp,etmp)
-					s = np.array([st[:,j]])
-					
-					sm = ax.pcolormesh(tg,eg,s,cmap=cmap,norm=norm)
+			data = self.Flux
+		if yparam == 'alpha':
+			z = np.nansum(data[:,bins,:],axis=1)
+		else:
+			z = np.nansum(data[:,:,bins],axis=2)
+		return y0,y1,z
+		
+	def _GetNorm(self,zparam,zlog,scale):
+		'''
+		Return the colour normalization for a spectrogram.
+		
+		'''
+		if zparam == 'PSD':
+			if zlog is None:
+				zlog = self._plog
+			if scale is None:
+				scale = self._psdscale
+		else:
+			if zlog is None:
+				zlog = self._flog
+			if scale is None:
+				scale = self._scale
+		if zlog:
+			norm = colors.LogNorm(vmin=scale[0],vmax=scale[1])
+		else:
+			norm = colors.Normalize(vmin=scale[0],vmax=scale[1])
+		return norm
+		
+	def Rasterize(self,Bin,ut=None,Width=800,Height=200,yparam='E',zparam='Flux',
+			ylog=None,scale=None,zlog=None,cmap='gnuplot',Downsample=True):
+		'''
+		Draw a spectrogram directly into an RGBA image (no matplotlib
+		figure or artists are created), using the same axis limits and 
+		colours as PSpecPADCls.PlotSpectrogram. This is much faster 
+		than PlotSpectrogram when creating lots of quicklook images. 
+		Pixels with no data are transparent.
+		
+		Inputs
+		======
+		Bin : int
+			Index of the pitch angle (or E/V if yparam == 'alpha') bin
+			to use. If Bin is a 2-element list/tuple then the bins 
+			between Bin[0] and Bin[1] (inclusive) are summed.
+		ut : list/tuple
+			2-element start and end times, where each element is the 
+			time in hours since the start of the day, e.g. 17:30 == 17.5.
+		Width : int
+			Width of the image in pixels.
+		Height : int
+			Height of the image in pixels.
+		yparam : str
+			'E'|'V'|'alpha'
+		zparam : str
+			'Flux'|'PSD'
+		ylog : bool
+			If True, y-axis is logarithmic
+		scale : list
+			2-element list or tuple containing the minimum and maximum
+			extents of the color scale
+		zlog : bool
+			if True, color scale is logarithmic
+		cmap : str
+			String containing the name of the colomap to use
+		Downsample : bool
+			If True, long time ranges are drawn using the mean of 
+			groups of records, such that there is roughly one record per
+			pixel (see SpecPyramid).
 			
-		return sm
+		Returns
+		=======
+		img : uint8
+			RGBA image, shape (Height,Width,4).
+		
+		'''
+		bins,_ = self._SpectrogramBins(Bin)
+		
+		#the same limits as PlotSpectrogram
+		if ut is None:
+			tlim = self._utlim
+		else:
+			Date = mode(self.Date,keepdims=True)[0][0]
+			tlim = TT.ContUT(np.array([Date,Date]),np.array(ut))
+		if yparam == 'E':
+			ylim = self._elim
+			if ylog is None:
+				ylog = self._elog
+		elif yparam == 'V':
+			ylim = self._vlim
+			if ylog is None:
+				ylog = self._vlog
+		else:
+			ylim = [0.0,180.0]
+			ylog = False
+		norm = self._GetNorm(zparam,zlog,scale)
+		if cmap == 'jetish':
+			cmap = jetish
+			
+		img = NewRasterImage(Width,Height)
+		y0,y1,z = self._SpectrogramData(bins,yparam,zparam)
+		if Downsample:
+			key = (yparam,zparam,tuple(bins))
+			if not key in self._pyramids:
+				self._pyramids[key] = SpecPyramid(self.utc,self.dt,y0,y1,z,
+										Blocks=self.TimeIndex.Blocks)
+			self._pyramids[key].Rasterize(img,tlim,ylim,norm,cmap,ylog)
+		else:
+			RasterSpectrogram(img,self.utc,self.dt,y0,y1,z,norm,cmap,tlim,ylim,ylog,
+							Blocks=self.TimeIndex.Blocks)
+		return img
+		
+	def SaveQuicklook(self,fname,*args,**kwargs):
+		'''
+		Save a quicklook PNG image of a spectrogram, without using a
+		matplotlib figure. The arguments are the same as 
+		PSpecPADCls.Rasterize.
+		
+		Inputs
+		======
+		fname : str
+			Name of the PNG file.
+		
+		'''
+		SaveRasterImage(fname,self.Rasterize(*args,**kwargs))
+		
+	def _PlotSpectrogram(self,ax,y0,y1,z,norm,cmap,key=None):
+		'''
+		This will plot a single spectrogram, using one mesh per 
+		continuous block of data within the current time axis limits.
+		If key is set, then the spectrogram is downsampled using a 
+		pyramid which is cached under that key.
+		
+		'''
+		if not key is None:
+			if not key in self._pyramids:
+				self._pyramids[key] = SpecPyramid(self.utc,self.dt,y0,y1,z,
+										Blocks=self.TimeIndex.Blocks)
+			return self._pyramids[key].Plot(ax,norm,cmap)
+		
+		return SpectrogramMesh(ax,self.utc,self.dt,y0,y1,z,norm,cmap,tlim=ax.get_xlim(),
+							Blocks=self.TimeIndex.Blocks)
 		
 	def _CalculateTimeLimits(self):
 		'''
@@ -0,0 +1,159 @@
+import numpy as np
+import matplotlib
+import matplotlib.image as mimage
+from .SpectrogramMesh import FindSpectrogramGaps
+from .EnergyTable import EnergyTable,UniqueRows
+
+def _BinMap(ya,yb,yc):
+	'''
+	Find the bin containing each pixel row (-1 where there isn't one).
+
+	'''
+	#bins may be upside down
+	ya,yb = np.fmin(ya,yb),np.fmax(ya,yb)
+	good = np.where(np.isfinite(ya) & np.isfinite(yb))[0]
+	if good.size == 0:
+		return np.zeros(yc.size,dtype='int64') - 1
+	srt = good[np.argsort(ya[good])]
+	j = np.searchsorted(ya[srt],yc,side='right') - 1
+	jc = j.clip(min=0)
+	return np.where((j >= 0) & (yc < yb[srt[jc]]),srt[jc],-1)
+
+def RasterSpectrogram(img,utc,dt,y0,y1,z,norm,cmap,tlim,ylim,ylog=False,
+					MaxGap=60.0/3600.0,Blocks=None):
+	'''
+	Draw a spectrogram directly into an RGBA image, without using any
+	matplotlib artists. Each pixel is coloured using the record and bin
+	at its centre, using the same colour mapping as SpectrogramMesh
+	(pixels which have no data, or which are masked by the
+	normalization, are left unchanged).
+
+	Inputs
+	======
+	img : uint8
+		RGBA image, shape (height,width,4), the first row is the top.
+	utc : float
+		Continuous time axis (hours), shape (nt,).
+	dt : float
+		Duration of each record (hours), shape (nt,).
+	y0 : float
+		Lower limits of each bin, shape (ny,) or (nt,ny).
+	y1 : float
+		Upper limits of each bin, shape (ny,) or (nt,ny).
+	z : float
+		Data to plot, shape (nt,ny).
+	norm : matplotlib.colors.Normalize
+		Colour normalization.
+	cmap : str or matplotlib.colors.Colormap
+		Colour map.
+	tlim : list
+		Time limits of the image (left and right edges).
+	ylim : list
+		y-axis limits of the image (bottom and top edges).
+	ylog : bool
+		If True, the y-axis is logarithmic.
+	MaxGap : float
+		Maximum time between records within a block (hours).
+	Blocks : None or tuple
+		If set, this should contain the start and end indices of each
+		continuous block (e.g. TimeIndex.Blocks), otherwise they are
+		found using MaxGap.
+
+	Returns
+	=======
+	img : uint8
+		The same image.
+
+	'''
+	h,w,_ = img.shape
+	if isinstance(cmap,str):
+		cmap = matplotlib.colormaps[cmap]
+	if np.size(utc) == 0:
+		return img
+
+	#the centre of each pixel
+	tc = tlim[0] + (np.arange(w) + 0.5)*(tlim[1] - tlim[0])/w
+	if ylog:
+		ly = np.log10(ylim)
+		yc = 10**(ly[1] - (np.arange(h) + 0.5)*(ly[1] - ly[0])/h)
+	else:
+		yc = ylim[1] - (np.arange(h) + 0.5)*(ylim[1] - ylim[0])/h
+
+	#records fill the time until the next one, except at the end of a
+	#block where they only last for dt
+	if Blocks is None:
+		i0,i1 = FindSpectrogramGaps(utc,y0,y1,MaxGap)
+	else:
+		i0,i1 = Blocks
+	last = np.zeros(utc.size,dtype='bool')
+	last[i1-1] = True
+	rec = np.searchsorted(utc,tc,side='right') - 1
+	rc = rec.clip(min=0)
+	col = np.where((rec >= 0) & (~last[rc] | (tc < utc[rc] + dt[rc])))[0]
+	if col.size == 0:
+		return img
+	rec = rec[col]
+
+	#find the bin of each pixel, for each distinct set of bins
+	Z = np.zeros((h,col.size),dtype='float64') + np.nan
+	if len(np.shape(y0)) > 1:
+		if isinstance(y0,EnergyTable) and isinstance(y1,EnergyTable) and y0.Index is y1.Index:
+			ta = y0.Table
+			tb = y1.Table
+			Index = y0.Index[rec]
+		else:
+			a,b = UniqueRows(y0[rec],y1[rec])
+			ta = a.Table
+			tb = b.Table
+			Index = a.Index
+		for k in np.unique(Index):
+			use = np.where(Index == k)[0]
+			bins = _BinMap(ta[k],tb[k],yc)
+			rows = np.where(bins >= 0)[0]
+			Z[np.ix_(rows,use)] = z[rec[use]][:,bins[rows]].T
+	else:
+		bins = _BinMap(np.asarray(y0),np.asarray(y1),yc)
+		rows = np.where(bins >= 0)[0]
+		Z[rows] = z[rec][:,bins[rows]].T
+
+	#colour the pixels (rounded as Agg does, rather than truncated)
+	nz = norm(np.ma.masked_invalid(Z))
+	rgba = np.uint8(cmap(nz)*255.0 + 0.5)
+	draw = ~np.ma.getmaskarray(nz)
+	sub = img[:,col]
+	sub[draw] = rgba[draw]
+	img[:,col] = sub
+	return img
+
+def NewRasterImage(Width,Height):
+	'''
+	Create an empty (transparent) RGBA image for RasterSpectrogram.
+
+	Inputs
+	======
+	Width : int
+		Width of the image in pixels.
+	Height : int
+		Height of the image in pixels.
+
+	Returns
+	=======
+	img : uint8
+		Image array, shape (Height,Width,4).
+
+	'''
+	return np.zeros((Height,Width,4),dtype='uint8')
+
+def SaveRasterImage(fname,img):
+	'''
+	Save an RGBA image as a PNG file.
+
+	Inputs
+	======
+	fname : str
+		Name of the file.
+	img : uint8
+		RGBA image, shape (height,width,4).
+
+	'''
+	mimage.imsave(fname,img,format='png')
@@ -2,9 +2,31 @@ import numpy as np
 import cdflib
 import os
 
-def ReadCDF(fname,Verbose=True):
+def ReadCDF(fname,Verbose=True,Variables=None,Records=None):
 	'''
 	Read a CDF file contents
+	
+	Inputs
+	======
+	fname : str
+		Name of the CDF file.
+	Verbose : bool
+		Not used.
+	Variables : None or list
+		List of the variables to read, if None then all of them are 
+		read.
+	Records : None or tuple
+		If set, (r0,r1) - only records r0 to r1-1 of each record
+		varying variable are read, so that large files can be read in
+		chunks.
+		
+	Returns
+	=======
+	data : dict
+		Data for each variable.
+	attr : dict
+		Attributes of each variable.
+		
 	'''
 	
 	if not os.path.isfile(fname):
@@ -16,12 +38,17 @@ def ReadCDF(fname,Verbose=True):
 	
 	#get the list of zVariables
 	var = f.cdf_info().zVariables
+	if not Variables is None:
+		var = [v for v in var if v in Variables]
 	
 	#create ouput dicts
 	data = {}
 	attr = {}
 	for v in var:
-		data[v] = f.varget(v)
+		if Records is None or not f.varinq(v).Rec_Vary:
+			data[v] = f.varget(v)
+		else:
+			data[v] = f.varget(v,startrec=Records[0],endrec=Records[1]-1)
 		attr[v] = f.varattsget(v)
 
 	#delete cdf (not sure if this is necessary - no idea if there is a close function)
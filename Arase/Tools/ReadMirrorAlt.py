@@ -1,31 +1,99 @@
 import numpy as np
 import os
-import PyFileIO as pf
+from .ArrayFileIndex import ArrayFileIndex
+from .ListDates import ListDates
+
+#arrays stored in each mirror file
+_MirrorKeys = ['Date','ut','utc','Alt','AltMid','Bm','BmMid','B0',
+				'AlphaN','AlphaS','BaltN','BaltS','LCAlt']
+
+def _ReadArray(fname,info):
+	with open(fname,'rb') as f:
+		f.seek(info['offset'])
+		n = int(np.prod(info['shape']))
+		return np.fromfile(f,dtype=info['dtype'],count=n).reshape(info['shape'])
+
+def ReadMirrorAlt(Date,path,utc=None):
+	'''
+	Read the mirror altitude files for a date or dates.
+
+	Inputs
+	======
+	Date : int
+		Date in the format yyyymmdd.
+		If single date - only data from that one day will be read
+		If 2-element array - dates from Date[0] to Date[1] will be read
+		If > 2 elements - this is treated as a specific list of dates
+	path : str
+		PAD directory of the instrument.
+	utc : None or float
+		If set, the records are matched to these times (e.g. those of
+		the PADs) so that each output array has one row per time, with
+		NaNs where there is no mirror altitude.
+
+	Returns
+	=======
+	out : dict
+		Containing an array for each of 'Date', 'ut', 'utc', 'Alt',
+		'AltMid', 'Bm', 'BmMid', 'B0', 'AlphaN', 'AlphaS', 'BaltN',
+		'BaltS' and 'LCAlt', or None if none of the files exist.
 
-def ReadMirrorAlt(Date,path):
 	'''
-	Read a PAD file
-	
-	'''	
-	#get the file name
-	fname = path + '{:08d}/'.format(Date) + 'Mirror.bin'
-
-	#check it exists
-	if not os.path.isfile(fname):
+	#populate the list of dates to read
+	if np.size(Date) == 1:
+		dates = np.array([Date]).flatten()
+	elif np.size(Date) == 2:
+		dates = ListDates(Date[0],Date[1])
+	else:
+		dates = np.array([Date]).flatten()
+
+	#find the size and position of each array in each file
+	files = []
+	for d in dates:
+		fname = path + '{:08d}/'.format(d) + 'Mirror.bin'
+		if os.path.isfile(fname):
+			dtypes = ['float64' if k == 'utc' else 'float32' for k in _MirrorKeys]
+			info = dict(zip(_MirrorKeys,ArrayFileIndex(fname,dtypes)))
+			files.append((fname,info))
+
+	#check they exist
+	if len(files) == 0:
 		print('File not found')
 		return None
-		
-	#read the data
-	f = open(fname,'rb')
+
+	#the records of each file in the output
+	pos = []
+	if utc is None:
+		i0 = 0
+		for fname,info in files:
+			n = info['utc']['shape'][0]
+			pos.append((slice(i0,i0 + n),slice(0,n)))
+			i0 += n
+		nt = i0
+	else:
+		utc = np.asarray(utc)
+		nt = utc.size
+		srt = np.argsort(utc,kind='stable')
+		for fname,info in files:
+			if nt == 0:
+				pos.append((slice(0,0),slice(0,0)))
+				continue
+			mutc = _ReadArray(fname,info['utc'])
+			i = np.searchsorted(utc[srt],mutc).clip(max=nt - 1)
+			good = np.where(utc[srt][i] == mutc)[0]
+			I = srt[i[good]]
+			if good.size > 0 and good.size == mutc.size and (np.diff(I) == 1).all():
+				pos.append((slice(I[0],I[-1] + 1),slice(None)))
+			else:
+				pos.append((I,good))
+
+	#allocate the output, then read each file into it
 	out = {}
-	keys = ['Date','ut','utc','Alt','AltMid','Bm','BmMid','B0',
-			'AlphaN','AlphaS','BaltN','BaltS','LCAlt']
-	for k in keys:
-		if k == 'utc':
-			dtype = 'float64'
-		else:
-			dtype = 'float32'	
-		out[k] = pf.ArrayFromFile(dtype,f)
-
-	f.close()
+	for k in _MirrorKeys:
+		info = files[0][1][k]
+		out[k] = np.zeros((nt,) + tuple(info['shape'][1:]),dtype=info['dtype']) + np.nan
+	for (fname,info),(I,J) in zip(files,pos):
+		for k in _MirrorKeys:
+			out[k][I] = _ReadArray(fname,info[k])[J]
+
 	return out
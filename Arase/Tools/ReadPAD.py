@@ -1,29 +1,288 @@
 import numpy as np
 import os
-import PyFileIO as pf
+import json
+import zlib
+import DateTimeTools as TT
+from .SavePAD import PADMagic,_PADArrays
+from .ArrayFileIndex import ArrayFileIndex
+from .ListDates import ListDates
 
-def ReadPAD(Date,path,SpecType):
+def ReadPADHeader(fname):
 	'''
-	Read a PAD file
-	
-	'''	
-	#get the file name
-	fname = path + '{:08d}/'.format(Date) + SpecType + '.bin'
+	Read the header of a PAD file.
 
-	#check it exists
-	if not os.path.isfile(fname):
-		print('File not found')
+	Inputs
+	======
+	fname : str
+		Name of the PAD file.
+
+	Returns
+	=======
+	header : dict
+		The header of a version 2 file (with 'DataOffset', the position
+		of the end of the header). For the original format, which has no
+		header, the same information is found from the array sizes 
+		stored in the file (with 'Format' : 1).
+
+	'''
+	with open(fname,'rb') as f:
+		magic = f.read(len(PADMagic))
+		if magic == PADMagic:
+			fmt,hlen = np.fromfile(f,dtype='<u4',count=2)
+			header = json.loads(f.read(int(hlen)).decode('utf-8'))
+			header['DataOffset'] = len(PADMagic) + 8 + int(hlen)
+			return header
+
+	#find the arrays in a version 1 file
+	info = ArrayFileIndex(fname,[dtype for k,dtype in _PADArrays])
+	arrays = {}
+	for (k,dtype),x in zip(_PADArrays,info):
+		x['Compression'] = None
+		arrays[k] = x
+	shape = arrays['Flux']['shape']
+	header = {	'Format' : 1,
+				'nt' : shape[0],
+				'ne' : shape[1],
+				'na' : shape[2],
+				'Arrays' : arrays,
+				'DataOffset' : 0}
+	return header
+
+def _Select(n,ut,Time):
+	'''
+	Records within a time range, as a slice where possible.
+
+	'''
+	if Time is None:
+		return slice(0,n)
+	use = np.where((ut >= Time[0]) & (ut <= Time[1]))[0]
+	if use.size == 0:
+		return slice(0,0)
+	if use.size == use[-1] - use[0] + 1:
+		return slice(use[0],use[-1] + 1)
+	return use
+
+def _EnergySlice(Energy):
+	if Energy is None:
+		return slice(None)
+	if np.size(Energy) == 1:
+		e = int(np.array(Energy).flatten()[0])
+		return slice(e,e+1)
+	return slice(Energy[0],Energy[1])
+
+def _ReadFlux(fname,header,rec,e,MemMap):
+	'''
+	Read part of the flux array from a PAD file.
+
+	'''
+	info = header['Arrays']['Flux']
+	dtype = np.dtype(info['dtype'])
+	shape = tuple(info['shape'])
+	offset = header['DataOffset'] + info['offset']
+
+	if info['Compression'] is None:
+		if np.prod(shape) == 0:
+			flux = np.zeros(shape,dtype=dtype)
+		else:
+			flux = np.memmap(fname,dtype=dtype,mode='r',offset=offset,shape=shape)
+		flux = flux[rec][:,e]
+		if MemMap:
+			return flux
+		return np.array(flux)
+
+	#decompress only the chunks containing the records needed
+	if isinstance(rec,slice):
+		r0,r1 = rec.start,rec.stop
+	else:
+		r0,r1 = rec[0],rec[-1] + 1
+	cs = info['ChunkSize']
+	c0 = r0//cs
+	c1 = max(c0,(r1 - 1)//cs + 1)
+	rsize = int(np.prod(shape[1:]))*dtype.itemsize
+	flux = []
+	with open(fname,'rb') as f:
+		for c in range(c0,c1):
+			off,nb = info['Chunks'][c]
+			f.seek(header['DataOffset'] + off)
+			b = zlib.decompress(f.read(nb))
+			flux.append(np.frombuffer(b,dtype=dtype).reshape((len(b)//rsize,) + shape[1:]))
+	if len(flux) == 0:
+		flux = np.zeros((0,) + shape[1:],dtype=dtype)
+	else:
+		flux = np.concatenate(flux)
+	if isinstance(rec,slice):
+		flux = flux[r0 - c0*cs:r1 - c0*cs]
+	else:
+		flux = flux[rec - c0*cs]
+	return np.array(flux[:,e])
+
+def _ReadArrays(fname,header,keys):
+	'''
+	Read whole arrays (other than the flux) from a PAD file.
+
+	'''
+	out = {}
+	with open(fname,'rb') as f:
+		for k in keys:
+			info = header['Arrays'][k]
+			f.seek(header['DataOffset'] + info['offset'])
+			n = int(np.prod(info['shape']))
+			out[k] = np.fromfile(f,dtype=info['dtype'],count=n).reshape(info['shape'])
+	return out
+
+def _ReadFile(fname,header,Time,Energy,MemMap):
+	'''
+	Read a PAD file, only reading the parts of the flux which are
+	needed.
+
+	'''
+	out = _ReadArrays(fname,header,['Date','ut','utc','Emin','Emax','Alpha'])
+
+	rec = _Select(header['nt'],out['ut'],Time)
+	e = _EnergySlice(Energy)
+	for k in ['Date','ut','utc']:
+		out[k] = out[k][rec]
+	for k in ['Emin','Emax']:
+		if out[k].ndim > 1:
+			out[k] = out[k][rec][:,e]
+		else:
+			out[k] = out[k][e]
+	out['Flux'] = _ReadFlux(fname,header,rec,e,MemMap)
+	return out
+
+def _ShiftTime(Time,Date,Date0):
+	'''
+	Convert a time range relative to the start of Date0 to one relative
+	to the start of Date.
+
+	'''
+	if Time is None:
 		return None
-		
-	#read the data
-	f = open(fname,'rb')
+	d0,d1 = TT.ContUT(np.array([Date0,Date]),np.zeros(2))
+	return [Time[0] - (d1 - d0),Time[1] - (d1 - d0)]
+
+def _Combine(files,Time,Energy,Date0):
+	'''
+	Read several PAD files into a single set of arrays. The headers and
+	times are read first, so that the output arrays can be allocated
+	once and each file's flux read straight into them.
+
+	'''
+	#find the records needed from each file
+	e = _EnergySlice(Energy)
+	parts = []
+	for Date,fname in files:
+		header = ReadPADHeader(fname)
+		tmp = _ReadArrays(fname,header,['Date','ut','utc','Emin','Emax','Alpha'])
+		rec = _Select(header['nt'],tmp['ut'],_ShiftTime(Time,Date,Date0))
+		n = np.arange(header['nt'])[rec].size
+		parts.append((fname,header,tmp,rec,n))
+
+	#the pitch angle bins must be the same in every file
+	Alpha = parts[0][2]['Alpha']
+	for p in parts:
+		if not np.array_equal(p[2]['Alpha'],Alpha):
+			raise ValueError('The pitch angle bins are not the same in each file')
+
+	#energy bins are kept 1D if they are the same in every file
+	Emin = [p[2]['Emin'] for p in parts]
+	Emax = [p[2]['Emax'] for p in parts]
+	fixed = all([x.ndim == 1 and np.array_equal(x,Emin[0]) for x in Emin]) and \
+			all([x.ndim == 1 and np.array_equal(x,Emax[0]) for x in Emax])
+
+	#allocate the output
+	nt = np.sum([p[4] for p in parts])
+	ne = np.arange(parts[0][1]['ne'])[e].size
+	na = Alpha.size - 1
 	out = {}
-	out['Date'] = pf.ArrayFromFile('int32',f)
-	out['ut'] = pf.ArrayFromFile('float32',f)
-	out['utc'] = pf.ArrayFromFile('float64',f)
-	out['Emin'] = pf.ArrayFromFile('float32',f)
-	out['Emax'] = pf.ArrayFromFile('float32',f)
-	out['Alpha'] = pf.ArrayFromFile('float32',f)
-	out['Flux'] = pf.ArrayFromFile('float32',f)	
-	f.close()
+	out['Date'] = np.zeros(nt,dtype='int32')
+	out['ut'] = np.zeros(nt,dtype='float32')
+	out['utc'] = np.zeros(nt,dtype='float64')
+	if fixed:
+		out['Emin'] = Emin[0][e]
+		out['Emax'] = Emax[0][e]
+	else:
+		out['Emin'] = np.zeros((nt,ne),dtype='float32')
+		out['Emax'] = np.zeros((nt,ne),dtype='float32')
+	out['Alpha'] = Alpha
+	out['Flux'] = np.zeros((nt,ne,na),dtype='float32')
+
+	#fill it
+	i0 = 0
+	for fname,header,tmp,rec,n in parts:
+		i1 = i0 + n
+		for k in ['Date','ut','utc']:
+			out[k][i0:i1] = tmp[k][rec]
+		if not fixed:
+			for k in ['Emin','Emax']:
+				if tmp[k].ndim > 1:
+					out[k][i0:i1] = tmp[k][rec][:,e]
+				else:
+					out[k][i0:i1] = tmp[k][e]
+		out['Flux'][i0:i1] = _ReadFlux(fname,header,rec,e,True)
+		i0 = i1
 	return out
+
+def ReadPAD(Date,path,SpecType,Time=None,Energy=None,MemMap=True):
+	'''
+	Read PAD files, either of the original format or version 2 (see
+	SavePAD), which is detected automatically.
+
+	Inputs
+	======
+	Date : int
+		Date in the format yyyymmdd.
+		If single date - only data from that one day will be read
+		If 2-element array - dates from Date[0] to Date[1] will be read
+		If > 2 elements - this is treated as a specific list of dates
+	path : str
+		PAD directory of the instrument.
+	SpecType : str
+		Name of the spectrum, e.g. 'eFlux'.
+	Time : None or float
+		If set, [ut0,ut1] - only read the records within this time
+		range (hours since the start of the first date).
+	Energy : None, int or tuple
+		If set, the index of a single energy bin, or (i0,i1) - the
+		range of energy bins to read.
+	MemMap : bool
+		If True, the flux in uncompressed files is memory mapped 
+		(read-only), so that only the parts which are used are read 
+		from the disk. This only applies when reading a single date,
+		otherwise the arrays from each date are combined in memory.
+		PSpecPADCls keeps the memory mapped array, unless the energy
+		bins in the file are not in ascending order.
+
+	Returns
+	=======
+	out : dict
+		Containing 'Date', 'ut', 'utc', 'Emin', 'Emax', 'Alpha' and
+		'Flux' (shape (nt,ne,na)), or None if none of the files exist.
+
+	'''
+	#populate the list of dates to read
+	if np.size(Date) == 1:
+		dates = np.array([Date]).flatten()
+	elif np.size(Date) == 2:
+		dates = ListDates(Date[0],Date[1])
+	else:
+		dates = np.array([Date]).flatten()
+
+	#get the file names
+	files = []
+	for d in dates:
+		fname = path + '{:08d}/'.format(d) + SpecType + '.bin'
+		if os.path.isfile(fname):
+			files.append((d,fname))
+
+	#check they exist
+	if len(files) == 0:
+		print('File not found')
+		return None
+	
+	#read the data
+	if len(files) == 1:
+		d,fname = files[0]
+		return _ReadFile(fname,ReadPADHeader(fname),_ShiftTime(Time,d,dates[0]),Energy,MemMap)
+
+	return _Combine(files,Time,Energy,dates[0])
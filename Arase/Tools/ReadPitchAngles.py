@@ -0,0 +1,49 @@
+import numpy as np
+import os
+from .SpecStore import ReadSpecArray,ReadSpecHeader
+from .SavePitchAngles import PitchAnglePath,PitchAngleSource
+
+def ReadPitchAngles(Instrument,Date,Records=None,MemMap=True,Source=None):
+	'''
+	Read the pitch angles saved by SavePitchAngles for a date.
+
+	Inputs
+	======
+	Instrument : str
+		'MEPe'|'MEPi'|'LEPe'|'LEPi'|'HEP'
+	Date : int
+		Date in the format yyyymmdd.
+	Records : None or tuple
+		(r0,r1) - only return these records of each array.
+	MemMap : bool
+		If True the arrays are memory mapped (read-only), so only the
+		records which are used are read from the disk.
+	Source : None or dict
+		The versions of the data which the saved pitch angles must have
+		been calculated from, if None then the current versions of the
+		3dflux and MGF data are used (see PitchAngleSource).
+
+	Returns
+	=======
+	out : dict
+		The saved arrays, or None if there are none for this date or
+		they were calculated from different data (see Source).
+
+	'''
+	path = PitchAnglePath(Instrument,Date)
+	hfile = os.path.join(path,'header.json')
+	if not os.path.isfile(hfile):
+		return None
+	header = ReadSpecHeader(path)
+	if Source is None:
+		Source = PitchAngleSource(Instrument,Date)
+	if header.get('Source') != Source:
+		return None
+
+	out = {}
+	for k in header['Arrays']:
+		x = ReadSpecArray(path,k,MemMap)
+		if not Records is None:
+			x = x[Records[0]:Records[1]]
+		out[k] = x
+	return out
@@ -0,0 +1,143 @@
+import numpy as np
+
+class RunningStats(object):
+	def __init__(self):
+		'''
+		An object which keeps running aggregates (counts, means, sums of
+		squared deviations and the minimum/maximum) of the finite
+		elements of a set of arrays in both linear and logarithmic
+		space, so that plot scales can be updated one block at a time.
+
+		See RunningStats.Add, RunningStats.Merge and RunningStats.Scale
+		for more information.
+
+		'''
+		#total number of elements (including bad ones)
+		self.size = 0
+
+		#linear aggregates
+		self.n = 0
+		self.mean = 0.0
+		self.m2 = 0.0
+		self.min = np.inf
+		self.max = -np.inf
+
+		#logarithmic aggregates
+		self.ln = 0
+		self.lmean = 0.0
+		self.lm2 = 0.0
+		self.lmin = np.inf
+		self.lmax = -np.inf
+
+	def _Combine(self,n0,mu0,m20,n1,mu1,m21):
+		'''
+		Combine two sets of count/mean/M2 (Chan et al. parallel
+		algorithm).
+
+		'''
+		n = n0 + n1
+		if n == 0:
+			return 0,0.0,0.0
+		d = mu1 - mu0
+		mu = mu0 + d*n1/n
+		m2 = m20 + m21 + d*d*n0*n1/n
+		return n,mu,m2
+
+	def Add(self,x):
+		'''
+		Add a new block of data to the running aggregates.
+
+		Inputs
+		======
+		x : float
+			Array of any shape containing data.
+
+		'''
+		x = np.asarray(x)
+		self.size += x.size
+
+		#linear space (finite values only)
+		good = np.isfinite(x)
+		xg = np.float64(x[good])
+		if xg.size > 0:
+			mu = np.mean(xg)
+			m2 = np.sum((xg - mu)**2)
+			self.n,self.mean,self.m2 = self._Combine(self.n,self.mean,self.m2,xg.size,mu,m2)
+			self.min = min(self.min,np.min(xg))
+			self.max = max(self.max,np.max(xg))
+
+		#log space (positive values only)
+		lx = np.log10(xg[xg > 0])
+		if lx.size > 0:
+			lmu = np.mean(lx)
+			lm2 = np.sum((lx - lmu)**2)
+			self.ln,self.lmean,self.lm2 = self._Combine(self.ln,self.lmean,self.lm2,lx.size,lmu,lm2)
+			self.lmin = min(self.lmin,np.min(lx))
+			self.lmax = max(self.lmax,np.max(lx))
+
+	def Merge(self,other):
+		'''
+		Merge the aggregates of another RunningStats object into this
+		one.
+
+		Inputs
+		======
+		other : RunningStats
+			Object to merge.
+
+		'''
+		self.size += other.size
+		self.n,self.mean,self.m2 = self._Combine(self.n,self.mean,self.m2,other.n,other.mean,other.m2)
+		self.ln,self.lmean,self.lm2 = self._Combine(self.ln,self.lmean,self.lm2,other.ln,other.lmean,other.lm2)
+		self.min = min(self.min,other.min)
+		self.max = max(self.max,other.max)
+		self.lmin = min(self.lmin,other.lmin)
+		self.lmax = max(self.lmax,other.lmax)
+
+	def Scale(self,ScaleType='range',nStd=2):
+		'''
+		Calculate the linear and logarithmic plot scales.
+
+		Inputs
+		======
+		ScaleType : str
+			'range'|'std'|'positive' - see PSpecCls.
+		nStd : float
+			Number of standard deviations to use.
+
+		Returns
+		=======
+		scale : list
+			Linear scale limits.
+		logscale : list
+			Logarithmic scale limits.
+
+		'''
+
+		if self.n == 0:
+			mu,std = np.nan,np.nan
+		else:
+			mu = self.mean
+			std = np.sqrt(self.m2/self.n)
+		if self.ln == 0:
+			lmu,lstd = np.nan,np.nan
+		else:
+			lmu = self.lmean
+			lstd = np.sqrt(self.lm2/self.ln)
+
+		if ScaleType == 'std':
+			scale = [mu - nStd*std, mu + nStd*std]
+			logscale = 10**np.array([lmu - nStd*lstd, lmu + nStd*lstd])
+		elif ScaleType == 'positive':
+			#calculate the scale based on all values being positive
+			#(root mean square over all elements)
+			rms = np.sqrt((self.m2 + self.n*mu**2)/max(self.size,1))
+			lrms = np.sqrt((self.lm2 + self.ln*lmu**2)/max(self.ln,1))
+			scale = [0.0,rms*nStd]
+			logscale = 10**np.array([self.lmin,lrms*nStd])
+		else:
+			#absolute range
+			scale = [self.min,self.max]
+			logscale = 10**np.array([self.lmin,self.lmax])
+
+		return scale,list(logscale)
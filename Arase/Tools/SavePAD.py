@@ -1,12 +1,142 @@
 import numpy as np
 import os
+import json
+import zlib
 import PyFileIO as pf
+from .. import __version__
 
-def SavePAD(Date,path,spec,Overwrite=False):
+#the first bytes of a version 2 PAD file
+PADMagic = b'ARASEPAD'
+PADFormat = 2
+
+#arrays stored in each file and their dtypes
+_PADArrays = [	('Date','int32'),
+				('ut','float32'),
+				('utc','float64'),
+				('Emin','float32'),
+				('Emax','float32'),
+				('Alpha','float32'),
+				('Flux','float32')]
+
+#alignment of each array within the file
+_Align = 64
+
+def _DataVersion(idx,Date):
+	'''
+	Latest version of a data file in a data index (-1 if the date is
+	not in the index).
+
+	'''
+	use = np.where(idx.Date == Date)[0]
+	if use.size == 0:
+		return -1
+	return int(np.max(idx.Version[use]))
+
+def _Padding(n):
+	return (_Align - n % _Align) % _Align
+
+def _SaveV1(fname,tmp):
+	'''
+	Write the original (version 1) format: a sequence of
+	PyFileIO.ArrayToFile blocks.
+
+	'''
+	f = open(fname,'wb')
+	for k,dtype in _PADArrays:
+		pf.ArrayToFile(tmp[k],dtype,f)
+	f.close()
+
+def _SaveV2(fname,tmp,Date,SpecType,Compress,ChunkSize,Source):
+	'''
+	Write the version 2 format: a JSON header followed by each of the
+	arrays (aligned), the Flux array is either stored as a single
+	(nt,ne,na) array which can be memory mapped, or as zlib compressed
+	chunks of ChunkSize records.
+
+	'''
+	#the blocks of data to write, with offsets relative to the end of
+	#the header
+	arrays = {}
+	blocks = []
+	offset = 0
+	for k,dtype in _PADArrays:
+		x = np.ascontiguousarray(tmp[k],dtype=dtype)
+		info = {'dtype' : x.dtype.str, 'shape' : list(x.shape), 'offset' : offset}
+		if k == 'Flux' and Compress:
+			info['Compression'] = 'zlib'
+			info['ChunkSize'] = ChunkSize
+			info['Chunks'] = []
+			for r0 in range(0,x.shape[0],ChunkSize):
+				b = zlib.compress(x[r0:r0+ChunkSize].tobytes())
+				info['Chunks'].append([offset,len(b)])
+				blocks.append(b)
+				offset += len(b)
+		else:
+			info['Compression'] = None
+			blocks.append(x)
+			offset += x.nbytes
+		arrays[k] = info
+		pad = _Padding(offset)
+		blocks.append(b'\x00'*pad)
+		offset += pad
+
+	flux = np.shape(tmp['Flux'])
+	header = {	'Format' : PADFormat,
+				'Date' : int(Date),
+				'SpecType' : SpecType,
+				'nt' : int(flux[0]),
+				'ne' : int(flux[1]),
+				'na' : int(flux[2]),
+				'Source' : dict({'Arase' : __version__},**({} if Source is None else Source)),
+				'Arrays' : arrays}
+	hbytes = json.dumps(header).encode('utf-8')
+	hbytes = hbytes + b' '*_Padding(len(PADMagic) + 8 + len(hbytes))
+
+	f = open(fname,'wb')
+	f.write(PADMagic)
+	np.array([PADFormat,len(hbytes)],dtype='<u4').tofile(f)
+	f.write(hbytes)
+	for b in blocks:
+		if isinstance(b,np.ndarray):
+			b.tofile(f)
+		else:
+			f.write(b)
+	f.close()
+
+def SavePAD(Date,path,spec,Overwrite=False,Format=2,Compress=False,
+			ChunkSize=1024,Source=None):
 	'''
 	Save pitch angle distribution data
-	
+
+	Inputs
+	======
+	Date : int
+		Date in the format yyyymmdd.
+	path : str
+		PAD directory of the instrument.
+	spec : dict
+		Contains a dict for each species (see CalculatePAD).
+	Overwrite : bool
+		Overwrite existing files.
+	Format : int
+		1 - the original format, a sequence of arrays.
+		2 - a header (shapes, dtypes, offsets and the versions of the
+			source data) followed by the arrays, so that ReadPAD can
+			memory map the flux and read only part of it.
+	Compress : bool
+		Version 2 only, compress the flux in chunks of records (these
+		can't be memory mapped, but only the chunks which are needed
+		are read).
+	ChunkSize : int
+		Number of records in each compressed chunk.
+	Source : None or dict
+		Version 2 only, extra information to store in the header, e.g.
+		the versions of the data files used.
+
 	'''
+	if not Format in [1,2]:
+		raise ValueError('Format should be 1 or 2')
+
 	#create the output path
 	outpath = path + '{:08d}/'.format(Date)
 	if not os.path.isdir(outpath):
@@ -14,24 +144,22 @@ def SavePAD(Date,path,spec,Overwrite=False):
 		os.system('chmod 777 '+outpath)
 	#create a list of spectra
 	keys = list(spec.keys())
-	
+
 	#loop through and save each one
 	for k in keys:
 		tmp = spec[k]
-		
+
 		fname = outpath + k + '.bin'
 		if os.path.isfile(fname) and not Overwrite:
 			continue
 		print('saving file: {:s}'.format(fname))
-		f = open(fname,'wb')
-		pf.ArrayToFile(tmp['Date'],'int32',f)
-		pf.ArrayToFile(tmp['ut'],'float32',f)
-		pf.ArrayToFile(tmp['utc'],'float64',f)
-		pf.ArrayToFile(tmp['Emin'],'float32',f)
-		pf.ArrayToFile(tmp['Emax'],'float32',f)
-		pf.ArrayToFile(tmp['Alpha'],'float32',f)
-		pf.ArrayToFile(tmp['Flux'],'float32',f)
-		f.close()
+		#write to a temporary file first, so that an interrupted save
+		#never leaves a partial file which looks complete
+		if Format == 1:
+			_SaveV1(fname + '.tmp',tmp)
+		else:
+			_SaveV2(fname + '.tmp',tmp,Date,k,Compress,ChunkSize,Source)
+		os.replace(fname + '.tmp',fname)
 
 		#change permissions
 		os.system('chmod 666 '+fname)
@@ -0,0 +1,64 @@
+import numpy as np
+import importlib
+from .. import Globals
+from .SpecStore import SaveSpecArrays
+from .SavePAD import _DataVersion
+
+def PitchAnglePath(Instrument,Date):
+	'''
+	Directory containing the saved pitch angles of a date.
+
+	'''
+	return Globals.DataPath + Instrument + '/PitchAngles/{:08d}/'.format(Date)
+
+def PitchAngleSource(Instrument,Date):
+	'''
+	Versions of the 3dflux and MGF data which the pitch angles of a 
+	date are calculated from (-1 where they are not in the data index).
+
+	'''
+	mod = importlib.import_module('..' + Instrument + '.ReadIndex',__package__)
+	from ..MGF.ReadIndex import ReadIndex as ReadMGFIndex
+	return {'3dflux' : _DataVersion(mod.ReadIndex(2,'3dflux'),Date),
+			'MGF' : _DataVersion(ReadMGFIndex(2,'8sec'),Date)}
+
+def SavePitchAngles(Instrument,Date,arrays,Source=None):
+	'''
+	Save the pitch angles of the 3D data of an instrument for a whole
+	day, so that they can be reused (see ReadPitchAngles) rather than
+	calculated again.
+
+	Inputs
+	======
+	Instrument : str
+		'MEPe'|'MEPi'|'LEPe'|'LEPi'|'HEP'
+	Date : int
+		Date in the format yyyymmdd.
+	arrays : dict
+		The pitch angles and the epochs of the records that they belong
+		to, e.g. {'epoch' : ..., 'alpha' : ...}.
+	Source : None or dict
+		Versions of the data used (see PitchAngleSource), if None then
+		the current versions are used.
+
+	'''
+	if Source is None:
+		Source = PitchAngleSource(Instrument,Date)
+	path = PitchAnglePath(Instrument,Date)
+
+	header = {	'Class' : 'PitchAngles',
+				'Instrument' : Instrument,
+				'Date' : int(Date),
+				'Source' : Source}
+	SaveSpecArrays(path,header,arrays)
+
+def _SaveIfPossible(Instrument,Date,arrays,Source=None):
+	'''
+	Save pitch angles (see SavePitchAngles), printing a warning rather
+	than failing if they can't be written (e.g. a read-only DataPath).
+
+	'''
+	try:
+		SavePitchAngles(Instrument,Date,arrays,Source)
+	except OSError as e:
+		print('Unable to save pitch angles: '+str(e))
@@ -0,0 +1,191 @@
+import numpy as np
+import multiprocessing as mp
+import warnings
+from multiprocessing import shared_memory,resource_tracker
+from .SpecStore import _NewSpecObject
+
+#segments created by this process, and those attached to it
+_Owned = {}
+_Attached = {}
+
+def _Attach(name):
+	'''
+	Attach to an existing shared memory segment.
+
+	'''
+	if name in _Owned:
+		return _Owned[name]
+	if not name in _Attached:
+		shm = shared_memory.SharedMemory(name=name)
+		#multiprocessing children share their parent's resource tracker,
+		#any other process would unlink the segment when it exits
+		if mp.parent_process() is None:
+			resource_tracker.unregister(shm._name,'shared_memory')
+		_Attached[name] = shm
+	return _Attached[name]
+
+class SharedSpecHandle(object):
+	def __init__(self,header,segments,local):
+		'''
+		A small, picklable reference to a spectrum object (or dict of
+		arrays) whose arrays are stored in shared memory. Send this to
+		worker processes instead of the object itself, then call
+		SharedSpecHandle.Open to get the object back (without copying
+		any of the arrays).
+
+		Inputs
+		======
+		header : dict
+			Description of the object.
+		segments : dict
+			Shared memory segment name, shape and dtype of each array.
+		local : dict
+			Arrays which can't be shared (e.g. object arrays), these are
+			pickled along with the handle.
+
+		'''
+		self.header = header
+		self.segments = segments
+		self.local = local
+
+	def _Reader(self,name):
+		if name in self.local:
+			return self.local[name]
+		seg,shape,dtype = self.segments[name]
+		if seg is None:
+			return np.zeros(shape,dtype=dtype)
+		shm = _Attach(seg)
+		x = np.ndarray(shape,dtype=dtype,buffer=shm.buf)
+		x.flags.writeable = False
+		return x
+
+	def Open(self):
+		'''
+		Recreate the object, with its arrays backed by the shared
+		memory segments (these are read-only). The segments stay
+		attached to this process until SharedSpecHandle.Close is called.
+
+		Returns
+		=======
+		PSpecCls, SpecCls, PSpecPADCls or dict
+
+		'''
+		if self.header['Class'] == 'dict':
+			out = dict(self.header['Items'])
+			for k in self.header['Arrays']:
+				out[k] = self._Reader(k)
+			return out
+
+		obj = _NewSpecObject(self.header)
+		obj._Unpack(self.header,self._Reader)
+		return obj
+
+	def Close(self):
+		'''
+		Detach the shared memory segments from this process. Any objects
+		returned by Open must not be used after this.
+
+		'''
+		for name in self.segments:
+			seg = self.segments[name][0]
+			if seg in _Attached:
+				shm = _Attached.pop(seg)
+				try:
+					shm.close()
+				except BufferError:
+					#still in use, keep it until it isn't
+					_Attached[seg] = shm
+
+
+class SharedSpec(object):
+	def __init__(self,obj):
+		'''
+		Copy the arrays of a PSpecCls, SpecCls or PSpecPADCls object (or
+		a dict of arrays, such as the output of Read3D) into shared
+		memory, so that it can be sent to other processes without being
+		pickled. The object owns the shared memory segments, which exist
+		until SharedSpec.Unlink is called (or the end of a with block),
+		even if this object is deleted first.
+
+		e.g.
+			with SharedSpec(spec) as s:
+				pool.map(func,[(s.Handle,i) for i in range(n)])
+
+		where func calls s.Handle.Open() to get the object back.
+
+		Inputs
+		======
+		obj : PSpecCls, SpecCls, PSpecPADCls or dict
+			Object to share.
+
+		'''
+		if isinstance(obj,dict):
+			arrays = {}
+			items = {}
+			for k in obj:
+				if isinstance(obj[k],np.ndarray):
+					arrays[k] = obj[k]
+				else:
+					items[k] = obj[k]
+			header = {'Class' : 'dict', 'Items' : items, 'Arrays' : list(arrays.keys())}
+		else:
+			header,arrays = obj._Pack()
+
+		segments = {}
+		local = {}
+		self._shm = []
+		for k in arrays:
+			x = np.asarray(arrays[k])
+			if x.dtype.hasobject:
+				local[k] = x
+				continue
+			if x.nbytes == 0:
+				segments[k] = (None,x.shape,x.dtype.str)
+				continue
+			shm = shared_memory.SharedMemory(create=True,size=x.nbytes)
+			_Owned[shm.name] = shm
+			self._shm.append(shm)
+			np.ndarray(x.shape,dtype=x.dtype,buffer=shm.buf)[...] = x
+			segments[k] = (shm.name,x.shape,x.dtype.str)
+
+		self.Handle = SharedSpecHandle(header,segments,local)
+
+	@property
+	def nbytes(self):
+		'''
+		Total size of the shared memory segments.
+
+		'''
+		return np.sum([shm.size for shm in self._shm])
+
+	def Unlink(self):
+		'''
+		Free the shared memory segments. Objects opened from the handle
+		(in any process) must not be used after this.
+
+		'''
+		for shm in self._shm:
+			_Owned.pop(shm.name,None)
+			_Attached.pop(shm.name,None)
+			try:
+				shm.close()
+			except BufferError:
+				pass
+			try:
+				shm.unlink()
+			except FileNotFoundError:
+				pass
+		self._shm = []
+
+	def __enter__(self):
+		return self
+
+	def __exit__(self,*args):
+		self.Unlink()
+
+	def __del__(self):
+		#the segments are only freed by Unlink (or a with block), so
+		#that handles can outlive this object, but warn if they have
+		#been left behind
+		if len(getattr(self,'_shm',[])) > 0:
+			warnings.warn('SharedSpec deleted without calling Unlink, {:d} shared memory segments still exist'.format(len(self._shm)),ResourceWarning)
@@ -6,6 +6,13 @@ import DateTimeTools as TT
 from scipy.interpolate import interp1d
 from ..Pos.ReadFieldTraces import ReadFieldTraces
 from .PosDTPlotLabel import PosDTPlotLabel
+from .RunningStats import RunningStats
+from .GrowableArray import GrowableArray
+from .SpectrogramMesh import SpectrogramMesh
+from .SpecPyramid import SpecPyramid
+from .RasterSpectrogram import RasterSpectrogram,NewRasterImage,SaveRasterImage
+from .TimeIndex import TimeIndex
+from .SpecStore import SaveSpecArrays
 
 defargs = {	'Meta' : None,
 			'dt' : None,
@@ -16,7 +23,8 @@ defargs = {	'Meta' : None,
 			'ylog' : False,
 			'zlog' : False, 
 			'ScaleType' : 'range',
-			'nStd' : 2}
+			'nStd' : 2,
+			'Contiguous' : False}
 
 
 class SpecCls(object):
@@ -39,6 +47,10 @@ class SpecCls(object):
 			True for logarithmic y-axis
 		zlog : bool
 			True for logarithmic color scale
+		Contiguous : bool
+			If True, the per-record arrays are appended into contiguous
+			buffers (one set per frequency-table layout) and the lists 
+			below hold views of them - see SpecCls.GetSeries.
 		
 		'''
 		
@@ -53,6 +65,7 @@ class SpecCls(object):
 		self.dt = []
 		self.Meta = []
 		self.Label = []
+		self.TimeIndex = []
 		self.n = 0
 		
 		#and the keywords
@@ -63,7 +76,19 @@ class SpecCls(object):
 		self._zlog = kwargs.get('zlog',defargs['zlog'])
 		self._ScaleType = kwargs.get('ScaleType',defargs['ScaleType'])
 		self._nStd = kwargs.get('nStd',defargs['nStd'])
+		self._Contiguous = kwargs.get('Contiguous',defargs['Contiguous'])
 		
+		#running limits - blocks are folded in lazily (see _UpdateLimits)
+		self._ResetLimits()
+		
+		#segments of blocks which share a frequency-table layout
+		self._segkeys = []
+		self._segs = {}
+		self._blocks = []
+		self._taxis = None
+		
+		#downsampled copies of each spectrogram (see _PlotSpectrogram)
+		self._pyramids = {}
 			
 
 	
@@ -169,78 +194,384 @@ class SpecCls(object):
 		#calculate dt
 		self.dt.append(self._ProcessDT(dt,ut))
 
-		#calculate the new time, frequency and z scale limits
-		self._CalculateTimeLimits() 
-		self._CalculateFrequencyLimits()
-		self._CalculateScale()
+		#the time, frequency and z scale limits are updated when needed
+		self._pending.append(self.n)
+
+		#copy into the contiguous buffers if needed
+		self._AddToSegment(self.n)
+		self._taxis = None
+
+		#find the continuous segments of data
+		self._AddTimeIndex(self.n)
 
 		#add to the total count of spectrograms stored
 		self.n += 1
 	
-	def _GetSpectrum(self,I,sutc,dutc,Method):
-	
-		#get the appropriate data
-		l = self.Label[I]
-		utc = self.utc[I]
-		f = self.Freq[I]
-		Spec = self.Spec[I]		
+	def Merge(self,other):
+		'''
+		Add all of the spectra stored in another SpecCls object to this
+		one. The arrays and bandwidths are adopted by reference rather 
+		than being recalculated, and the cached limits of both objects 
+		are combined, so this scales with the number of blocks, not the
+		size of the data.
 		
-		#find the nearest
-		dt = np.abs(utc - sutc)
-		near = np.where(dt == dt.min())[0][0]
+		The merged blocks are not copied into this object's contiguous
+		buffers, even if it was created with Contiguous=True, so 
+		GetSeries returns concatenated copies for their segments.
 		
-		#check if the nearest is within dutc
-		if dt[near] > dutc:
-			return [],[],[]
+		Inputs
+		======
+		other : SpecCls
+			Object to merge into this one (its arrays are shared, not
+			copied).
+		
+		'''
+		n0 = self.n
+		for f in ['Date','ut','Epoch','Freq','Spec','utc','bw','dt',
+					'Meta','Label','TimeIndex']:
+			getattr(self,f).extend(getattr(other,f))
 			
+		#blocks which neither object has folded into its limits yet
+		self._pending += [n0 + i for i in other._pending]
 		
-		#check if we are past the end of the time series, or Method is nearest
-		if (Method == 'nearest') or (sutc < utc[0]) or (sutc > utc[-1]):
-			s = Spec[near,:]
-			if len(f.shape) == 2:
-				e = f[near,:]
-			else:
-				e = f
+		#and those which have been
+		self._MergeLimits(other)
+		
+		#cached pyramids are still valid
+		for k in other._pyramids:
+			self._pyramids[k + n0] = other._pyramids[k]
+		
+		#the adopted arrays are not copied into contiguous buffers
+		Contiguous = self._Contiguous
+		self._Contiguous = False
+		self.n += other.n
+		for i in range(n0,self.n):
+			self._AddToSegment(i)
+		self._Contiguous = Contiguous
+		self._taxis = None
+	
+	def _Kwargs(self):
+		'''
+		Return the keywords needed to create a similar empty object.
+		
+		'''
+		return {	'xlabel' : self.xlabel,
+					'ylabel' : self.ylabel,
+					'zlabel' : self.zlabel,
+					'ylog' : self._ylog,
+					'zlog' : self._zlog,
+					'ScaleType' : self._ScaleType,
+					'nStd' : self._nStd,
+					'Contiguous' : self._Contiguous}
+	
+	def Slice(self,Date,ut=[0.0,24.0]):
+		'''
+		Return a new SpecCls object containing only the spectra within
+		a time interval. The arrays of the new object are views of this
+		one's where possible (rather than copies) and its limits are 
+		calculated only from the spectra within the interval.
+		
+		Inputs
+		======
+		Date : int32
+			Either a single date in the format yyyymmdd, or a 2 element
+			tuple/list/numpy.ndarray with the start and end dates.
+		ut : list/tuple
+			2-element start and end times, where each element is the 
+			time in hours since the start of the day, e.g. 17:30 == 17.5.
 			
+		Returns
+		=======
+		SpecCls object
+		
+		'''
+		if np.size(Date) == 1:
+			Date0 = Date
+			Date1 = Date
 		else:
-			#in this case we need to find the two surrounding neighbours
-			#and interpolate between them
-			bef = np.where(utc <= sutc)[0][-1]
-			aft = np.where(utc > sutc)[0][0]
-			
-			s0 = Spec[bef,:]
-			s1 = Spec[aft,:]
+			Date0 = Date[0]
+			Date1 = Date[1]
+		utclim = TT.ContUT(np.array([Date0,Date1]),np.array(ut))
+		return self[utclim[0]:utclim[1]]
+		
+	def __getitem__(self,key):
+		'''
+		Slice the object in time, e.g. Spec[utc0:utc1] where utc0 and 
+		utc1 are continuous times (hours since 1950-01-01, see 
+		DateTimeTools.ContUT). See SpecCls.Slice.
+		
+		'''
+		if not isinstance(key,slice) or not key.step is None:
+			raise TypeError('SpecCls objects can only be sliced in time, e.g. Spec[utc0:utc1]')
+		t0 = -np.inf if key.start is None else key.start
+		t1 = np.inf if key.stop is None else key.stop
+		
+		#views are kept separate rather than copied into new buffers
+		kwargs = self._Kwargs()
+		kwargs['Contiguous'] = False
+		out = SpecCls(**kwargs)
+		for I in range(0,self.n):
+			use,nt = self.TimeIndex[I].Slice(t0,t1)
+			if nt > 0:
+				out._AddSlice(self,I,use)
+		return out
+		
+	def _AddSlice(self,other,I,use):
+		'''
+		Add the records (use) of the I'th block of another SpecCls
+		object to this one, without recalculating anything.
+		
+		'''
+		for f in ['Date','ut','Epoch','Spec','utc','dt']:
+			getattr(self,f).append(getattr(other,f)[I][use])
+		for f in ['Freq','bw']:
+			x = getattr(other,f)[I]
+			if np.ndim(x) == 2:
+				x = x[use]
+			getattr(self,f).append(x)
+		self.Meta.append(other.Meta[I])
+		self.Label.append(other.Label[I])
+		
+		self._pending.append(self.n)
+		self._AddToSegment(self.n)
+		self._AddTimeIndex(self.n)
+		self._taxis = None
+		self.n += 1
+		
+	def Save(self,path):
+		'''
+		Save this object to a directory containing a JSON header and one
+		.npy file per array. It can be reopened (with the arrays memory
+		mapped) using Arase.Tools.LoadSpecObject.
+		
+		Inputs
+		======
+		path : str
+			Directory to save to.
+		
+		'''
+		header,arrays = self._Pack()
+		SaveSpecArrays(path,header,arrays)
+		
+	def _Pack(self):
+		'''
+		Return a header dict describing this object and a dict of all of
+		the arrays needed to recreate it (see SpecCls._Unpack).
+		
+		'''
+		arrays = {}
+		blocks = []
+		for i in range(0,self.n):
+			for f in ['Date','ut','Epoch','Freq','Spec','utc','bw','dt']:
+				arrays['{:d}_{:s}'.format(i,f)] = getattr(self,f)[i]
+			blocks.append({'Label' : self.Label[i], 'Meta' : self.Meta[i]})
 			
-			if len(f.shape) == 2:
-				e0 = f[near,:]
-				e1 = f[near,:]
+		header = {	'Class' : 'SpecCls',
+					'kwargs' : self._Kwargs(),
+					'Blocks' : blocks,
+					'Limits' : self._GetLimitState()}
+		return header,arrays
+		
+	def _Unpack(self,header,Reader):
+		'''
+		Fill this (empty) object using the header and arrays from 
+		SpecCls._Pack, where Reader(name) returns each array (see 
+		Arase.Tools.LoadSpecObject).
+		
+		'''
+		#the arrays are used as they are (e.g. memory mapped) rather
+		#than being copied into contiguous buffers
+		Contiguous = self._Contiguous
+		self._Contiguous = False
+		for i,b in enumerate(header['Blocks']):
+			for f in ['Date','ut','Epoch','Freq','Spec','utc','bw','dt']:
+				getattr(self,f).append(Reader('{:d}_{:s}'.format(i,f)))
+			self.Meta.append(b['Meta'])
+			self.Label.append(b['Label'])
+			self._AddToSegment(i)
+			self._AddTimeIndex(i)
+			self.n += 1
+		self._Contiguous = Contiguous
+		self._SetLimitState(header['Limits'])
+	
+	def _AddTimeIndex(self,I):
+		'''
+		Create the time index of the I'th block, which splits it into
+		continuous segments wherever there are gaps in time or the 
+		frequency table changes (see TimeIndex).
+		
+		'''
+		self.TimeIndex.append(TimeIndex(self.utc[I],self.dt[I],[self.Freq[I],self.bw[I]]))
+		
+	def _SegmentKey(self,I):
+		'''
+		Blocks which can share contiguous storage have the same number
+		of frequency bins and the same frequency array dimensions.
+		
+		'''
+		f = self.Freq[I]
+		return (np.ndim(f),np.shape(f)[-1])
+		
+	def _SegmentFields(self,key):
+		'''
+		List the per-record fields stored in each segment.
+		
+		'''
+		fields = ['Date','ut','Epoch','utc','dt','Spec']
+		if key[0] == 2:
+			fields += ['Freq','bw']
+		return fields
+		
+	def _AddToSegment(self,I):
+		'''
+		Append the I'th block to its segment, then replace the entries
+		in the lists of arrays with views of the contiguous buffers.
+		
+		'''
+		key = self._SegmentKey(I)
+		if not key in self._segs:
+			self._segkeys.append(key)
+			self._segs[key] = {'blocks' : []}
+		seg = self._segs[key]
+		seg['blocks'].append(I)
+		self._blocks.append(key)
+		if not self._Contiguous:
+			return
+		
+		nt = np.size(self.utc[I])
+		for f in self._SegmentFields(key):
+			x = getattr(self,f)
+			if np.shape(x[I])[:1] != (nt,):
+				continue
+			if not f in seg:
+				seg[f] = GrowableArray()
+				seg[f+'_idx'] = []
+			i0,i1,grew = seg[f].Append(x[I])
+			seg[f+'_idx'].append((I,i0,i1))
+			buf = seg[f].data
+			if grew:
+				#all blocks in this segment need new views
+				for j,j0,j1 in seg[f+'_idx']:
+					x[j] = buf[j0:j1]
 			else:
-				e0 = f
-				e1 = f
-			
-			dx = utc[aft] - utc[bef]
-			ds = s1 - s0
-			de = e1 - e0
-			
-			dsdx = ds/dx
-			dedx = de/dx
+				x[I] = buf[i0:i1]
+	
+	def GetSeries(self,Param):
+		'''
+		Return the whole series of a per-record parameter, as one array
+		per frequency-table segment (blocks with the same number of 
+		frequency bins). When the object was created with 
+		Contiguous=True these are views of the underlying buffers, 
+		otherwise they are concatenated copies.
+		
+		Inputs
+		======
+		Param : str
+			Name of the parameter, e.g. 'Date'|'ut'|'utc'|'dt'|'Spec'
+			(or 'Freq'|'bw' if they vary with time).
 			
-			dt = sutc - utc[bef]
+		Returns
+		=======
+		list of numpy.ndarray
+		
+		'''
+		x = getattr(self,Param)
+		out = []
+		for key in self._segkeys:
+			seg = self._segs[key]
+			if Param in seg and len(seg[Param+'_idx']) == len(seg['blocks']):
+				out.append(seg[Param].data)
+			else:
+				out.append(np.concatenate([x[j] for j in seg['blocks']]))
+		return out
+		
+	def _GetTimeAxis(self):
+		'''
+		Return the sorted dates and continuous times of every record, 
+		these are cached until more data are added.
+		
+		'''
+		if self._taxis is None:
+			tdate = self.GetSeries('Date')
+			tutc = self.GetSeries('utc')
+			if len(tutc) == 1:
+				tdate = tdate[0]
+				tutc = tutc[0]
+			else:
+				tdate = np.concatenate(tdate)
+				tutc = np.concatenate(tutc)
+			if (tutc[1:] < tutc[:-1]).any():
+				srt = np.argsort(tutc)
+				tdate = tdate[srt]
+				tutc = tutc[srt]
+			self._taxis = (tdate,tutc)
+		return self._taxis
+	
+	def _GetSpectra(self,I,sutc,dutc,Method):
+		'''
+		Get the spectra from a single block at an array of times.
+		
+		Returns
+		=======
+		f : float
+			Frequency bins, shape (M,nf), NaN where unavailable.
+		s : float
+			Spectra, shape (M,nf).
+		d : float
+			Distance in time (hours) to the nearest record, inf where
+			it is further than dutc.
+		
+		'''
+		#get the appropriate data
+		utc = self.utc[I]
+		Freq = self.Freq[I]
+		Spec = self.Spec[I]		
+		
+		#find the nearest and surrounding records (those either side of
+		#a gap or change of frequency table are not interpolated between)
+		near,bef,aft = self.TimeIndex[I].Search(sutc,Segmented=True)
+		d = np.abs(utc[near] - sutc)
+		d[d > dutc] = np.inf
+		
+		s = np.float64(Spec[near])
+		if len(Freq.shape) == 2:
+			f = np.float64(Freq[near])
+		else:
+			f = np.zeros(s.shape,dtype='float64') + Freq
+		
+		#interpolate between the two surrounding records where possible
+		if Method != 'nearest':
+			use = np.where(np.isfinite(d) & (bef >= 0) & (aft < utc.size))[0]
+			b0 = bef[use]
+			b1 = aft[use]
+			w = ((sutc[use] - utc[b0])/(utc[b1] - utc[b0]))[:,np.newaxis]
+			s[use] = Spec[b0] + w*(Spec[b1] - Spec[b0])
 			
-			s = s0 + dt*dsdx
-			e = e0 + dt*dedx
+		#remove rubbish
+		bad = ~(f > 0) | ~np.isfinite(d)[:,np.newaxis]
+		f[bad] = np.nan
+		s[bad] = np.nan
+		
+		return f,s,d
 		
+	def _GetSpectrum(self,I,sutc,dutc,Method):
+	
+		e,s,d = self._GetSpectra(I,np.array([sutc]),dutc,Method)
 		
+		#check if the nearest is within dutc
+		if not np.isfinite(d[0]):
+			return [],[],[]
+			
 		#remove rubbish
-		good = np.where(e > 0)[0]
-		e = e[good]
-		s = s[good]
+		good = np.where(np.isfinite(e[0]))[0]
+		e = e[0,good]
+		s = s[0,good]
 			
 		#sort by e
 		srt = np.argsort(e)
 		e = e[srt]
 		s = s[srt]
-		return e,s,l
+		return e,s,self.Label[I]
 
 	
 	def GetSpectrum(self,Date,ut,Method='nearest',Maxdt=60.0,Split=False):
@@ -256,7 +587,8 @@ class SpecCls(object):
 		Method : str
 			'nearest'|'interpolate' - will find the nearest spectrum to
 			the time specified time, or will interpolate between two 
-			surrounding spectra.
+			surrounding spectra (the nearest is used where these are
+			either side of a gap or a change in frequency table).
 		Maxdt : float
 			Maximum difference in time between the specified time and the
 			time of the spectra in seconds.
@@ -302,6 +634,77 @@ class SpecCls(object):
 			
 		return freq,spec,labs
 		
+	def GetSpectra(self,Date,ut,Method='nearest',Maxdt=60.0):
+		'''
+		This method will return the spectra at an array of times.
+		
+		Inputs
+		======
+		Date : int
+			Date(s) in format yyyymmdd, either a scalar or an array with
+			the same length as ut.
+		ut : float
+			Array of times in hours since beginning of the day.
+		Method : str
+			'nearest'|'interpolate' - will find the nearest spectrum to
+			the time specified time, or will interpolate between two 
+			surrounding spectra (the nearest is used where these are
+			either side of a gap or a change in frequency table).
+		Maxdt : float
+			Maximum difference in time between the specified time and the
+			time of the spectra in seconds.
+		
+		Returns
+		=======
+		freq : float
+			Array of frequencies, shape (M,nf), with each row sorted and
+			padded with NaNs at the end.
+		spec : float
+			Array of spectra, shape (M,nf).
+		
+		'''
+	
+		#convert to continuous time
+		ut = np.array([ut]).flatten()
+		Date = np.zeros(ut.size,dtype='int32') + Date
+		utc = TT.ContUT(Date,ut)
+		dutc = Maxdt/3600.0
+		
+		#blocks with the same frequency-table layout are combined by 
+		#picking the one with the nearest record
+		keys = []
+		freq = {}
+		spec = {}
+		dist = {}
+		for i in range(0,self.n):
+			f,s,d = self._GetSpectra(i,utc,dutc,Method)
+			k = self._SegmentKey(i)
+			if not k in keys:
+				keys.append(k)
+				freq[k] = f
+				spec[k] = s
+				dist[k] = d
+			else:
+				use = d < dist[k]
+				freq[k][use] = f[use]
+				spec[k][use] = s[use]
+				dist[k][use] = d[use]
+				
+		if len(keys) == 0:
+			return np.zeros((ut.size,0)),np.zeros((ut.size,0))
+		
+		#combine and sort each row by frequency (NaNs go to the end)
+		freq = np.concatenate([freq[k] for k in keys],axis=1)
+		spec = np.concatenate([spec[k] for k in keys],axis=1)
+		srt = np.argsort(freq,axis=1)
+		freq = np.take_along_axis(freq,srt,axis=1)
+		spec = np.take_along_axis(spec,srt,axis=1)
+		
+		#remove columns which are never used
+		good = np.where(np.isfinite(freq).any(axis=0))[0]
+		
+		return freq[:,good],spec[:,good]
+		
 	def PlotSpectrum(self,Date,ut,Method='nearest',Maxdt=60.0,Split=False,
 		fig=None,maps=[1,1,0,0],color=None,xlog=True,ylog=None,
 		nox=False,noy=False):
@@ -317,7 +720,8 @@ class SpecCls(object):
 		Method : str
 			'nearest'|'interpolate' - will find the nearest spectrum to
 			the time specified time, or will interpolate between two 
-			surrounding spectra.
+			surrounding spectra (the nearest is used where these are
+			either side of a gap or a change in frequency table).
 		Maxdt : float
 			Maximum difference in time between the specified time and the
 			time of the spectra in seconds.
@@ -397,7 +801,7 @@ class SpecCls(object):
 		
 	def Plot(self,Date=None,ut=[0.0,24.0],fig=None,maps=[1,1,0,0],
 			ylog=None,scale=None,zlog=None,cmap='gnuplot',nox=False,
-			noy=False,TickFreq='auto',PosAxis=True):
+			noy=False,TickFreq='auto',PosAxis=True,Downsample=True):
 		'''
 		Plots the spectrogram
 		
@@ -433,6 +837,10 @@ class SpecCls(object):
 			If True, no labels or tick marks are drawn for the x-axis
 		noy : bool
 			If True, no labels or tick marks are drawn for the y-axis
+		Downsample : bool
+			If True, long time ranges are plotted using the mean of 
+			groups of records, such that there is roughly one record per
+			pixel (see SpecPyramid).
 		'''
 		
 		
@@ -443,6 +851,9 @@ class SpecCls(object):
 			fig.figure()
 		ax = fig.subplot2grid((maps[1],maps[0]),(maps[3],maps[2]))
 		
+		#make sure that the limits include all of the data
+		self._UpdateLimits()
+		
 		#set axis limits
 		if Date is None:
 			ax.set_xlim(self._utlim)
@@ -470,30 +881,16 @@ class SpecCls(object):
 
 			
 		#get color scale
-		if zlog is None:
-			zlog = self._zlog
-		if scale is None:
-			if zlog:
-				scale = self._logscale
-			else:
-				scale = self._scale
-		if zlog:
-			norm = colors.LogNorm(vmin=scale[0],vmax=scale[1])
-		else:
-			norm = colors.Normalize(vmin=scale[0],vmax=scale[1])
+		norm = self._GetNorm(zlog,scale)
 			
 		#create plots
 		for i in range(0,self.n):
-			tmp = self._PlotSpectrogram(ax,i,norm,cmap)
+			tmp = self._PlotSpectrogram(ax,i,norm,cmap,Downsample)
 			if i == 0:
 				sm = tmp
 
 		#sort the UT axis out
-		tdate = np.concatenate(self.Date)
-		tutc = np.concatenate(self.utc)
-		srt = np.argsort(tutc)
-		tdate = tdate[srt]
-		tutc = tutc[srt]
+		tdate,tutc = self._GetTimeAxis()
 
 		#turn axes off when needed
 		if noy:
@@ -529,182 +926,252 @@ class SpecCls(object):
 		cbar.set_label(self.zlabel)		
 		return ax
 
-	def _PlotSpectrogram(self,ax,I,norm,cmap):
+	def _GetNorm(self,zlog,scale):
 		'''
-		This will plot a single spectrogram (multiple may be stored in
-		this object at any one time
+		Return the colour normalization for a spectrogram.
+		
+		'''
+		if zlog is None:
+			zlog = self._zlog
+		if scale is None:
+			if zlog:
+				scale = self._logscale
+			else:
+				scale = self._scale
+		if zlog:
+			norm = colors.LogNorm(vmin=scale[0],vmax=scale[1])
+		else:
+			norm = colors.Normalize(vmin=scale[0],vmax=scale[1])
+		return norm
+		
+	def Rasterize(self,Date=None,ut=[0.0,24.0],Width=800,Height=200,ylog=None,
+			scale=None,zlog=None,cmap='gnuplot',Downsample=True):
+		'''
+		Draw the spectrogram directly into an RGBA image (no matplotlib
+		figure or artists are created), using the same axis limits and 
+		colours as SpecCls.Plot. This is much faster than Plot when 
+		creating lots of quicklook images. Pixels with no data are 
+		transparent.
+		
+		Inputs
+		======
+		Date : int32
+			Either a single date in the format yyyymmdd, or a 2 element
+			tuple/list/numpy.ndarray with the start and end dates. If
+			None (default) then the time limits are calculated 
+			automatically.
+		ut : list/tuple
+			2-element start and end times, where each element is the 
+			time in hours since the start of the day, e.g. 17:30 == 17.5.
+		Width : int
+			Width of the image in pixels.
+		Height : int
+			Height of the image in pixels.
+		ylog : bool
+			If True, y-axis is logarithmic
+		scale : list
+			2-element list or tuple containing the minimum and maximum
+			extents of the color scale
+		zlog : bool
+			if True, color scale is logarithmic
+		cmap : str
+			String containing the name of the colomap to use
+		Downsample : bool
+			If True, long time ranges are drawn using the mean of 
+			groups of records, such that there is roughly one record per
+			pixel (see SpecPyramid).
+			
+		Returns
+		=======
+		img : uint8
+			RGBA image, shape (Height,Width,4).
+		
+		'''
+		self._UpdateLimits()
+		
+		#the same limits as Plot
+		if Date is None:
+			tlim = self._utlim
+		else:
+			if np.size(Date) == 1:
+				Date0 = Date
+				Date1 = Date
+			else:
+				Date0 = Date[0]
+				Date1 = Date[1]
+			tlim = TT.ContUT(np.array([Date0,Date1]),np.array(ut))
+		if ylog is None:
+			ylog = self._ylog
+		ylim = self._logflim if ylog else self._flim
+		norm = self._GetNorm(zlog,scale)
+		
+		img = NewRasterImage(Width,Height)
+		for i in range(0,self.n):
+			if Downsample:
+				if not i in self._pyramids:
+					self._pyramids[i] = SpecPyramid(*self._SpectrogramData(i),
+											Blocks=self.TimeIndex[i].Blocks)
+				self._pyramids[i].Rasterize(img,tlim,ylim,norm,cmap,ylog)
+			else:
+				utc,dt,f0,f1,Spec = self._SpectrogramData(i)
+				RasterSpectrogram(img,utc,dt,f0,f1,Spec,norm,cmap,tlim,ylim,ylog,
+								Blocks=self.TimeIndex[i].Blocks)
+		return img
+		
+	def SaveQuicklook(self,fname,*args,**kwargs):
+		'''
+		Save a quicklook PNG image of the spectrogram, without using a
+		matplotlib figure. The arguments are the same as 
+		SpecCls.Rasterize.
+		
+		Inputs
+		======
+		fname : str
+			Name of the PNG file.
+		
+		'''
+		SaveRasterImage(fname,self.Rasterize(*args,**kwargs))
+		
+	def _SpectrogramData(self,I):
+		'''
+		Return the time axis, bin limits and data used to plot the I'th
+		spectrogram.
 		
 		'''
 		#get the appropriate data
-		Date = self.Date[I]
 		utc = self.utc[I]
-		ut = self.ut[I]
 		dt = self.dt[I]
-		bw = self.bw[I]
-		
 		bw = self.bw[I]
 		f = self.Freq[I]
 		Spec = self.Spec[I]	
 		
 		#get the frequency band limits
-		bad = np.where(np.isnan(f))
-		f[bad] = 0.0
 		f0 = f - 0.5*bw
 		f1 = f + 0.5*bw
-
-		#get the ut array limits
-		t0 = utc
-		t1 = utc + dt
+		return utc,dt,f0,f1,Spec
 		
+	def _PlotSpectrogram(self,ax,I,norm,cmap,Downsample=False):
+		'''
+		This will plot a single spectrogram (multiple may be stored in
+		this object at any one time), using one mesh per continuous 
+		block of data within the current time axis limits.
 		
-		#look for gaps in ut
-		if len(f.shape) > 1:
-			#isgap = ((utc[1:] - utc[:-1]) > 1.1*dt[:-1]) | ((f[1:,:] - f[:-1,:]) != 0).any(axis=1)
-			#minor fudge here
-			isgap = ((utc[1:] - utc[:-1]) > 60.0/3600.0) | ((f[1:,:] - f[:-1,:]) != 0).any(axis=1)
-			nf = f.shape[1]
-		else:
-			#isgap = (utc[1:] - utc[:-1]) > 1.1*dt[:-1]
-			isgap = (utc[1:] - utc[:-1]) > 60.0/3600.0
-			nf = f.size
-		gaps = np.where(isgap)[0] + 1
-		if gaps.size == 0:
-			#no gaps
-			i0 = [0]
-			i1 = [utc.size]
-		else:
-			#lots of gaps
-			i0 = np.append(0,gaps)
-			i1 = np.append(gaps,utc.size)
-		ng = np.size(i0)
-
-		#loop through each continuous block of utc
-		for i in range(0,ng):
-			ttmp = np.append(t0[i0[i]:i1[i]],t1[i1[i]-1])
-			st = Spec[i0[i]:i1[i]]
-			for j in range(0,nf):				
-				if len(f.shape) > 1:
-					ftmp = np.array([f0[i0[i],j],f1[i0[i],j]])
-				else:
-					ftmp = np.array([f0[j],f1[j]])
-				if np.isfinite(ftmp).all():
-					#plot each row of frequency
-					tg,fg = np.meshgrid(ttmp,ftmp)
-					
-					s = np.array([st[:,j]])
-					
-					sm = ax.pcolormesh(tg,fg,s,cmap=cmap,norm=norm)
+		'''
+		#use the cached pyramid if there is one
+		if Downsample and I in self._pyramids:
+			return self._pyramids[I].Plot(ax,norm,cmap)
 			
-		return sm
+		utc,dt,f0,f1,Spec = self._SpectrogramData(I)
+
+		if Downsample:
+			self._pyramids[I] = SpecPyramid(utc,dt,f0,f1,Spec,Blocks=self.TimeIndex[I].Blocks)
+			return self._pyramids[I].Plot(ax,norm,cmap)
+
+		return SpectrogramMesh(ax,utc,dt,f0,f1,Spec,norm,cmap,tlim=ax.get_xlim(),
+							Blocks=self.TimeIndex[I].Blocks)
 		
-	def _CalculateTimeLimits(self):
+	def _ResetLimits(self):
 		'''
-		Loop through all of the stored spectra and find the time limits.
+		Reset the running time, frequency and scale limits.
 		
 		'''
-		#initialize time limits
-		utlim = [np.inf,-np.inf]
+		self._pending = []
+		self._utlim = [np.inf,-np.inf]
+		self._flim = [0.0,-np.inf]
+		self._lflim = [np.inf,-np.inf]
+		self._logflim = 10**np.array(self._lflim)
+		self._stats = RunningStats()
+		self._scale = [np.inf,-np.inf]
+		self._logscale = [np.inf,-np.inf]
 		
-		#loop through each array
-		n = len(self.utc)
-		for i in range(0,n):
-			mn = np.nanmin(self.utc[i])
-			mx = np.nanmax(self.utc[i] + self.dt[i])
-			if mn < utlim[0]:
-				utlim[0] = mn
-			if mx > utlim[1]:
-				utlim[1] = mx
-		self._utlim = utlim
+	def _UpdateLimits(self):
+		'''
+		Fold any spectra added since the last call into the running 
+		time, frequency and scale limits. Each block of spectra is only
+		processed once.
 		
-	def _CalculateFrequencyLimits(self):
 		'''
-		Loop through all of the stored spectra and work out the frequency
-		range to plot.
+		if len(self._pending) > 0:
+			for i in self._pending:
+				self._CalculateTimeLimits(i)
+				self._CalculateFrequencyLimits(i)
+				self._stats.Add(self.Spec[i])
+			self._pending = []
+			self._scale,self._logscale = self._stats.Scale(self._ScaleType,self._nStd)
 		
+	def _GetLimitState(self):
 		'''
-		#initialize frequency limits
-		flim = [0.0,-np.inf]
-		logflim = [np.inf,-np.inf]
+		Return the running limits as a JSON-serializable dict.
 		
-
-		#loop through each array
-		n = len(self.Freq)
-		for i in range(0,n):
-			f0 = self.Freq[i] - self.bw[i]/2.0
-			f1 = self.Freq[i] + self.bw[i]/2.0
-			mn = np.nanmin(f0)
-			mx = np.nanmax(f1)
-			if mn < flim[0]:
-				flim[0] = mn
-			if mx > flim[1]:
-				flim[1] = mx
-			lf0 = np.log10(f0)
-			lf1 = np.log10(f1)
-			bad = np.where(self.Freq[i] <= 0.0)
-			lf0[bad] = np.nan
-			lf1[bad] = np.nan
-
-			lmn = np.nanmin(lf0)
-			lmx = np.nanmax(lf1)
-			if lmn < logflim[0]:
-				logflim[0] = lmn
-			if lmx > logflim[1]:
-				logflim[1] = lmx
-
-		self._flim = flim
-		self._logflim = 10**np.array(logflim)
-
-
+		'''
+		state = {}
+		for l in ['_pending','_utlim','_flim','_lflim']:
+			state[l] = list(getattr(self,l))
+		state['_stats'] = dict(self._stats.__dict__)
+		return state
 		
-	def _CalculateScale(self):
+	def _SetLimitState(self,state):
 		'''
-		Calculate the default scale limits for the plot.
+		Restore the running limits saved by _GetLimitState.
 		
 		'''
-		scale = [np.inf,-np.inf]
-		logscale = [np.inf,-np.inf]
+		for l in ['_pending','_utlim','_flim','_lflim']:
+			setattr(self,l,list(state[l]))
+		self._logflim = 10**np.array(self._lflim)
+		self._stats.__dict__.update(state['_stats'])
+		if self._stats.size > 0:
+			self._scale,self._logscale = self._stats.Scale(self._ScaleType,self._nStd)
 		
-		n = len(self.Spec)
-		for i in range(0,n):
-			ls = np.log10(self.Spec[i])
-			bad = np.where(self.Spec[i] <= 0)
-			ls[bad] = np.nan
-				
-			if self._ScaleType == 'std':
-				mu = np.nanmean(self.Spec[i])
-				std = np.std(self.Spec[i])
-				
-				lmu = np.nanmean(ls)
-				lstd = np.std(ls)
-					
-				tmpscale = [mu - self._nStd*std, mu + self._nStd*std]
-				tmplogscale = 10**np.array([lmu - self._nStd*lstd, lmu + self._nStd*lstd])					
-				
-			elif self._ScaleType == 'positive':
-				#calculate the scale based on all values being positive 
-				std = np.sqrt((1.0/np.sum(self.Spec[i].size))*np.nansum((self.Spec[i])**2))
-				lstd = np.sqrt(((1.0/np.sum(np.isfinite(ls))))*np.nansum((ls)**2))
-					
-				tmpscale = [0.0,std*self._nStd]
-				tmplogscale = 10**np.array([np.nanmin(ls),lstd*self._nStd])			
-			else:
-				#absolute range
-				tmpscale = [np.nanmin(self.Spec[i]),np.nanmax(self.Spec[i])]
-				tmplogscale = 10**np.array([np.nanmin(ls),np.nanmax(ls)])
-
-
-			if tmpscale[0] < scale[0]:
-				scale[0] = tmpscale[0]
-			if tmpscale[1] > scale[1]:
-				scale[1] = tmpscale[1]
-			
-			if tmplogscale[0] < logscale[0]:
-				logscale[0] = tmplogscale[0]
-			if tmplogscale[1] > logscale[1]:
-				logscale[1] = tmplogscale[1]
-	
+	def _MergeLimits(self,other):
+		'''
+		Combine the limits of another SpecCls object with these.
 		
-		self._scale = scale
-		self._logscale = logscale
-	
-	
+		'''
+		for l in ['_utlim','_flim','_lflim']:
+			a = getattr(self,l)
+			b = getattr(other,l)
+			setattr(self,l,[min(a[0],b[0]),max(a[1],b[1])])
+		self._logflim = 10**np.array(self._lflim)
+		
+		self._stats.Merge(other._stats)
+		if self._stats.size > 0:
+			self._scale,self._logscale = self._stats.Scale(self._ScaleType,self._nStd)
+		
+	def _CalculateTimeLimits(self,I):
+		'''
+		Update the time limits using the I'th set of spectra.
+		
+		'''
+		mn = np.nanmin(self.utc[I])
+		mx = np.nanmax(self.utc[I] + self.dt[I])
+		if mn < self._utlim[0]:
+			self._utlim[0] = mn
+		if mx > self._utlim[1]:
+			self._utlim[1] = mx
+		
+	def _CalculateFrequencyLimits(self,I):
+		'''
+		Update the frequency range to plot using the I'th set of spectra.
+		
+		'''
+		f0 = self.Freq[I] - self.bw[I]/2.0
+		f1 = self.Freq[I] + self.bw[I]/2.0
+		mn = np.nanmin(f0)
+		mx = np.nanmax(f1)
+		if mn < self._flim[0]:
+			self._flim[0] = mn
+		if mx > self._flim[1]:
+			self._flim[1] = mx
+		lf0 = np.log10(f0)
+		lf1 = np.log10(f1)
+		bad = np.where(self.Freq[I] <= 0.0)
+		lf0[bad] = np.nan
+		lf1[bad] = np.nan
+
+		lmn = np.nanmin(lf0)
+		lmx = np.nanmax(lf1)
+		if lmn < self._lflim[0]:
+			self._lflim[0] = lmn
+		if lmx > self._lflim[1]:
+			self._lflim[1] = lmx
+		self._logflim = 10**np.array(self._lflim)
@@ -0,0 +1,210 @@
+import numpy as np
+from .SpectrogramMesh import FindSpectrogramGaps,SpectrogramMesh
+from .RasterSpectrogram import RasterSpectrogram
+
+class SpecPyramid(object):
+	def __init__(self,utc,dt,y0,y1,z,MaxGap=60.0/3600.0,Blocks=None):
+		'''
+		A multi-resolution copy of a spectrogram, where level k contains
+		the mean, minimum and maximum of the original records in bins of
+		2**k records along the time axis (bins never cross gaps in the
+		data or changes in the bin limits). Levels are only calculated
+		when they are first requested.
+
+		See SpecPyramid.GetLevel, SpecPyramid.ChooseLevel and 
+		SpecPyramid.Plot for more information.
+
+		Inputs
+		======
+		utc : float
+			Continuous time axis (hours), shape (nt,).
+		dt : float
+			Duration of each record (hours), shape (nt,).
+		y0 : float
+			Lower limits of each bin, shape (ny,) or (nt,ny).
+		y1 : float
+			Upper limits of each bin, shape (ny,) or (nt,ny).
+		z : float
+			Spectrogram, shape (nt,ny).
+		MaxGap : float
+			Maximum time between records within a block (hours).
+		Blocks : None or tuple
+			If set, this should contain the start and end indices of 
+			each continuous block (e.g. TimeIndex.Blocks), otherwise 
+			they are found using MaxGap.
+
+		'''
+		if Blocks is None:
+			i0,i1 = FindSpectrogramGaps(utc,y0,y1,MaxGap)
+		else:
+			i0,i1 = Blocks
+		self.levels = [{	'utc' : utc,
+							'dt' : dt,
+							'y0' : y0,
+							'y1' : y1,
+							'mean' : z,
+							'min' : z,
+							'max' : z,
+							'i0' : i0,
+							'i1' : i1}]
+
+	def _Reduce(self,L):
+		'''
+		Combine pairs of neighbouring records from level L into one.
+
+		'''
+		n = L['utc'].size
+		i0 = L['i0']
+		i1 = L['i1']
+
+		#the first record of each pair (pairs do not cross blocks)
+		r = np.arange(n) - np.repeat(i0,i1-i0)
+		starts = np.where(r % 2 == 0)[0]
+		ends = np.append(starts[1:],n) - 1
+
+		#the sums and counts are not stored for level 0
+		if 'sum' in L:
+			s = L['sum']
+			c = L['count']
+		else:
+			fin = np.isfinite(L['mean'])
+			s = np.where(fin,L['mean'],0.0)
+			c = np.int32(fin)
+
+		out = {}
+		out['utc'] = L['utc'][starts]
+		out['dt'] = L['utc'][ends] + L['dt'][ends] - out['utc']
+		if len(np.shape(L['y0'])) > 1:
+			out['y0'] = L['y0'][starts]
+			out['y1'] = L['y1'][starts]
+		else:
+			out['y0'] = L['y0']
+			out['y1'] = L['y1']
+		out['sum'] = np.add.reduceat(s,starts,axis=0)
+		out['count'] = np.add.reduceat(c,starts,axis=0)
+		with np.errstate(invalid='ignore',divide='ignore'):
+			out['mean'] = out['sum']/out['count']
+		out['min'] = np.fmin.reduceat(L['min'],starts,axis=0)
+		out['max'] = np.fmax.reduceat(L['max'],starts,axis=0)
+		out['i0'] = np.searchsorted(starts,i0)
+		out['i1'] = np.append(out['i0'][1:],starts.size)
+		return out
+
+	def GetLevel(self,k):
+		'''
+		Return a level of the pyramid.
+
+		Inputs
+		======
+		k : int
+			Level to return, each record in this level corresponds to
+			up to 2**k of the original records.
+
+		Returns
+		=======
+		dict containing 'utc', 'dt', 'y0', 'y1', 'mean', 'min', 'max'
+		and the start/end indices of each continuous block ('i0','i1').
+
+		'''
+		while len(self.levels) <= k:
+			L = self.levels[-1]
+			if L['utc'].size == L['i0'].size:
+				#no more records can be combined
+				return L
+			self.levels.append(self._Reduce(L))
+		return self.levels[k]
+
+	def ChooseLevel(self,tlim,npix):
+		'''
+		Choose the level which has roughly one record per pixel.
+
+		Inputs
+		======
+		tlim : list
+			Time limits of the plot.
+		npix : float
+			Width of the plot in pixels.
+
+		Returns
+		=======
+		k : int
+			Pyramid level.
+
+		'''
+		utc = self.levels[0]['utc']
+		dt = self.levels[0]['dt']
+
+		#count the records within the time limits
+		a = np.searchsorted(utc,tlim[0])
+		b = np.searchsorted(utc,tlim[1],side='right')
+		if b - a < 2 or npix <= 0:
+			return 0
+
+		#the number of pixels covered by those records
+		span = min(utc[b-1] + dt[b-1],tlim[1]) - max(utc[a],tlim[0])
+		pix = npix*span/(tlim[1] - tlim[0])
+		if pix < 1:
+			pix = 1.0
+
+		return max(0,int(np.floor(np.log2((b - a)/pix))))
+
+	def Plot(self,ax,norm,cmap,Stat='mean'):
+		'''
+		Plot the level of the pyramid which best matches the width of
+		the Axes (in pixels) within its current time limits.
+
+		Inputs
+		======
+		ax : matplotlib.pyplot.Axes
+			Axes to plot on.
+		norm : matplotlib.colors.Normalize
+			Colour normalization.
+		cmap : str or matplotlib.colors.Colormap
+			Colour map.
+		Stat : str
+			'mean'|'min'|'max' - which statistic to plot.
+
+		Returns
+		=======
+		sm : QuadMesh or ScalarMappable for creating a colour bar.
+
+		'''
+		tlim = ax.get_xlim()
+		npix = ax.get_window_extent().width
+		L = self.GetLevel(self.ChooseLevel(tlim,npix))
+
+		return SpectrogramMesh(ax,L['utc'],L['dt'],L['y0'],L['y1'],L[Stat],
+						norm,cmap,tlim=tlim,Blocks=(L['i0'],L['i1']))
+
+	def Rasterize(self,img,tlim,ylim,norm,cmap,ylog=False,Stat='mean'):
+		'''
+		Draw the level of the pyramid which best matches the width of
+		an RGBA image into it (see RasterSpectrogram).
+
+		Inputs
+		======
+		img : uint8
+			RGBA image, shape (height,width,4).
+		tlim : list
+			Time limits of the image.
+		ylim : list
+			y-axis limits of the image.
+		norm : matplotlib.colors.Normalize
+			Colour normalization.
+		cmap : str or matplotlib.colors.Colormap
+			Colour map.
+		ylog : bool
+			If True, the y-axis is logarithmic.
+		Stat : str
+			'mean'|'min'|'max' - which statistic to plot.
+
+		Returns
+		=======
+		img : uint8
+			The same image.
+
+		'''
+		L = self.GetLevel(self.ChooseLevel(tlim,img.shape[1]))
+
+		return RasterSpectrogram(img,L['utc'],L['dt'],L['y0'],L['y1'],L[Stat],
+						norm,cmap,tlim,ylim,ylog=ylog,Blocks=(L['i0'],L['i1']))
@@ -0,0 +1,194 @@
+import numpy as np
+import os
+import json
+
+#version of the format written by SaveSpecArrays
+StoreVersion = 1
+
+def _JSONDefault(x):
+	'''
+	Convert the numpy types which json can't serialize, these are 
+	tagged so that _JSONObject can restore them. Anything else raises a
+	TypeError rather than being saved as something which can't be read
+	back.
+
+	'''
+	if isinstance(x,(np.ndarray,np.generic)) and not x.dtype.hasobject:
+		if x.dtype.kind in 'Vc':
+			raise TypeError('Arrays of type {:s} can not be stored in the header'.format(x.dtype.name))
+		if x.dtype.kind in 'Mm':
+			#dates and times are stored as integers
+			v = np.asarray(x).view('int64').tolist()
+		else:
+			v = x.tolist()
+		return {'__ndarray__' : v, 'dtype' : x.dtype.str, 'shape' : list(np.shape(x))}
+	if isinstance(x,bytes):
+		return {'__bytes__' : x.hex()}
+	raise TypeError('Object of type {:s} can not be stored in the header'.format(type(x).__name__))
+
+def _JSONObject(d):
+	'''
+	Restore the values tagged by _JSONDefault.
+
+	'''
+	if '__ndarray__' in d:
+		dtype = np.dtype(d['dtype'])
+		if dtype.kind in 'Mm':
+			x = np.array(d['__ndarray__'],dtype='int64').view(dtype)
+		else:
+			x = np.array(d['__ndarray__'],dtype=dtype)
+		x = x.reshape(d['shape'])
+		if x.ndim == 0:
+			return x[()]
+		return x
+	if '__bytes__' in d:
+		return bytes.fromhex(d['__bytes__'])
+	return d
+
+def ReadSpecHeader(path):
+	'''
+	Read the header saved by SaveSpecArrays.
+
+	Inputs
+	======
+	path : str
+		Directory containing the saved object.
+
+	Returns
+	=======
+	header : dict
+
+	'''
+	with open(os.path.join(path,'header.json'),'r') as f:
+		return json.load(f,object_hook=_JSONObject)
+
+def _PlainArray(x):
+	'''
+	Convert an object array (e.g. of strings) to a fixed-width string
+	or numeric array, so that it can be saved without pickling.
+
+	'''
+	x = np.asarray(x)
+	if not x.dtype.hasobject:
+		return x
+	y = np.array(x.tolist())
+	if y.dtype.hasobject or y.shape != x.shape:
+		raise TypeError('Object arrays can only be saved if they contain strings or numbers')
+	return y
+
+def SaveSpecArrays(path,header,arrays):
+	'''
+	Save a spectrum object as a directory containing a JSON header and
+	one uncompressed .npy file per array (so that they can be memory
+	mapped when loaded).
+
+	Inputs
+	======
+	path : str
+		Directory to save to (created if needed).
+	header : dict
+		JSON-serializable header (numpy arrays and scalars are allowed),
+		must contain 'Class'.
+	arrays : dict
+		Arrays to save, keyed by name. Object arrays are converted to
+		string or numeric arrays.
+
+	'''
+	#check everything can be saved before changing anything
+	arrays = {k : _PlainArray(arrays[k]) for k in arrays}
+	header = dict(header)
+	header['Version'] = StoreVersion
+	header['Arrays'] = list(arrays.keys())
+	hbytes = json.dumps(header,default=_JSONDefault)
+
+	if not os.path.isdir(path):
+		os.makedirs(path)
+
+	#remove the old header first, so that a partially overwritten set
+	#of arrays is never read, then any arrays left over from it
+	hfile = os.path.join(path,'header.json')
+	if os.path.isfile(hfile):
+		old = ReadSpecHeader(path)
+		os.remove(hfile)
+		for k in old.get('Arrays',[]):
+			fname = os.path.join(path,k+'.npy')
+			if os.path.isfile(fname) and not k in arrays:
+				os.remove(fname)
+
+	for k in arrays:
+		np.save(os.path.join(path,k+'.npy'),arrays[k],allow_pickle=False)
+
+	#the header is written last (via a temporary file), so a partial
+	#save is never loaded
+	with open(hfile+'.tmp','w') as f:
+		f.write(hbytes)
+	os.replace(hfile+'.tmp',hfile)
+
+def ReadSpecArray(path,name,MemMap=True):
+	'''
+	Read a single array saved by SaveSpecArrays.
+
+	Inputs
+	======
+	path : str
+		Directory containing the saved object.
+	name : str
+		Name of the array.
+	MemMap : bool
+		If True the array is memory mapped (read-only) rather than read
+		into memory.
+
+	Returns
+	=======
+	numpy.ndarray
+
+	'''
+	fname = os.path.join(path,name+'.npy')
+	if MemMap:
+		return np.load(fname,mmap_mode='r',allow_pickle=False)
+	return np.load(fname,allow_pickle=False)
+
+def _NewSpecObject(header):
+	'''
+	Create an empty PSpecCls, SpecCls or PSpecPADCls object to be filled
+	using its _Unpack method.
+
+	'''
+	from .PSpecCls import PSpecCls
+	from .SpecCls import SpecCls
+	from .PSpecPADCls import PSpecPADCls
+
+	if header['Class'] == 'PSpecCls':
+		return PSpecCls(header['SpecType'],**header['kwargs'])
+	elif header['Class'] == 'SpecCls':
+		return SpecCls(**header['kwargs'])
+	elif header['Class'] == 'PSpecPADCls':
+		return PSpecPADCls.__new__(PSpecPADCls)
+	else:
+		raise ValueError('Unknown class: '+header['Class'])
+
+def LoadSpecObject(path,MemMap=True):
+	'''
+	Load a PSpecCls, SpecCls or PSpecPADCls object saved using its Save
+	method.
+
+	Inputs
+	======
+	path : str
+		Directory containing the saved object.
+	MemMap : bool
+		If True (default) the arrays are memory mapped (read-only), so
+		that only the parts which are used are read from disk.
+
+	Returns
+	=======
+	PSpecCls, SpecCls or PSpecPADCls object
+
+	'''
+	header = ReadSpecHeader(path)
+	if header.get('Version',0) > StoreVersion:
+		raise ValueError('Unsupported format version {:d}'.format(header['Version']))
+
+	obj = _NewSpecObject(header)
+	obj._Unpack(header,lambda name: ReadSpecArray(path,name,MemMap))
+	return obj
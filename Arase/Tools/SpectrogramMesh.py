@@ -0,0 +1,205 @@
+import numpy as np
+import matplotlib.pyplot as plt
+from .TimeIndex import TimeIndex
+
+def FindSpectrogramGaps(utc,y0,y1=None,MaxGap=60.0/3600.0):
+	'''
+	Split a spectrogram into continuous blocks, a new block starts
+	wherever there is a gap in time longer than MaxGap, where time goes
+	backwards or where the bin limits change (see TimeIndex).
+
+	Inputs
+	======
+	utc : float
+		Continuous time axis (hours).
+	y0 : float
+		Lower limits of each bin, shape (ny,) or (nt,ny).
+	y1 : None or float
+		Upper limits of each bin, as above.
+	MaxGap : float
+		Maximum time between records within a block (hours).
+
+	Returns
+	=======
+	i0 : int
+		Start index of each block.
+	i1 : int
+		Index after the end of each block.
+
+	'''
+	return TimeIndex(utc,Bins=[y0,y1],MaxGap=MaxGap).Blocks
+
+
+def SpectrogramBinEdges(ya,yb):
+	'''
+	Find the edges of a set of bins for pcolormesh, with an extra row
+	of edges wherever the top of one bin is not the bottom of the next,
+	so that bins which are not adjacent (or which overlap) are still
+	drawn in the correct place.
+
+	Inputs
+	======
+	ya : float
+		Lower limits of each bin, shape (ny,).
+	yb : float
+		Upper limits of each bin, shape (ny,).
+
+	Returns
+	=======
+	srt : int
+		Indices of the finite bins, in ascending order.
+	row : int
+		Row of the mesh containing each of the bins in srt.
+	ye : float
+		Mesh edges. All three are None if there are no finite bins.
+
+	'''
+	good = np.where(np.isfinite(ya) & np.isfinite(yb))[0]
+	if good.size == 0:
+		return None,None,None
+	srt = good[np.argsort(ya[good])]
+	ny = srt.size
+
+	split = np.where(yb[srt[:-1]] != ya[srt[1:]])[0]
+	row = np.arange(ny) + np.searchsorted(split,np.arange(ny))
+	ye = np.zeros(ny + split.size + 1,dtype='float64')
+	ye[row] = ya[srt]
+	ye[row+1] = yb[srt]
+	return srt,row,ye
+
+def _SameBins(y0,y1,a,b):
+	'''
+	Check whether records a and b have the same bin limits.
+
+	'''
+	if len(np.shape(y0)) == 1:
+		return True
+	return np.array_equal(y0[a],y0[b],equal_nan=True) and np.array_equal(y1[a],y1[b],equal_nan=True)
+
+def _PlotRun(ax,utc,dt,y0,y1,z,norm,cmap,run):
+	'''
+	Plot a list of blocks which share the same bins as a single mesh,
+	with a column of NaNs in each gap between them.
+
+	'''
+	#get the bin limits for these blocks
+	a = run[0][0]
+	if len(np.shape(y0)) > 1:
+		ya = y0[a]
+		yb = y1[a]
+	else:
+		ya = y0
+		yb = y1
+	srt,row,ye = SpectrogramBinEdges(ya,yb)
+	if srt is None:
+		return None
+
+	if len(run) == 1 and row.size == ye.size - 1:
+		#a single block of adjacent bins needs no padding at all
+		a,b = run[0]
+		te = np.append(utc[a:b],utc[b-1] + dt[b-1])
+		c = z[a:b][:,srt].T
+	else:
+		#the time edges of each block and the record in each column 
+		#(-1 for the gaps)
+		te = []
+		rec = []
+		for k,(a,b) in enumerate(run):
+			if k > 0:
+				rec.append([-1])
+			te.append(utc[a:b])
+			te.append([utc[b-1] + dt[b-1]])
+			rec.append(np.arange(a,b))
+		te = np.concatenate(te)
+		rec = np.concatenate(rec)
+
+		c = np.full((ye.size-1,rec.size),np.nan)
+		c[row] = z[rec.clip(min=0)][:,srt].T
+		c[:,rec < 0] = np.nan
+
+	#pcolormesh masks the NaNs itself
+	return ax.pcolormesh(te,ye,c,cmap=cmap,norm=norm)
+
+def SpectrogramMesh(ax,utc,dt,y0,y1,z,norm,cmap,tlim=None,MaxGap=60.0/3600.0,Blocks=None):
+	'''
+	Plot a spectrogram using as few QuadMeshes as possible: continuous
+	blocks of data which share the same bins are drawn in one mesh,
+	with a column of NaNs in each gap. Each row of bins is separated 
+	from the next by a row of NaNs, so that bins which are not adjacent
+	(or which overlap) are still drawn in the correct place.
+
+	Inputs
+	======
+	ax : matplotlib.pyplot.Axes
+		Axes to plot on.
+	utc : float
+		Continuous time axis (hours), shape (nt,).
+	dt : float
+		Duration of each record (hours), shape (nt,).
+	y0 : float
+		Lower limits of each bin, shape (ny,) or (nt,ny).
+	y1 : float
+		Upper limits of each bin, shape (ny,) or (nt,ny).
+	z : float
+		Data to plot, shape (nt,ny).
+	norm : matplotlib.colors.Normalize
+		Colour normalization.
+	cmap : str or matplotlib.colors.Colormap
+		Colour map.
+	tlim : None or list
+		If set, only the data within this time range are drawn.
+	MaxGap : float
+		Maximum time between records within a block (hours).
+	Blocks : None or tuple
+		If set, this should contain the start and end indices of each
+		continuous block (e.g. TimeIndex.Blocks), otherwise they are
+		found using MaxGap.
+
+	Returns
+	=======
+	sm : QuadMesh or ScalarMappable for creating a colour bar.
+
+	'''
+	#find the continuous blocks of data
+	if Blocks is None:
+		i0,i1 = FindSpectrogramGaps(utc,y0,y1,MaxGap)
+	else:
+		i0,i1 = Blocks
+
+	#remove blocks which are outside of the time range
+	if not tlim is None:
+		use = np.where((utc[i1-1] + dt[i1-1] >= tlim[0]) & (utc[i0] <= tlim[1]))[0]
+		i0 = i0[use]
+		i1 = i1[use]
+
+	#group the blocks which can share a mesh (the same bins, and each
+	#starting after the end of the previous one)
+	runs = []
+	for a,b in zip(i0,i1):
+
+		#cull the records outside of the time range, unless the whole
+		#block is visible
+		if not tlim is None and (utc[a] < tlim[0] or utc[b-1] > tlim[1]):
+			a = a + max(np.searchsorted(utc[a:b],tlim[0],side='right') - 1,0)
+			b = a + np.searchsorted(utc[a:b],tlim[1],side='right')
+			if b <= a:
+				continue
+
+		if len(runs) > 0:
+			pa,pb = runs[-1][-1]
+			if utc[a] >= utc[pb-1] + dt[pb-1] and _SameBins(y0,y1,pa,a):
+				runs[-1].append((a,b))
+				continue
+		runs.append([(a,b)])
+
+	sm = None
+	for run in runs:
+		tmp = _PlotRun(ax,utc,dt,y0,y1,z,norm,cmap,run)
+		if not tmp is None:
+			sm = tmp
+
+	if sm is None:
+		#nothing was plotted, but a colour bar may still be needed
+		sm = plt.cm.ScalarMappable(norm=norm,cmap=cmap)
+		sm.set_array([])
+	return sm
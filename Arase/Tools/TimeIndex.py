@@ -0,0 +1,208 @@
+import numpy as np
+from .EnergyTable import EnergyTable
+
+class TimeIndex(object):
+	def __init__(self,utc,dt=None,Bins=[],MaxGap=60.0/3600.0):
+		'''
+		An index of the time axis of a block of spectra, built once when
+		the data are stored so that plotting, slicing, regridding and
+		searching in time can all reuse it. The records are split into
+		contiguous segments wherever there is a gap in time longer than
+		MaxGap, where time goes backwards, or where any of the bin
+		arrays change.
+
+		See TimeIndex.Slice, TimeIndex.Search and TimeIndex.Segment for
+		more information.
+
+		Inputs
+		======
+		utc : float
+			Continuous time axis (hours), shape (nt,).
+		dt : None or float
+			Duration of each record (hours), shape (nt,), used to find
+			the end time of each segment.
+		Bins : list
+			Bin arrays (e.g. energies and their widths), each of these
+			is either shape (nb,), in which case it is ignored, or
+			(nt,nb) (which may also be an EnergyTable).
+		MaxGap : float
+			Maximum time between records within a segment (hours).
+
+		'''
+		utc = np.asarray(utc)
+		self.n = utc.size
+
+		#a sorted copy of the time axis is only kept if needed
+		if self.n < 2 or (utc[1:] >= utc[:-1]).all():
+			self.order = None
+			self.utc = utc
+		else:
+			self.order = np.argsort(utc,kind='stable')
+			self.utc = utc[self.order]
+
+		#find the segments (these are in the original record order)
+		step = utc[1:] - utc[:-1]
+		isgap = (step > MaxGap) | (step < 0)
+		Index = []
+		for y in Bins:
+			if isinstance(y,EnergyTable):
+				#the rows only change where the index does
+				if not any([y.Index is x for x in Index]):
+					Index.append(y.Index)
+					isgap = isgap | (y.Index[1:] != y.Index[:-1])
+			elif np.ndim(y) > 1:
+				#nan != nan, so compare the masks separately
+				fin = np.isfinite(y)
+				dy = (y[1:] != y[:-1]) & (fin[1:] | fin[:-1])
+				isgap = isgap | dy.any(axis=1)
+		if self.n == 0:
+			self.i0 = np.zeros(0,dtype='int64')
+			self.i1 = np.zeros(0,dtype='int64')
+		else:
+			gaps = np.where(isgap)[0] + 1
+			self.i0 = np.append(0,gaps)
+			self.i1 = np.append(gaps,self.n)
+
+		#the time range covered by each segment
+		self.t0 = utc[self.i0]
+		if dt is None:
+			self.t1 = utc[self.i1-1]
+		else:
+			self.t1 = utc[self.i1-1] + np.asarray(dt)[self.i1-1]
+		self._tsrt = np.argsort(self.t0,kind='stable')
+
+	@property
+	def Blocks(self):
+		'''
+		The start and end indices of each segment, as used by
+		SpectrogramMesh, RasterSpectrogram and SpecPyramid.
+
+		'''
+		return self.i0,self.i1
+
+	def RecordSegment(self,i):
+		'''
+		Find the segment containing each of a set of records.
+
+		Inputs
+		======
+		i : int
+			Scalar or array of record indices.
+
+		Returns
+		=======
+		seg : int
+			Segment index (-1 for records before the first one).
+
+		'''
+		return np.searchsorted(self.i0,i,side='right') - 1
+
+	def Segment(self,t):
+		'''
+		Find the segment which covers each of a set of times.
+
+		Inputs
+		======
+		t : float
+			Scalar or array of continuous times (hours).
+
+		Returns
+		=======
+		seg : int
+			Segment index, -1 where a time is not covered by any segment
+			(i.e. it is within a gap).
+
+		'''
+		t = np.asarray(t)
+		if self._tsrt.size == 0:
+			return np.zeros(t.shape,dtype='int64') - 1
+		j = np.searchsorted(self.t0[self._tsrt],t,side='right') - 1
+		seg = self._tsrt[j.clip(min=0)]
+		return np.where((j >= 0) & (t < self.t1[seg]),seg,-1)
+
+	def Slice(self,t0,t1):
+		'''
+		Find the records with times within an interval. Where the time
+		axis is sorted (the usual case) a slice is returned, so that
+		indexing an array with it creates a view rather than a copy.
+
+		Inputs
+		======
+		t0 : float
+			Start of the interval (inclusive).
+		t1 : float
+			End of the interval (inclusive).
+
+		Returns
+		=======
+		use : slice or int
+			Slice or array of indices of the records within the
+			interval.
+		n : int
+			Number of records within the interval.
+
+		'''
+		a = np.searchsorted(self.utc,t0,side='left')
+		b = max(a,np.searchsorted(self.utc,t1,side='right'))
+		if self.order is None:
+			return slice(a,b),b - a
+
+		use = np.sort(self.order[a:b])
+		return use,use.size
+
+	def Search(self,t,Segmented=False):
+		'''
+		Find the records surrounding a set of times using a binary
+		search of the sorted time axis.
+
+		Inputs
+		======
+		t : float
+			Scalar or array of times to search for, shape (M,).
+		Segmented : bool
+			If True, then where the records either side of a time are
+			in different segments (so should not be interpolated
+			between) bef is set to -1 and aft to nt.
+
+		Returns
+		=======
+		near : int
+			Index of the nearest record to each time (the first one,
+			where there are several at the same distance).
+		bef : int
+			Index of the last record with utc <= t (-1 if there is
+			none).
+		aft : int
+			Index of the first record with utc > t (nt if there is
+			none).
+
+		'''
+		t = np.asarray(t)
+		utc = self.utc
+		nt = self.n
+
+		#the records either side of each time
+		aft = np.searchsorted(utc,t,side='right')
+		bef = aft - 1
+
+		#nearest of the two candidates either side of t
+		i = np.searchsorted(utc,t,side='left')
+		lo = np.clip(i - 1,0,nt - 1)
+		hi = np.clip(i,0,nt - 1)
+		near = np.where(np.abs(t - utc[lo]) <= np.abs(utc[hi] - t),lo,hi)
+
+		#move back to the first of any repeated times
+		near = np.searchsorted(utc,utc[near],side='left')
+
+		#convert back to the original record indices
+		if not self.order is None:
+			near = self.order[near]
+			bef = np.where(bef >= 0,self.order[bef.clip(min=0)],-1)
+			aft = np.where(aft < nt,self.order[aft.clip(max=nt-1)],nt)
+
+		if Segmented:
+			split = (bef >= 0) & (aft < nt) & (self.RecordSegment(bef) != self.RecordSegment(aft))
+			bef = np.where(split,-1,bef)
+			aft = np.where(split,nt,aft)
+
+		return near,bef,aft
@@ -13,4 +13,9 @@ from .ListDates import ListDates
 from .SpecCls import SpecCls
 from .PSpecCls import PSpecCls 
 from .PSpecPADCls import PSpecPADCls
+from .SpecStore import LoadSpecObject
+from .SharedSpec import SharedSpec
+from .BatchQuicklooks import BatchQuicklooks
 from .RelVelocity import RelVelocity
+from .ReadPitchAngles import ReadPitchAngles
+from .SavePitchAngles import SavePitchAngles,PitchAngleSource